@@ -0,0 +1,194 @@
+"""
+账户余额快照
+现货、资金、活期理财、定期理财并发查询，理财持仓按页全部拉取，汇总成一个带类型的快照
+"""
+
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from decimal import Decimal
+from typing import NamedTuple
+
+SPOT_ENDPOINT = "/api/v3/account"
+FUNDING_ENDPOINT = "/sapi/v1/asset/get-funding-asset"
+FLEXIBLE_ENDPOINT = "/sapi/v1/simple-earn/flexible/position"
+LOCKED_ENDPOINT = "/sapi/v1/simple-earn/locked/position"
+
+# 账户类型
+SPOT = "spot"
+FUNDING = "funding"
+EARN = "earn"
+ALL_ACCOUNTS = (SPOT, FUNDING, EARN)
+
+# 理财持仓每页条数（接口上限 100）
+EARN_PAGE_SIZE = 100
+# 并发查询线程数
+DEFAULT_WORKERS = 4
+
+
+class SpotBalance(NamedTuple):
+    free: Decimal
+    locked: Decimal
+
+
+class FundingBalance(NamedTuple):
+    free: Decimal
+    locked: Decimal
+    freeze: Decimal
+
+
+class EarnBalance(NamedTuple):
+    flexible: Decimal
+    locked: Decimal
+
+
+class BalanceSnapshot:
+    """
+    某一时刻的账户余额
+
+    spot / funding / earn 均为 币种 -> 余额，只包含非零的币种；
+    查询失败的账户记录在 errors 中，对应字典为空
+    """
+
+    def __init__(self, accounts: tuple = ALL_ACCOUNTS):
+        self.accounts = tuple(accounts)
+        self.fetched_at = time.time()
+        self.spot = {}
+        self.funding = {}
+        self.earn = {}
+        # 账户类型 -> 错误信息
+        self.errors = {}
+        # 实际发出的请求数
+        self.requests = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def spot_free(self) -> dict:
+        """现货可用余额（提现 walletType=0 从现货钱包扣款）"""
+        return {asset: balance.free for asset, balance in self.spot.items()}
+
+    def totals(self) -> dict:
+        """所有账户按币种合计"""
+        summary = {}
+        for asset, balance in self.spot.items():
+            summary[asset] = summary.get(asset, Decimal(0)) + balance.free + balance.locked
+        for asset, balance in self.funding.items():
+            summary[asset] = summary.get(asset, Decimal(0)) + balance.free + balance.locked + balance.freeze
+        for asset, balance in self.earn.items():
+            summary[asset] = summary.get(asset, Decimal(0)) + balance.flexible + balance.locked
+        return summary
+
+
+def _decimal(value) -> Decimal:
+    return Decimal(str(value)) if value not in (None, "") else Decimal(0)
+
+
+def _fetch_spot(client) -> dict:
+    response = client.get(SPOT_ENDPOINT)
+    if response.status_code != 200:
+        raise RuntimeError(f"获取现货余额失败: {response.text}")
+    balances = {}
+    for b in response.json()["balances"]:
+        free, locked = _decimal(b["free"]), _decimal(b["locked"])
+        if free or locked:
+            balances[b["asset"]] = SpotBalance(free, locked)
+    return balances
+
+
+def _fetch_funding(client) -> dict:
+    response = client.post(FUNDING_ENDPOINT, {})
+    if response.status_code != 200:
+        raise RuntimeError(f"获取资金账户余额失败: {response.text}")
+    balances = {}
+    for b in response.json():
+        free, locked, freeze = _decimal(b["free"]), _decimal(b["locked"]), _decimal(b["freeze"])
+        if free or locked or freeze:
+            balances[b["asset"]] = FundingBalance(free, locked, freeze)
+    return balances
+
+
+def _fetch_earn_page(client, endpoint: str, page: int, size: int) -> dict:
+    response = client.get(endpoint, {"current": page, "size": size})
+    if response.status_code != 200:
+        raise RuntimeError(f"获取理财持仓失败: {response.text}")
+    return response.json()
+
+
+def fetch_balance_snapshot(
+    client,
+    accounts: tuple = ALL_ACCOUNTS,
+    workers: int = DEFAULT_WORKERS,
+    page_size: int = EARN_PAGE_SIZE
+) -> BalanceSnapshot:
+    """
+    并发查询账户余额
+
+    各账户和理财持仓的第 1 页同时发出，拿到理财持仓的 total 后剩余页也并发拉取，
+    全部请求复用同一个 BinanceClient 连接池
+
+    Args:
+        client: BinanceClient
+        accounts: 要查询的账户类型
+        workers: 并发线程数
+        page_size: 理财持仓每页条数
+
+    Returns:
+        BalanceSnapshot
+    """
+    snapshot = BalanceSnapshot(accounts)
+    # 理财持仓行: endpoint -> [rows]
+    earn_rows = {FLEXIBLE_ENDPOINT: [], LOCKED_ENDPOINT: []}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        pending = {}
+        if SPOT in accounts:
+            pending[executor.submit(_fetch_spot, client)] = (SPOT, None, None)
+        if FUNDING in accounts:
+            pending[executor.submit(_fetch_funding, client)] = (FUNDING, None, None)
+        if EARN in accounts:
+            for endpoint in earn_rows:
+                future = executor.submit(_fetch_earn_page, client, endpoint, 1, page_size)
+                pending[future] = (EARN, endpoint, 1)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                account, endpoint, page = pending.pop(future)
+                snapshot.requests += 1
+                try:
+                    result = future.result()
+                except Exception as e:
+                    snapshot.errors.setdefault(account, str(e))
+                    continue
+
+                if account == SPOT:
+                    snapshot.spot = result
+                elif account == FUNDING:
+                    snapshot.funding = result
+                else:
+                    earn_rows[endpoint].extend(result.get("rows", []))
+                    if page == 1:
+                        pages = math.ceil(int(result.get("total", 0)) / page_size)
+                        for p in range(2, pages + 1):
+                            next_future = executor.submit(_fetch_earn_page, client, endpoint, p, page_size)
+                            pending[next_future] = (EARN, endpoint, p)
+
+    if EARN in accounts and EARN not in snapshot.errors:
+        # 同一币种可能有多个产品的持仓，按币种累加
+        earn = {}
+        for item in earn_rows[FLEXIBLE_ENDPOINT]:
+            amount = _decimal(item.get("totalAmount"))
+            if amount > 0:
+                flexible, locked = earn.get(item.get("asset"), (Decimal(0), Decimal(0)))
+                earn[item.get("asset")] = (flexible + amount, locked)
+        for item in earn_rows[LOCKED_ENDPOINT]:
+            amount = _decimal(item.get("amount"))
+            if amount > 0:
+                flexible, locked = earn.get(item.get("asset"), (Decimal(0), Decimal(0)))
+                earn[item.get("asset")] = (flexible, locked + amount)
+        snapshot.earn = {asset: EarnBalance(*amounts) for asset, amounts in earn.items()}
+
+    snapshot.fetched_at = time.time()
+    return snapshot
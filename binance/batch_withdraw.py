@@ -4,17 +4,22 @@ Binance 批量提现脚本
 支持代理连接（用于 IP 白名单）
 """
 
+import os
 import csv
 import time
-import hmac
-import hashlib
-import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Optional
 from config import API_KEY, API_SECRET, WHITELIST_PROXY
-
-# Binance API 基础URL
-BASE_URL = "https://api.binance.com"
+from binance_client import BinanceClient, BASE_URL, DEFAULT_POOL_SIZE, DEFAULT_RECV_WINDOW
+from rate_limiter import SapiRateLimiter
+from time_sync import ServerTimeSync
+from coin_config import CoinConfigCache
+from preflight import run_preflight, REJECT_FILE
+from journal import WithdrawJournal, JOURNAL_FILE, SUCCESS, FAILED, UNKNOWN
+from withdraw_store import WithdrawHistoryStore, DB_FILE, sync_history, parse_date
+from network_stats import network_latency, recommend_networks, format_seconds, MIN_SAMPLES
+from balances import BalanceSnapshot, fetch_balance_snapshot, ALL_ACCOUNTS, SPOT
 
 # 提现地址文件
 WITHDRAW_FILE = "withdraw_addresses.csv"
@@ -59,10 +64,12 @@ if PROXIES:
 else:
     print("⚠ 未配置代理，将直接连接")
 
-
-def get_timestamp():
-    """获取当前时间戳（毫秒）"""
-    return int(time.time() * 1000)
+# 共享的签名请求客户端（长连接 + 连接池）
+client = BinanceClient(API_KEY, API_SECRET, base_url=BASE_URL, proxies=PROXIES, pool_size=DEFAULT_POOL_SIZE)
+# 服务器时间同步，首次签名请求时自动对时并在后台定期校正
+client.time_sync = ServerTimeSync(client)
+# 币种/网络配置缓存（磁盘 TTL 缓存 + (coin, network) 索引）
+coin_config = CoinConfigCache(client)
 
 
 def test_proxy_connection() -> bool:
@@ -75,7 +82,7 @@ def test_proxy_connection() -> bool:
     print("\n测试代理连接中...")
     try:
         # 测试获取当前 IP
-        response = requests.get(
+        response = client.session.get(
             "https://api.ipify.org?format=json",
             proxies=PROXIES,
             timeout=10
@@ -93,253 +100,85 @@ def test_proxy_connection() -> bool:
         return False
 
 
-def create_signature(params: dict) -> str:
-    """创建 API 签名"""
-    query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-    signature = hmac.new(
-        API_SECRET.encode("utf-8"),
-        query_string.encode("utf-8"),
-        hashlib.sha256
-    ).hexdigest()
-    return signature
-
-
-def get_headers():
-    """获取请求头"""
-    return {
-        "X-MBX-APIKEY": API_KEY,
-        "Content-Type": "application/x-www-form-urlencoded"
-    }
-
-
-def get_spot_balance(asset: str = None) -> dict:
-    """
-    获取现货账户余额
-    
-    Args:
-        asset: 指定币种，如 'USDT'、'BNB' 等。为 None 时返回所有余额
-    
-    Returns:
-        现货账户余额信息
-    """
-    endpoint = "/api/v3/account"
-    params = {
-        "timestamp": get_timestamp(),
-        "recvWindow": 5000
-    }
-    params["signature"] = create_signature(params)
-    
-    response = requests.get(
-        f"{BASE_URL}{endpoint}",
-        params=params,
-        headers=get_headers(),
-        proxies=PROXIES,
-        timeout=30
-    )
-    
-    if response.status_code == 200:
-        data = response.json()
-        balances = {b["asset"]: {"free": float(b["free"]), "locked": float(b["locked"])} 
-                   for b in data["balances"] if float(b["free"]) > 0 or float(b["locked"]) > 0}
-        if asset:
-            return balances.get(asset, {"free": 0, "locked": 0})
-        return balances
-    else:
-        print(f"获取现货余额失败: {response.text}")
-        return {}
-
-
-def get_funding_balance(asset: str = None) -> dict:
+def get_balance_snapshot(accounts: tuple = ALL_ACCOUNTS) -> BalanceSnapshot:
     """
-    获取资金账户余额（用于充值/提现/C2C）
+    获取账户余额快照（各账户并发查询，理财持仓全部分页）
     
     Args:
-        asset: 指定币种
+        accounts: 账户类型，spot/funding/earn 的任意组合
     
     Returns:
-        资金账户余额信息
-    """
-    endpoint = "/sapi/v1/asset/get-funding-asset"
-    params = {
-        "timestamp": get_timestamp(),
-        "recvWindow": 5000
-    }
-    if asset:
-        params["asset"] = asset
-    
-    params["signature"] = create_signature(params)
-    
-    response = requests.post(
-        f"{BASE_URL}{endpoint}",
-        data=params,
-        headers=get_headers(),
-        proxies=PROXIES,
-        timeout=30
-    )
-    
-    if response.status_code == 200:
-        data = response.json()
-        balances = {b["asset"]: {"free": float(b["free"]), "locked": float(b["locked"]), "freeze": float(b["freeze"])} 
-                   for b in data if float(b["free"]) > 0 or float(b["locked"]) > 0 or float(b["freeze"]) > 0}
-        return balances
-    else:
-        print(f"获取资金账户余额失败: {response.text}")
-        return {}
-
-
-def get_earn_balance() -> dict:
+        BalanceSnapshot，查询失败的账户记录在 errors 中
     """
-    获取理财账户余额（活期+定期）
-    
-    Returns:
-        理财账户余额信息
-    """
-    balances = {}
-    
-    # 活期理财
-    endpoint_flexible = "/sapi/v1/simple-earn/flexible/position"
-    params = {
-        "timestamp": get_timestamp(),
-        "recvWindow": 5000,
-        "size": 100
-    }
-    params["signature"] = create_signature(params)
-    
-    response = requests.get(
-        f"{BASE_URL}{endpoint_flexible}",
-        params=params,
-        headers=get_headers(),
-        proxies=PROXIES,
-        timeout=30
-    )
-    
-    if response.status_code == 200:
-        data = response.json()
-        for item in data.get("rows", []):
-            asset = item.get("asset")
-            amount = float(item.get("totalAmount", 0))
-            if amount > 0:
-                if asset not in balances:
-                    balances[asset] = {"flexible": 0, "locked": 0}
-                balances[asset]["flexible"] = amount
-    
-    # 定期理财
-    endpoint_locked = "/sapi/v1/simple-earn/locked/position"
-    params = {
-        "timestamp": get_timestamp(),
-        "recvWindow": 5000,
-        "size": 100
-    }
-    params["signature"] = create_signature(params)
-    
-    response = requests.get(
-        f"{BASE_URL}{endpoint_locked}",
-        params=params,
-        headers=get_headers(),
-        proxies=PROXIES,
-        timeout=30
-    )
-    
-    if response.status_code == 200:
-        data = response.json()
-        for item in data.get("rows", []):
-            asset = item.get("asset")
-            amount = float(item.get("amount", 0))
-            if amount > 0:
-                if asset not in balances:
-                    balances[asset] = {"flexible": 0, "locked": 0}
-                balances[asset]["locked"] = amount
-    
-    return balances
-
-
-def get_all_balances() -> dict:
-    """
-    获取所有账户的余额汇总
-    
-    Returns:
-        所有账户余额信息
-    """
-    return {
-        "spot": get_spot_balance(),
-        "funding": get_funding_balance(),
-        "earn": get_earn_balance()
-    }
-
-
-def get_withdraw_history(coin: str = None, limit: int = 10) -> list:
+    snapshot = fetch_balance_snapshot(client, accounts)
+    for error in snapshot.errors.values():
+        print(f"✗ {error}")
+    return snapshot
+
+
+def get_withdraw_history(
+    coin: str = None,
+    limit: int = 10,
+    start_time: int = None,
+    end_time: int = None,
+    offset: int = 0
+) -> Optional[list]:
     """
     获取提现历史
     
     Args:
         coin: 币种
-        limit: 返回数量
+        limit: 返回数量（最大 1000）
+        start_time: 开始时间（毫秒），与 end_time 间隔不能超过 90 天
+        end_time: 结束时间（毫秒）
+        offset: 分页偏移
     
     Returns:
-        提现历史列表
+        提现历史列表，请求失败或返回错误时为 None（不能当作"没有提现记录"）
     """
     endpoint = "/sapi/v1/capital/withdraw/history"
-    params = {
-        "timestamp": get_timestamp(),
-        "recvWindow": 5000,
-        "limit": limit
-    }
+    params = {"limit": limit}
     if coin:
         params["coin"] = coin
+    if start_time:
+        params["startTime"] = start_time
+    if end_time:
+        params["endTime"] = end_time
+    if offset:
+        params["offset"] = offset
     
-    params["signature"] = create_signature(params)
-    
-    response = requests.get(
-        f"{BASE_URL}{endpoint}",
-        params=params,
-        headers=get_headers(),
-        proxies=PROXIES,
-        timeout=30
-    )
+    try:
+        response = client.get(endpoint, params)
+        data = response.json() if response.status_code == 200 else None
+    except Exception as e:
+        print(f"获取提现历史失败: {e}")
+        return None
     
-    if response.status_code == 200:
-        return response.json()
-    else:
+    if not isinstance(data, list):
         print(f"获取提现历史失败: {response.text}")
-        return []
+        return None
+    return data
 
 
 def get_coin_info(coin: str = None) -> list:
     """
     获取币种信息（包括支持的网络）
     
+    数据来自 coin_config 缓存，TTL 内不会重复请求 Binance
+    
     Args:
         coin: 币种名称
     
     Returns:
         币种信息列表
     """
-    endpoint = "/sapi/v1/capital/config/getall"
-    params = {
-        "timestamp": get_timestamp(),
-        "recvWindow": 5000
-    }
-    params["signature"] = create_signature(params)
-    
-    response = requests.get(
-        f"{BASE_URL}{endpoint}",
-        params=params,
-        headers=get_headers(),
-        proxies=PROXIES,
-        timeout=30
-    )
-    
-    if response.status_code == 200:
-        data = response.json()
+    try:
         if coin:
-            for item in data:
-                if item["coin"] == coin:
-                    return item
-            return None
-        return data
-    else:
-        print(f"获取币种信息失败: {response.text}")
-        return []
+            return coin_config.get_coin(coin)
+        return coin_config.all_coins()
+    except Exception as e:
+        print(f"获取币种信息失败: {e}")
+        return None if coin else []
 
 
 def withdraw(
@@ -348,7 +187,8 @@ def withdraw(
     amount: float,
     network: str = None,
     address_tag: str = None,
-    wallet_type: int = 0
+    wallet_type: int = 0,
+    withdraw_order_id: str = None
 ) -> dict:
     """
     执行提现操作
@@ -360,6 +200,7 @@ def withdraw(
         network: 网络类型，如 'BSC'、'ETH'、'TRX' 等
         address_tag: 地址标签（某些币种需要，如 XRP 的 memo）
         wallet_type: 钱包类型。0-现货钱包，1-资金钱包
+        withdraw_order_id: 自定义提现 ID，用于幂等和对账
     
     Returns:
         提现结果
@@ -370,8 +211,6 @@ def withdraw(
         "coin": coin,
         "address": address,
         "amount": amount,
-        "timestamp": get_timestamp(),
-        "recvWindow": 5000,
         "walletType": wallet_type
     }
     
@@ -381,15 +220,10 @@ def withdraw(
     if address_tag:
         params["addressTag"] = address_tag
     
-    params["signature"] = create_signature(params)
+    if withdraw_order_id:
+        params["withdrawOrderId"] = withdraw_order_id
     
-    response = requests.post(
-        f"{BASE_URL}{endpoint}",
-        data=params,
-        headers=get_headers(),
-        proxies=PROXIES,
-        timeout=30
-    )
+    response = client.post(endpoint, params)
     
     result = {
         "success": response.status_code == 200,
@@ -438,6 +272,189 @@ def load_withdraw_addresses(filename: str = WITHDRAW_FILE) -> list:
     return addresses
 
 
+def preflight_withdraw_file(filename: str = WITHDRAW_FILE, skip_rows: set = None, snapshot: BalanceSnapshot = None):
+    """
+    提现前预检整个地址文件
+    
+    使用缓存的币种配置和一次现货余额快照（walletType=0 从现货钱包扣款），
+    有被拒绝的行时写出 preflight_rejects.csv
+    
+    Args:
+        filename: CSV 文件路径
+        skip_rows: 跳过的文件行号（续跑时已完成的行）
+        snapshot: 已有的余额快照，为空时只查询现货余额
+    
+    Returns:
+        PreflightReport，无法完成预检时返回 None
+    """
+    print("\n预检提现地址文件中...")
+    try:
+        coin_config.load()
+    except Exception as e:
+        print(f"✗ 无法获取币种配置: {e}")
+        return None
+    
+    if snapshot is None or SPOT not in snapshot.accounts:
+        snapshot = get_balance_snapshot((SPOT,))
+    if SPOT in snapshot.errors:
+        print("✗ 无法获取现货余额")
+        return None
+    
+    try:
+        report = run_preflight(filename, coin_config, snapshot.spot_free(), skip_rows)
+    except FileNotFoundError:
+        print(f"错误: 找不到文件 {filename}")
+        return None
+    
+    report.print_summary()
+    if report.rejects:
+        report.save_rejects(REJECT_FILE)
+        print(f"\n拒绝明细已保存到 {REJECT_FILE}")
+    return report
+
+
+def reconcile_journal(journal: WithdrawJournal) -> bool:
+    """
+    续跑前对账：用一次分页的提现历史查询确认所有未确定的记录
+    
+    Args:
+        journal: 已加载最后批次的提现日志
+    
+    Returns:
+        对账是否完成
+    """
+    pending = journal.unresolved()
+    if not pending:
+        return True
+    
+    print(f"\n对账 {len(pending)} 条未确定的提现记录...")
+    # 留 60 秒余量，覆盖本地与服务器的时钟差
+    start_time = min(intent["time"] for intent in pending) - 60000
+    history = []
+    while True:
+        page = get_withdraw_history(limit=1000, start_time=start_time, offset=len(history))
+        if page is None:
+            # 查询失败时不能把未找到的记录当作未受理，否则重新提交会重复打款
+            print("✗ 获取提现历史失败，无法对账，请稍后再次运行 --resume")
+            return False
+        history.extend(page)
+        if len(page) < 1000:
+            break
+    
+    summary = journal.reconcile(history)
+    print(f"✓ 已在提现历史中找到 {summary['found']} 条，确认未受理 {summary['missing']} 条（将重新提交）")
+    if summary["pending"]:
+        # 提现历史可能还没出现刚受理的提现，现在重新提交可能重复打款
+        print(f"⚠ 还有 {summary['pending']} 条提交不久、提现历史中暂未出现，"
+              f"请 {summary['retry_after']:.0f} 秒后再次运行 --resume")
+        return False
+    return True
+
+
+def sync_withdraw_history(since: str = None, workers: int = 4, db_file: str = DB_FILE):
+    """
+    同步全部提现历史到本地 SQLite
+    
+    Args:
+        since: 起始日期 YYYY-MM-DD（UTC），为空时增量同步
+        workers: 并发线程数
+        db_file: 数据库文件
+    """
+    store = WithdrawHistoryStore(db_file)
+    before = store.count()
+    
+    previous_limiter = client.limiter
+    limiter = SapiRateLimiter()
+    client.limiter = limiter
+    if client.pool_size < workers:
+        client.mount_pool(workers)
+    
+    print(f"\n同步提现历史到 {db_file}...")
+    started = time.time()
+    try:
+        summary = sync_history(client, store, parse_date(since) if since else None, workers)
+    finally:
+        client.limiter = previous_limiter
+    elapsed = time.time() - started
+    
+    start_text = time.strftime("%Y-%m-%d %H:%M", time.gmtime(summary["start"] / 1000))
+    print(f"✓ 时间范围 {start_text} 起，{summary['windows']} 个窗口，{summary['pages']} 页，"
+          f"拉取 {summary['rows']} 条，新增 {store.count() - before} 条，本地共 {store.count()} 条")
+    stats = limiter.stats()
+    print(f"耗时: {elapsed:.1f}s，限流等待 {stats['throttled']} 次 (共 {stats['waited_seconds']}s)")
+    if summary["failed"]:
+        print(f"✗ {summary['failed']} 个窗口失败，下次同步会重新拉取")
+    store.close()
+
+
+def show_network_stats(coin: str = None, db_file: str = DB_FILE):
+    """
+    显示各 币种/网络 的到账耗时分位数（基于 --sync-history 同步的历史）
+    
+    Args:
+        coin: 只显示该币种
+        db_file: 数据库文件
+    """
+    if not os.path.exists(db_file):
+        print(f"\n找不到 {db_file}，请先运行 --sync-history")
+        return
+    store = WithdrawHistoryStore(db_file)
+    stats = network_latency(store, coin)
+    store.close()
+    if not stats:
+        print("\n没有已完成的提现记录")
+        return
+    
+    print(f"\n到账耗时（申请 -> 完成），样本少于 {MIN_SAMPLES} 条的网络不参与推荐:")
+    print("-" * 60)
+    print(f"  {'币种/网络':<20}{'笔数':>8}{'p50':>10}{'p90':>10}{'p99':>10}")
+    for (c, network), stat in sorted(stats.items(), key=lambda x: (x[0][0], x[1].p50)):
+        print(f"  {c + '/' + network:<20}{stat.count:>8}{format_seconds(stat.p50):>10}"
+              f"{format_seconds(stat.p90):>10}{format_seconds(stat.p99):>10}")
+
+
+def apply_network_recommendations(addresses: list, auto: bool = False, db_file: str = DB_FILE) -> int:
+    """
+    按历史到账耗时推荐手续费不高于当前网络的最快网络
+    
+    Args:
+        addresses: 预检通过的提现行
+        auto: 是否直接改用推荐的网络
+        db_file: 数据库文件
+    
+    Returns:
+        推荐更换网络的行数
+    """
+    if not os.path.exists(db_file):
+        print(f"⚠ 找不到 {db_file}，跳过网络推荐（先运行 --sync-history）")
+        return 0
+    store = WithdrawHistoryStore(db_file)
+    stats = network_latency(store)
+    store.close()
+    
+    choices = recommend_networks(addresses, coin_config, stats)
+    if not choices:
+        print("✓ 当前网络已是同等或更低手续费中最快的")
+        return 0
+    
+    summary = {}
+    for choice in choices:
+        key = (choice.coin, choice.current, choice.best)
+        summary[key] = summary.get(key, 0) + 1
+    print("\n网络推荐（手续费不增加，按 p50 到账耗时）:")
+    for (c, current, best), count in sorted(summary.items()):
+        current_latency = format_seconds(stats.get((c, current)).p50) if stats.get((c, current)) else "N/A"
+        print(f"  {c}: {current} ({current_latency}) -> {best} ({format_seconds(stats[(c, best)].p50)})，{count} 行")
+    
+    if auto:
+        by_row = {choice.row: choice.best for choice in choices}
+        for addr in addresses:
+            if addr["row"] in by_row:
+                addr["network"] = by_row[addr["row"]]
+        print(f"✓ 已为 {len(choices)} 行自动选择更快的网络")
+    return len(choices)
+
+
 def save_result(results: list, filename: str = RESULT_FILE):
     """
     保存提现结果到 CSV 文件
@@ -465,23 +482,75 @@ def save_result(results: list, filename: str = RESULT_FILE):
     print(f"\n结果已保存到 {filename}")
 
 
+def execute_withdraw(addr: dict, dry_run: bool = False, journal: WithdrawJournal = None) -> dict:
+    """
+    执行单条提现（或模拟）
+    
+    有 journal 时，提交前先落盘意图并使用确定性的 withdrawOrderId，提交后落盘结果
+    
+    Args:
+        addr: 预检通过的一行（或 load_withdraw_addresses() 返回的一行）
+        dry_run: 如果为 True，只返回模拟结果
+        journal: 提现预写日志
+    
+    Returns:
+        提现结果
+    """
+    if dry_run:
+        return {
+            "success": True,
+            "coin": addr["coin"],
+            "address": addr["address"],
+            "amount": addr["amount"],
+            "network": addr["network"],
+            "response": "[DRY RUN] 模拟成功"
+        }
+    
+    order_id = journal.record_intent(addr) if journal else None
+    try:
+        result = withdraw(
+            coin=addr["coin"],
+            address=addr["address"],
+            amount=addr["amount"],
+            network=addr["network"],
+            address_tag=addr["address_tag"],
+            withdraw_order_id=order_id
+        )
+    except Exception as e:
+        # 超时/断线时无法确定 Binance 是否已受理，留给 --resume 对账
+        if journal:
+            journal.record_outcome(order_id, UNKNOWN, response=str(e))
+        raise
+    
+    if journal:
+        if result["success"]:
+            journal.record_outcome(order_id, SUCCESS, result["response"].get("id"), result["response"])
+        else:
+            journal.record_outcome(order_id, FAILED, response=result["response"])
+    return result
+
+
 def batch_withdraw(
     addresses: list,
     delay: float = 1.0,
-    dry_run: bool = False
+    dry_run: bool = False,
+    workers: int = 1,
+    journal: WithdrawJournal = None
 ) -> list:
     """
     批量执行提现
     
     Args:
         addresses: 提现地址列表
-        delay: 每次提现之间的延迟（秒）
+        delay: 顺序模式下每次提现之间的延迟（秒）；
+               并发模式下仅在尚未收到权重响应头时作为兜底间隔
         dry_run: 如果为 True，只显示将要执行的操作，不实际执行
+        workers: 并发数，大于 1 时启用按权重限流的并发模式
+        journal: 提现预写日志，为 None 时不记录
     
     Returns:
         提现结果列表
     """
-    results = []
     total = len(addresses)
     
     print(f"\n{'='*60}")
@@ -492,6 +561,46 @@ def batch_withdraw(
     if dry_run:
         print("\n[模拟运行模式] - 不会实际执行提现\n")
     
+    if workers > 1:
+        results = _batch_withdraw_concurrent(addresses, delay, dry_run, workers, journal)
+    else:
+        results = _batch_withdraw_sequential(addresses, delay, dry_run, journal)
+    
+    # 统计结果
+    success_count = sum(1 for r in results if r["success"])
+    fail_count = total - success_count
+    
+    print(f"\n{'='*60}")
+    print(f"批量提现完成")
+    print(f"{'='*60}")
+    print(f"成功: {success_count}/{total}")
+    print(f"失败: {fail_count}/{total}")
+    
+    if client.time_sync and client.time_sync.synced:
+        sync_stats = client.time_sync.stats()
+        print(f"时钟偏移: {sync_stats['offset_ms']} ms (RTT {sync_stats['rtt_ms']} ms)，"
+              f"避免 -1021: {sync_stats['avoided']} 次，实际 -1021: {sync_stats['rejections']} 次")
+    
+    return results
+
+
+def _error_result(addr: dict, error: Exception) -> dict:
+    """请求异常时的提现结果"""
+    return {
+        "success": False,
+        "coin": addr["coin"],
+        "address": addr["address"],
+        "amount": addr["amount"],
+        "network": addr["network"],
+        "response": str(error)
+    }
+
+
+def _batch_withdraw_sequential(addresses: list, delay: float, dry_run: bool, journal: WithdrawJournal) -> list:
+    """顺序模式：逐条提现，每条之间固定延迟"""
+    results = []
+    total = len(addresses)
+    
     for i, addr in enumerate(addresses, 1):
         print(f"\n[{i}/{total}] 处理中...")
         print(f"  币种: {addr['coin']}")
@@ -499,24 +608,10 @@ def batch_withdraw(
         print(f"  数量: {addr['amount']}")
         print(f"  网络: {addr['network'] or '默认'}")
         
-        if dry_run:
-            result = {
-                "success": True,
-                "coin": addr["coin"],
-                "address": addr["address"],
-                "amount": addr["amount"],
-                "network": addr["network"],
-                "response": "[DRY RUN] 模拟成功"
-            }
-        else:
-            result = withdraw(
-                coin=addr["coin"],
-                address=addr["address"],
-                amount=addr["amount"],
-                network=addr["network"],
-                address_tag=addr["address_tag"]
-            )
-        
+        try:
+            result = execute_withdraw(addr, dry_run, journal)
+        except Exception as e:
+            result = _error_result(addr, e)
         results.append(result)
         
         if result["success"]:
@@ -531,77 +626,125 @@ def batch_withdraw(
         if i < total:
             time.sleep(delay)
     
-    # 统计结果
-    success_count = sum(1 for r in results if r["success"])
-    fail_count = total - success_count
+    return results
+
+
+def _batch_withdraw_concurrent(
+    addresses: list,
+    delay: float,
+    dry_run: bool,
+    workers: int,
+    journal: WithdrawJournal
+) -> list:
+    """
+    并发模式：多线程提现，由 SapiRateLimiter 根据权重响应头控制速率
     
-    print(f"\n{'='*60}")
-    print(f"批量提现完成")
-    print(f"{'='*60}")
-    print(f"成功: {success_count}/{total}")
-    print(f"失败: {fail_count}/{total}")
+    结果按输入顺序返回
+    """
+    total = len(addresses)
+    results = [None] * total
+    
+    previous_limiter = client.limiter
+    limiter = SapiRateLimiter(fallback_interval=delay)
+    client.limiter = limiter
+    if client.pool_size < workers:
+        client.mount_pool(workers)
+    
+    print(f"并发模式: {workers} 个线程，按 SAPI 权重自动限流")
+    started = time.time()
+    done = 0
+    
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(execute_withdraw, addr, dry_run, journal): i
+                       for i, addr in enumerate(addresses)}
+            for future in as_completed(futures):
+                i = futures[future]
+                addr = addresses[i]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = _error_result(addr, e)
+                results[i] = result
+                done += 1
+                
+                status = "✓" if result["success"] else "✗"
+                detail = result["response"].get("id", "N/A") if result["success"] and not dry_run else result["response"]
+                print(f"[{done}/{total}] {status} #{i + 1} {addr['coin']} {addr['amount']} -> "
+                      f"{addr['address'][:12]}... ({addr['network'] or '默认'}) {detail}")
+    finally:
+        client.limiter = previous_limiter
+    
+    elapsed = time.time() - started
+    stats = limiter.stats()
+    print(f"\n耗时: {elapsed:.1f}s，速率: {total / elapsed if elapsed else 0:.2f} 条/秒")
+    print(f"限流: 请求 {stats['requests']} 次，等待 {stats['throttled']} 次 "
+          f"(共 {stats['waited_seconds']}s)，429/418 {stats['retry_after_hits']} 次")
     
     return results
 
 
-def show_balance(account_type: str = "all"):
+def show_balance(account_type: str = "all", snapshot: BalanceSnapshot = None) -> BalanceSnapshot:
     """
     显示账户余额
     
     Args:
         account_type: 账户类型 - "spot"(现货), "funding"(资金), "earn"(理财), "all"(全部)
+        snapshot: 已有的余额快照，为空时重新查询
+    
+    Returns:
+        使用的余额快照，可继续传给预检复用
     """
-    print("\n获取账户余额中...")
+    accounts = ALL_ACCOUNTS if account_type == "all" else (account_type,)
+    if snapshot is None:
+        print("\n获取账户余额中...")
+        snapshot = get_balance_snapshot(accounts)
+    
+    def print_spot():
+        if snapshot.spot:
+            for asset, balance in snapshot.spot.items():
+                print(f"  {asset}: {balance.free:.8f} (可用) / {balance.locked:.8f} (锁定)")
+        else:
+            print("  (空)")
+    
+    def print_funding():
+        if snapshot.funding:
+            for asset, balance in snapshot.funding.items():
+                print(f"  {asset}: {balance.free:.8f} (可用) / {balance.locked:.8f} (锁定) / {balance.freeze:.8f} (冻结)")
+        else:
+            print("  (空)")
+    
+    def print_earn():
+        if snapshot.earn:
+            for asset, balance in snapshot.earn.items():
+                print(f"  {asset}: {balance.flexible:.8f} (活期) / {balance.locked:.8f} (定期)")
+        else:
+            print("  (空)")
     
     if account_type == "all":
-        # 显示所有账户
-        all_balances = get_all_balances()
-        
         # 现货账户
         print("\n" + "="*50)
         print("📊 现货账户 (Spot)")
         print("="*50)
-        spot = all_balances.get("spot", {})
-        if spot:
-            for asset, balance in spot.items():
-                print(f"  {asset}: {balance['free']:.8f} (可用) / {balance['locked']:.8f} (锁定)")
-        else:
-            print("  (空)")
+        print_spot()
         
         # 资金账户
         print("\n" + "="*50)
         print("💰 资金账户 (Funding) - 用于充提/C2C")
         print("="*50)
-        funding = all_balances.get("funding", {})
-        if funding:
-            for asset, balance in funding.items():
-                print(f"  {asset}: {balance['free']:.8f} (可用) / {balance['locked']:.8f} (锁定) / {balance['freeze']:.8f} (冻结)")
-        else:
-            print("  (空)")
+        print_funding()
         
         # 理财账户
         print("\n" + "="*50)
         print("📈 理财账户 (Earn)")
         print("="*50)
-        earn = all_balances.get("earn", {})
-        if earn:
-            for asset, balance in earn.items():
-                print(f"  {asset}: {balance['flexible']:.8f} (活期) / {balance['locked']:.8f} (定期)")
-        else:
-            print("  (空)")
+        print_earn()
         
         # 汇总
         print("\n" + "="*50)
         print("📋 资产汇总")
         print("="*50)
-        summary = {}
-        for asset, balance in spot.items():
-            summary[asset] = summary.get(asset, 0) + balance['free'] + balance['locked']
-        for asset, balance in funding.items():
-            summary[asset] = summary.get(asset, 0) + balance['free'] + balance['locked'] + balance['freeze']
-        for asset, balance in earn.items():
-            summary[asset] = summary.get(asset, 0) + balance['flexible'] + balance['locked']
-        
+        summary = snapshot.totals()
         if summary:
             for asset, total in sorted(summary.items(), key=lambda x: -x[1]):
                 print(f"  {asset}: {total:.8f}")
@@ -609,34 +752,21 @@ def show_balance(account_type: str = "all"):
             print("  无资产")
             
     elif account_type == "spot":
-        balances = get_spot_balance()
         print("\n📊 现货账户余额:")
         print("-" * 40)
-        if balances:
-            for asset, balance in balances.items():
-                print(f"  {asset}: {balance['free']:.8f} (可用) / {balance['locked']:.8f} (锁定)")
-        else:
-            print("  (空)")
+        print_spot()
             
     elif account_type == "funding":
-        balances = get_funding_balance()
         print("\n💰 资金账户余额:")
         print("-" * 40)
-        if balances:
-            for asset, balance in balances.items():
-                print(f"  {asset}: {balance['free']:.8f} (可用) / {balance['locked']:.8f} (锁定)")
-        else:
-            print("  (空)")
+        print_funding()
             
     elif account_type == "earn":
-        balances = get_earn_balance()
         print("\n📈 理财账户余额:")
         print("-" * 40)
-        if balances:
-            for asset, balance in balances.items():
-                print(f"  {asset}: {balance['flexible']:.8f} (活期) / {balance['locked']:.8f} (定期)")
-        else:
-            print("  (空)")
+        print_earn()
+    
+    return snapshot
 
 
 def show_networks(coin: str):
@@ -645,7 +775,7 @@ def show_networks(coin: str):
     info = get_coin_info(coin)
     
     if info:
-        print(f"\n{coin} 支持的提现网络:")
+        print(f"\n{coin} 支持的提现网络 (配置缓存于 {int(coin_config.age)} 秒前):")
         print("-" * 60)
         for network in info.get("networkList", []):
             status = "✓" if network.get("withdrawEnable") else "✗"
@@ -671,12 +801,34 @@ def main():
     parser.add_argument("--withdraw", "-w", action="store_true", help="执行批量提现")
     parser.add_argument("--dry-run", "-d", action="store_true", help="模拟运行，不实际执行提现")
     parser.add_argument("--file", "-f", type=str, default=WITHDRAW_FILE, help="提现地址文件路径")
-    parser.add_argument("--delay", type=float, default=1.0, help="每次提现之间的延迟（秒）")
+    parser.add_argument("--delay", type=float, default=1.0,
+                       help="每次提现之间的延迟（秒）；并发模式下为未收到权重响应头时的兜底间隔")
+    parser.add_argument("--workers", type=int, default=1, help="并发提现线程数，大于 1 时按 SAPI 权重自动限流")
     parser.add_argument("--history", "-H", action="store_true", help="显示提现历史")
+    parser.add_argument("--sync-history", action="store_true", help="同步全部提现历史到本地 SQLite（增量）")
+    parser.add_argument("--since", type=str, help="--sync-history 的起始日期 YYYY-MM-DD，默认从上次同步位置继续")
     parser.add_argument("--test-proxy", "-t", action="store_true", help="测试代理连接")
+    parser.add_argument("--pool-size", type=int, default=DEFAULT_POOL_SIZE, help="HTTP 连接池大小")
+    parser.add_argument("--preflight", "-p", action="store_true", help="只预检提现地址文件，不执行提现")
+    parser.add_argument("--network-stats", nargs="?", const="", metavar="COIN",
+                       help="显示各网络到账耗时分位数（基于已同步的历史）")
+    parser.add_argument("--auto-network", action="store_true",
+                       help="提现时自动改用手续费不增加、历史到账最快的网络")
+    parser.add_argument("--resume", "-r", action="store_true", help="续跑上次中断的批量提现（按提现日志对账后继续）")
+    parser.add_argument("--skip-invalid", action="store_true", help="预检有拒绝行时跳过这些行，继续提现其余行")
+    parser.add_argument("--refresh-config", action="store_true", help="忽略缓存，强制刷新币种/网络配置")
+    parser.add_argument("--recv-window", type=int, default=DEFAULT_RECV_WINDOW, help="签名请求的 recvWindow（毫秒）")
     
     args = parser.parse_args()
     
+    if args.pool_size != client.pool_size:
+        client.mount_pool(args.pool_size)
+    client.recv_window = args.recv_window
+    
+    if args.refresh_config:
+        coin_config.load(force=True)
+        print(f"✓ 已刷新币种配置缓存: {len(coin_config.coins)} 个币种")
+    
     print("\n" + "="*60)
     print("Binance 批量提现工具")
     print("="*60)
@@ -686,7 +838,10 @@ def main():
         return
     
     if args.balance:
-        show_balance(args.account)
+        snapshot = show_balance(args.account)
+        # --balance --preflight: 预检复用同一份余额快照
+        if args.preflight:
+            preflight_withdraw_file(args.file, snapshot=snapshot)
     
     elif args.networks:
         show_networks(args.networks.upper())
@@ -703,9 +858,20 @@ def main():
                 print(f"    网络: {h.get('network')}")
                 print(f"    时间: {h.get('applyTime')}")
                 print()
-        else:
+        elif history is not None:
             print("暂无提现记录")
     
+    elif args.sync_history:
+        sync_withdraw_history(args.since, max(args.workers, 4))
+    
+    elif args.network_stats is not None:
+        show_network_stats(args.network_stats.upper() or None)
+    
+    elif args.preflight:
+        report = preflight_withdraw_file(args.file)
+        if report and report.valid:
+            apply_network_recommendations(report.valid)
+    
     elif args.withdraw:
         # 首先测试代理连接
         if PROXIES and not args.dry_run:
@@ -714,8 +880,39 @@ def main():
                 print("请检查代理配置是否正确")
                 return
         
-        # 加载提现地址
-        addresses = load_withdraw_addresses(args.file)
+        # 提现日志：续跑时对账并跳过已完成的行
+        journal = WithdrawJournal(JOURNAL_FILE)
+        has_batch = journal.load_last_batch()
+        skip_rows = set()
+        if args.resume and not args.dry_run:
+            if not has_batch:
+                print(f"\n{JOURNAL_FILE} 中没有可续跑的批次")
+                return
+            if not reconcile_journal(journal):
+                return
+            args.file = journal.file
+            skip_rows = journal.completed_rows()
+            print(f"续跑批次 {journal.batch_id} ({journal.file})，已完成 {len(skip_rows)} 行")
+        elif has_batch and journal.unresolved() and not args.dry_run:
+            print(f"\n上次批次 {journal.batch_id} 有 {len(journal.unresolved())} 条提现结果未确定")
+            print("请先使用 --resume 对账续跑，避免重复打款")
+            return
+        
+        # 预检并加载提现地址
+        report = preflight_withdraw_file(args.file, skip_rows)
+        if report is None:
+            if not args.dry_run:
+                print("\n预检未完成，无法继续提现操作")
+                return
+            print("⚠ 预检未完成，模拟运行将直接读取文件")
+            addresses = load_withdraw_addresses(args.file)
+        else:
+            if report.rejects and not args.skip_invalid:
+                print(f"\n有 {len(report.rejects)} 行未通过预检，已停止。修正后重试，或加 --skip-invalid 跳过这些行")
+                return
+            addresses = report.valid
+            if args.auto_network:
+                apply_network_recommendations(addresses, auto=True)
         
         if not addresses:
             print("没有找到提现地址，请检查配置文件")
@@ -726,18 +923,24 @@ def main():
             print(f"\n即将执行 {len(addresses)} 个提现任务")
             print("请确认以下信息:")
             for addr in addresses:
-                print(f"  - {addr['coin']} {addr['amount']} -> {addr['address'][:20]}...")
+                print(f"  - {addr['coin']} {addr['amount']} -> {addr['address'][:20]}... ({addr['network'] or '默认'})")
             
             confirm = input("\n确认执行提现? (输入 'yes' 确认): ")
             if confirm.lower() != "yes":
                 print("已取消")
                 return
+            
+            if not args.resume:
+                journal.start_batch(args.file)
+            print(f"提现日志: {JOURNAL_FILE} (批次 {journal.batch_id})")
         
         # 执行批量提现
         results = batch_withdraw(
             addresses=addresses,
             delay=args.delay,
-            dry_run=args.dry_run
+            dry_run=args.dry_run,
+            workers=args.workers,
+            journal=None if args.dry_run else journal
         )
         
         # 保存结果
@@ -752,9 +955,16 @@ def main():
         print("  查看资金余额:   python batch_withdraw.py --balance --account funding")
         print("  查看理财余额:   python batch_withdraw.py --balance --account earn")
         print("  查看网络:       python batch_withdraw.py --networks USDT")
+        print("  预检地址文件:   python batch_withdraw.py --preflight")
+        print("  余额+预检:      python batch_withdraw.py --balance --preflight")
         print("  模拟提现:       python batch_withdraw.py --withdraw --dry-run")
         print("  执行提现:       python batch_withdraw.py --withdraw")
+        print("  续跑中断的提现: python batch_withdraw.py --withdraw --resume")
+        print("  并发提现:       python batch_withdraw.py --withdraw --workers 8")
         print("  查看历史:       python batch_withdraw.py --history")
+        print("  同步全部历史:   python batch_withdraw.py --sync-history")
+        print("  网络到账耗时:   python batch_withdraw.py --network-stats USDT")
+        print("  自动选最快网络: python batch_withdraw.py --withdraw --auto-network")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,83 @@
+"""
+连接池基准测试
+对比「每次请求新建连接」与「共享 BinanceClient 长连接」的单次请求延迟
+"""
+
+import time
+import argparse
+import requests
+from binance_client import BinanceClient
+from mock_server import start_mock_server
+from network_stats import percentile
+
+
+def run_per_call(base_url: str, client: BinanceClient, calls: int) -> list:
+    """旧路径：模块级 requests.get，每次请求新建连接"""
+    latencies = []
+    for _ in range(calls):
+        params = {"timestamp": client.get_timestamp(), "recvWindow": client.recv_window}
+        params["signature"] = client.sign(params)
+        start = time.perf_counter()
+        requests.get(
+            f"{base_url}/api/v3/account",
+            params=params,
+            headers={"X-MBX-APIKEY": client.api_key},
+            timeout=30
+        )
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_pooled(client: BinanceClient, calls: int) -> list:
+    """新路径：共享 Session，连接保持复用"""
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        client.get("/api/v3/account")
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def report(name: str, latencies: list, connections: int):
+    """打印统计结果"""
+    mean = sum(latencies) / len(latencies)
+    print(f"  {name}:")
+    print(f"    平均: {mean * 1000:.2f} ms")
+    print(f"    p50:  {percentile(latencies, 50) * 1000:.2f} ms")
+    print(f"    p99:  {percentile(latencies, 99) * 1000:.2f} ms")
+    print(f"    新建连接数: {connections}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binance 客户端连接池基准测试")
+    parser.add_argument("--calls", type=int, default=100, help="每种模式的请求次数")
+    parser.add_argument("--connect-delay", type=float, default=0.05, help="模拟每个新连接的握手延迟（秒）")
+    parser.add_argument("--pool-size", type=int, default=10, help="连接池大小")
+    args = parser.parse_args()
+
+    server = start_mock_server(connect_delay=args.connect_delay)
+    client = BinanceClient("bench_key", "bench_secret", base_url=server.base_url, pool_size=args.pool_size)
+
+    print(f"替身服务器: {server.base_url}")
+    print(f"请求次数: {args.calls}，模拟握手延迟: {args.connect_delay * 1000:.0f} ms")
+    print("-" * 50)
+
+    try:
+        before = server.connections
+        per_call = run_per_call(server.base_url, client, args.calls)
+        report("每次新建连接 (旧)", per_call, server.connections - before)
+
+        before = server.connections
+        pooled = run_pooled(client, args.calls)
+        report("共享连接池 (新)", pooled, server.connections - before)
+
+        speedup = (sum(per_call) / len(per_call)) / (sum(pooled) / len(pooled))
+        print("-" * 50)
+        print(f"平均延迟提升: {speedup:.1f}x")
+    finally:
+        client.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+批量提现吞吐基准测试
+在本地替身服务器（签名校验、权重限流、注入延迟和 429/-1021）上跑完整的提现路径，
+对比顺序模式与并发模式的 行/秒、单行延迟 p50/p99 和浪费的请求次数
+"""
+
+import io
+import os
+import time
+import argparse
+import tempfile
+from contextlib import redirect_stdout
+
+import batch_withdraw as bw
+from binance_client import BinanceClient
+from coin_config import CoinConfigCache
+from mock_server import start_mock_server
+from network_stats import percentile
+from rate_limiter import SAPI_IP_LIMIT, SAPI_UID_LIMIT
+from time_sync import ServerTimeSync
+
+BENCH_KEY = "bench_key"
+BENCH_SECRET = "bench_secret"
+
+
+def make_rows(count: int) -> list:
+    """生成提现行（与预检通过的行结构相同）"""
+    return [{
+        "row": i + 2,
+        "coin": "USDT",
+        "address": f"0x{i:040x}",
+        "amount": 10 + i / 100,
+        "network": "BSC",
+        "address_tag": None
+    } for i in range(count)]
+
+
+def run_mode(rows: list, workers: int, delay: float, server_options: dict) -> dict:
+    """
+    在全新的替身服务器上跑一轮批量提现
+
+    Args:
+        rows: 提现行
+        workers: 1 为顺序模式，大于 1 为并发模式
+        delay: 顺序模式的间隔 / 并发模式的兜底间隔
+        server_options: 替身服务器参数
+
+    Returns:
+        统计结果
+    """
+    server = start_mock_server(api_key=BENCH_KEY, api_secret=BENCH_SECRET, **server_options)
+    client = BinanceClient(BENCH_KEY, BENCH_SECRET, base_url=server.base_url, pool_size=max(workers, 10))
+    client.time_sync = ServerTimeSync(client)
+    cache_path = os.path.join(tempfile.mkdtemp(), "coin_config_cache.json")
+    bw.client = client
+    bw.coin_config = CoinConfigCache(client, path=cache_path)
+
+    latencies = []
+    execute_withdraw = bw.execute_withdraw
+
+    def timed(addr, dry_run=False, journal=None):
+        start = time.perf_counter()
+        try:
+            return execute_withdraw(addr, dry_run, journal)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    bw.execute_withdraw = timed
+    started = time.perf_counter()
+    try:
+        with redirect_stdout(io.StringIO()):
+            results = bw.batch_withdraw(rows, delay=delay, dry_run=False, workers=workers)
+    finally:
+        bw.execute_withdraw = execute_withdraw
+        client.time_sync.stop()
+        client.close()
+        server.shutdown()
+    elapsed = time.perf_counter() - started
+
+    counters = server.counters
+    wasted = sum(counters.get(key, 0) for key in
+                 ("rejected_429", "injected_429", "rejected_1021", "bad_signature", "bad_api_key"))
+    succeeded = sum(1 for r in results if r["success"])
+    return {
+        "mode": "顺序" if workers == 1 else f"并发 x{workers}",
+        "rows_per_sec": len(rows) / elapsed,
+        "succeeded": succeeded,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "requests": counters.get("requests", 0),
+        "wasted": wasted,
+        # 服务端实际受理数与成功数不一致说明有重复或丢失
+        "accepted": len(server.withdrawals)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Binance 批量提现吞吐基准测试（本地替身服务器）")
+    parser.add_argument("--rows", type=int, default=40, help="提现行数")
+    parser.add_argument("--workers", type=str, default="4,8", help="并发模式的线程数，逗号分隔")
+    parser.add_argument("--delay", type=float, default=1.0, help="顺序模式每行间隔（秒），与 batch_withdraw 默认值相同")
+    parser.add_argument("--latency", type=float, default=0.05, help="每个请求的服务端延迟（秒）")
+    parser.add_argument("--rate-429", type=float, default=0.02, help="随机返回 429 的概率")
+    parser.add_argument("--rate-1021", type=float, default=0.02, help="随机返回 -1021 的概率")
+    parser.add_argument("--clock-offset", type=float, default=0.0, help="服务器时钟偏移（毫秒）")
+    parser.add_argument("--ip-limit", type=int, default=SAPI_IP_LIMIT, help="每分钟 SAPI IP 权重上限")
+    parser.add_argument("--uid-limit", type=int, default=SAPI_UID_LIMIT, help="每分钟 SAPI UID 权重上限")
+    args = parser.parse_args()
+
+    server_options = {
+        "latency": args.latency,
+        "rate_429": args.rate_429,
+        "rate_1021": args.rate_1021,
+        "clock_offset_ms": args.clock_offset,
+        "ip_limit": args.ip_limit,
+        "uid_limit": args.uid_limit
+    }
+    rows = make_rows(args.rows)
+    modes = [1] + [int(w) for w in args.workers.split(",") if w.strip()]
+
+    print(f"提现行数: {args.rows}，服务端延迟: {args.latency * 1000:.0f} ms，"
+          f"注入 429: {args.rate_429:.0%}，注入 -1021: {args.rate_1021:.0%}")
+    print("-" * 78)
+    print(f"  {'模式':<10}{'行/秒':>8}{'成功':>8}{'受理':>8}{'p50':>10}{'p99':>10}{'请求':>8}{'浪费':>8}")
+
+    for workers in modes:
+        r = run_mode(rows, workers, args.delay, server_options)
+        print(f"  {r['mode']:<10}{r['rows_per_sec']:>8.2f}{r['succeeded']:>8}{r['accepted']:>8}"
+              f"{r['p50'] * 1000:>8.0f}ms{r['p99'] * 1000:>8.0f}ms{r['requests']:>8}{r['wasted']:>8}")
+
+    print("-" * 78)
+    print("  受理: 替身服务器实际记录的提现数；浪费: 被 429/-1021/签名错误拒绝的请求数")
+
+
+if __name__ == "__main__":
+    main()
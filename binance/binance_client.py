@@ -0,0 +1,169 @@
+"""
+Binance 签名请求客户端
+所有签名接口共用一个 requests.Session，复用连接池和代理隧道
+"""
+
+import time
+import hmac
+import hashlib
+import requests
+from urllib.parse import urlencode
+from requests.adapters import HTTPAdapter
+
+# Binance API 基础URL
+BASE_URL = "https://api.binance.com"
+
+# 默认连接池大小
+DEFAULT_POOL_SIZE = 10
+# 默认 recvWindow（毫秒）
+DEFAULT_RECV_WINDOW = 5000
+
+
+def is_timestamp_error(response: requests.Response) -> bool:
+    """是否为 -1021 时间戳超出 recvWindow 错误"""
+    if response.status_code != 400:
+        return False
+    try:
+        return response.json().get("code") == -1021
+    except ValueError:
+        return False
+
+
+class BinanceClient:
+    """
+    Binance 签名请求客户端
+
+    所有请求都走同一个 Session：
+    - TCP/TLS 连接保持长连接，不再每次请求重新握手
+    - 通过代理时 CONNECT 隧道随连接一起复用
+    - 连接池大小可配置，供并发提现使用
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        base_url: str = BASE_URL,
+        proxies: dict = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout: float = 30,
+        recv_window: int = DEFAULT_RECV_WINDOW,
+        limiter=None,
+        max_retries: int = 3,
+        time_sync=None
+    ):
+        """
+        Args:
+            api_key: API KEY
+            api_secret: API SECRET
+            base_url: API 基础URL
+            proxies: requests 代理字典
+            pool_size: 连接池大小
+            timeout: 请求超时（秒）
+            recv_window: 签名请求的 recvWindow（毫秒）
+            limiter: SAPI 限流器（SapiRateLimiter），为 None 时不限流
+            max_retries: 被 429/418 拒绝后的最大重试次数
+            time_sync: 服务器时间同步（ServerTimeSync），为 None 时使用本地时间
+        """
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.base_url = base_url.rstrip("/")
+        self.proxies = proxies
+        self.timeout = timeout
+        self.recv_window = recv_window
+        self.pool_size = pool_size
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.time_sync = time_sync
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "X-MBX-APIKEY": api_key,
+            "Content-Type": "application/x-www-form-urlencoded"
+        })
+        self.mount_pool(pool_size)
+
+    def mount_pool(self, pool_size: int):
+        """
+        重新挂载连接池
+
+        Args:
+            pool_size: 每个主机保持的最大连接数
+        """
+        self.pool_size = pool_size
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get_timestamp(self) -> int:
+        """获取当前时间戳（毫秒），配置了时间同步时使用服务器校正时间"""
+        if self.time_sync:
+            return self.time_sync.now(self.recv_window)
+        return int(time.time() * 1000)
+
+    def sign(self, params: dict) -> str:
+        """创建 API 签名"""
+        query_string = urlencode(params)
+        return hmac.new(
+            self.api_secret.encode("utf-8"),
+            query_string.encode("utf-8"),
+            hashlib.sha256
+        ).hexdigest()
+
+    def request(self, method: str, endpoint: str, params: dict = None, signed: bool = True) -> requests.Response:
+        """
+        发送请求
+
+        Args:
+            method: GET / POST / DELETE
+            endpoint: 接口路径，如 /api/v3/account
+            params: 请求参数
+            signed: 是否需要签名
+
+        Returns:
+            requests.Response
+        """
+        limiter = self.limiter if endpoint.startswith("/sapi/") else None
+        attempt = 0
+        resynced = False
+
+        while True:
+            if limiter:
+                limiter.acquire(endpoint)
+            response = self._send(method, endpoint, params, signed)
+            # 429/418 表示请求未被处理，暂停结束后可以安全重试
+            if limiter and limiter.observe(response) and attempt < self.max_retries:
+                attempt += 1
+                continue
+            # -1021 同样未被处理，立即重新对时后重试一次
+            if signed and self.time_sync and not resynced and is_timestamp_error(response):
+                self.time_sync.on_rejection()
+                resynced = True
+                continue
+            return response
+
+    def _send(self, method: str, endpoint: str, params: dict, signed: bool) -> requests.Response:
+        """签名并发出单次请求"""
+        params = dict(params or {})
+        if signed:
+            params["timestamp"] = self.get_timestamp()
+            params["recvWindow"] = self.recv_window
+            params["signature"] = self.sign(params)
+
+        url = f"{self.base_url}{endpoint}"
+        # 显式传入 proxies，避免环境变量中的代理覆盖 Session 配置
+        if method == "GET":
+            return self.session.get(url, params=params, proxies=self.proxies, timeout=self.timeout)
+        return self.session.request(method, url, data=params, proxies=self.proxies, timeout=self.timeout)
+
+    def get(self, endpoint: str, params: dict = None, signed: bool = True) -> requests.Response:
+        """发送 GET 请求"""
+        return self.request("GET", endpoint, params, signed)
+
+    def post(self, endpoint: str, params: dict = None, signed: bool = True) -> requests.Response:
+        """发送 POST 请求"""
+        return self.request("POST", endpoint, params, signed)
+
+    def close(self):
+        """关闭连接池"""
+        self.session.close()
@@ -0,0 +1,230 @@
+"""
+币种/网络配置缓存
+/sapi/v1/capital/config/getall 的磁盘缓存（带 TTL），以及按 (币种, 网络) 建立的内存索引
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+from decimal import Decimal
+from typing import NamedTuple, Optional, Pattern
+
+CONFIG_ENDPOINT = "/sapi/v1/capital/config/getall"
+# 缓存文件
+CACHE_FILE = "coin_config_cache.json"
+# 缓存有效期（秒）
+DEFAULT_TTL = 3600
+# 锁文件超过该时间（秒）视为残留
+LOCK_STALE_SECONDS = 60
+
+
+class NetworkRule(NamedTuple):
+    """单个 (币种, 网络) 的提现规则，数值均为 Decimal"""
+    coin: str
+    network: str
+    name: str
+    is_default: bool
+    withdraw_enable: bool
+    withdraw_min: Decimal
+    withdraw_max: Decimal
+    withdraw_fee: Decimal
+    withdraw_multiple: Decimal
+    address_regex: Optional[Pattern]
+    memo_regex: Optional[Pattern]
+    same_address: bool
+
+
+def _decimal(value) -> Decimal:
+    try:
+        return Decimal(str(value)) if value not in (None, "") else Decimal(0)
+    except ArithmeticError:
+        return Decimal(0)
+
+
+def _compile(pattern: str) -> Optional[Pattern]:
+    if not pattern:
+        return None
+    try:
+        return re.compile(pattern)
+    except re.error:
+        return None
+
+
+class CoinConfigCache:
+    """
+    币种配置缓存
+
+    - 磁盘缓存在 TTL 内跨进程共享，过期后通过锁文件保证只有一个进程去刷新
+    - 刷新时比较内容哈希（类似 ETag），内容未变则只更新时间戳，不重建索引
+    - 内存索引 (coin, network) -> NetworkRule，查询 O(1)
+    """
+
+    def __init__(self, client, path: str = CACHE_FILE, ttl: float = DEFAULT_TTL):
+        """
+        Args:
+            client: BinanceClient
+            path: 缓存文件路径
+            ttl: 缓存有效期（秒）
+        """
+        self.client = client
+        self.path = path
+        self.ttl = ttl
+        self.fetched_at = 0.0
+        self.etag = None
+        self.coins = {}
+        self.index = {}
+        self.defaults = {}
+
+    # ==================== 查询 ====================
+
+    def get_coin(self, coin: str) -> Optional[dict]:
+        """返回币种原始配置（与 getall 返回的单项结构相同）"""
+        self.load()
+        return self.coins.get(coin)
+
+    def all_coins(self) -> list:
+        """返回全部币种原始配置"""
+        self.load()
+        return list(self.coins.values())
+
+    def get_rule(self, coin: str, network: str = None) -> Optional[NetworkRule]:
+        """
+        查询提现规则
+
+        Args:
+            coin: 币种
+            network: 网络，为空时返回该币种的默认网络
+
+        Returns:
+            NetworkRule，不存在时返回 None
+        """
+        self.load()
+        if not network:
+            network = self.defaults.get(coin)
+        return self.index.get((coin, network))
+
+    def networks(self, coin: str) -> list:
+        """返回币种的全部网络规则"""
+        self.load()
+        return [rule for (c, _), rule in self.index.items() if c == coin]
+
+    @property
+    def age(self) -> float:
+        """缓存已存在的秒数"""
+        return time.time() - self.fetched_at
+
+    # ==================== 加载 ====================
+
+    def load(self, force: bool = False):
+        """
+        确保内存索引可用且未过期
+
+        Args:
+            force: 忽略 TTL 强制刷新
+        """
+        if not force and self.index and self.age < self.ttl:
+            return
+
+        if not force and self._load_disk():
+            return
+
+        with _FileLock(self.path + ".lock"):
+            # 拿到锁后再读一次，其它进程可能刚刚刷新过
+            if not force and self._load_disk():
+                return
+            self._refresh()
+
+    def _load_disk(self) -> bool:
+        """从磁盘读取未过期的缓存，成功返回 True"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if time.time() - cached.get("fetched_at", 0) >= self.ttl:
+            return False
+        if cached.get("etag") != self.etag or not self.index:
+            self._build_index(cached["data"])
+        self.etag = cached.get("etag")
+        self.fetched_at = cached["fetched_at"]
+        return True
+
+    def _refresh(self):
+        """从 Binance 拉取配置并写入磁盘"""
+        response = self.client.get(CONFIG_ENDPOINT)
+        if response.status_code != 200:
+            raise RuntimeError(f"获取币种配置失败: {response.text}")
+
+        etag = response.headers.get("ETag") or hashlib.sha256(response.content).hexdigest()
+        data = response.json()
+        if etag != self.etag or not self.index:
+            self._build_index(data)
+        self.etag = etag
+        self.fetched_at = time.time()
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": self.fetched_at, "etag": etag, "data": data}, f)
+        os.replace(tmp_path, self.path)
+
+    def _build_index(self, data: list):
+        """建立 (coin, network) 索引"""
+        coins, index, defaults = {}, {}, {}
+        for item in data:
+            coin = item["coin"]
+            coins[coin] = item
+            for net in item.get("networkList", []):
+                rule = NetworkRule(
+                    coin=coin,
+                    network=net["network"],
+                    name=net.get("name", ""),
+                    is_default=bool(net.get("isDefault")),
+                    withdraw_enable=bool(net.get("withdrawEnable")),
+                    withdraw_min=_decimal(net.get("withdrawMin")),
+                    withdraw_max=_decimal(net.get("withdrawMax")),
+                    withdraw_fee=_decimal(net.get("withdrawFee")),
+                    withdraw_multiple=_decimal(net.get("withdrawIntegerMultiple")),
+                    address_regex=_compile(net.get("addressRegex")),
+                    memo_regex=_compile(net.get("memoRegex")),
+                    same_address=bool(net.get("sameAddress"))
+                )
+                index[(coin, rule.network)] = rule
+                if rule.is_default or coin not in defaults:
+                    defaults[coin] = rule.network
+        self.coins, self.index, self.defaults = coins, index, defaults
+
+
+class _FileLock:
+    """基于 O_EXCL 的跨进程锁文件（兼容 Windows）"""
+
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self.fd = None
+
+    def __enter__(self):
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                self.fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > LOCK_STALE_SECONDS:
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    continue
+                if time.time() > deadline:
+                    raise TimeoutError(f"等待锁文件超时: {self.path}")
+                time.sleep(0.1)
+
+    def __exit__(self, *exc):
+        os.close(self.fd)
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,204 @@
+"""
+提现预写日志（write-ahead journal）
+每条提现在提交前先落盘意图，提交后再落盘结果；崩溃或 Ctrl-C 后可用 --resume 续跑
+"""
+
+import os
+import json
+import time
+import uuid
+import hashlib
+import threading
+
+# 日志文件
+JOURNAL_FILE = "withdraw_journal.jsonl"
+
+# 结果状态
+SUCCESS = "success"
+# 收到了 Binance 的拒绝响应，确定没有提现
+FAILED = "failed"
+# 请求异常（超时/断线），不确定 Binance 是否已受理，需要对账
+UNKNOWN = "unknown"
+
+# 提现历史是最终一致的，刚受理的提现可能要过一会儿才出现在历史中；
+# 意图记录超过该时间 (毫秒) 仍查不到，才确认未被受理
+RECONCILE_GRACE_MS = 5 * 60 * 1000
+
+
+def make_withdraw_order_id(batch_id: str, addr: dict) -> str:
+    """
+    生成确定性的 withdrawOrderId
+
+    同一批次、同一文件行、同一内容总是得到相同的 ID，续跑时重复提交会被 Binance 识别。
+    不包含网络: 续跑时 --auto-network 可能为同一行选出不同的网络，ID 必须保持不变
+
+    Args:
+        batch_id: 批次 ID
+        addr: 提现行，需包含 row 字段（文件行号）
+
+    Returns:
+        32 位十六进制字符串
+    """
+    key = "|".join(str(v) for v in (
+        batch_id, addr["row"], addr["coin"], addr["address"],
+        addr["amount"], addr["address_tag"] or ""
+    ))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+class WithdrawJournal:
+    """
+    追加写入的 JSON Lines 日志，每条记录写入后 fsync
+
+    记录类型:
+    - batch:   新批次开始（batch_id, file）
+    - intent:  即将提交的提现（order_id, row, coin, address, amount, network, address_tag）
+    - outcome: 提交结果（order_id, status, id, response）
+    """
+
+    def __init__(self, path: str = JOURNAL_FILE):
+        self.path = path
+        self.batch_id = None
+        self.file = None
+        self.intents = {}
+        self.outcomes = {}
+        self.lock = threading.Lock()
+
+    # ==================== 写入 ====================
+
+    def _append(self, record: dict):
+        record["time"] = int(time.time() * 1000)
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+        return record
+
+    def start_batch(self, file: str) -> str:
+        """开始新批次，返回 batch_id"""
+        self.batch_id = uuid.uuid4().hex[:12]
+        self.file = file
+        self.intents, self.outcomes = {}, {}
+        self._append({"type": "batch", "batch_id": self.batch_id, "file": file})
+        return self.batch_id
+
+    def record_intent(self, addr: dict) -> str:
+        """
+        提交前记录意图
+
+        Args:
+            addr: 提现行
+
+        Returns:
+            withdrawOrderId
+        """
+        order_id = make_withdraw_order_id(self.batch_id, addr)
+        record = self._append({
+            "type": "intent",
+            "batch_id": self.batch_id,
+            "order_id": order_id,
+            "row": addr["row"],
+            "coin": addr["coin"],
+            "address": addr["address"],
+            "amount": addr["amount"],
+            "network": addr["network"],
+            "address_tag": addr["address_tag"]
+        })
+        self.intents[order_id] = record
+        return order_id
+
+    def record_outcome(self, order_id: str, status: str, withdraw_id: str = None, response=None):
+        """
+        记录提交结果
+
+        Args:
+            order_id: withdrawOrderId
+            status: SUCCESS / FAILED / UNKNOWN
+            withdraw_id: Binance 返回的提现 ID
+            response: 原始响应
+        """
+        record = self._append({
+            "type": "outcome",
+            "batch_id": self.batch_id,
+            "order_id": order_id,
+            "status": status,
+            "id": withdraw_id,
+            "response": response if isinstance(response, (dict, str, type(None))) else str(response)
+        })
+        self.outcomes[order_id] = record
+
+    # ==================== 读取 ====================
+
+    def load_last_batch(self) -> bool:
+        """
+        读取日志中最后一个批次
+
+        崩溃时写了一半的最后一行会被忽略
+
+        Returns:
+            是否存在批次
+        """
+        if not os.path.exists(self.path):
+            return False
+
+        batch_id, file, intents, outcomes = None, None, {}, {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("type") == "batch":
+                    batch_id, file, intents, outcomes = record["batch_id"], record["file"], {}, {}
+                elif record.get("batch_id") != batch_id:
+                    continue
+                elif record["type"] == "intent":
+                    intents[record["order_id"]] = record
+                elif record["type"] == "outcome":
+                    outcomes[record["order_id"]] = record
+
+        self.batch_id, self.file, self.intents, self.outcomes = batch_id, file, intents, outcomes
+        return batch_id is not None
+
+    def unresolved(self) -> list:
+        """已提交意图但没有确定结果（无结果或 UNKNOWN）的记录"""
+        return [intent for order_id, intent in self.intents.items()
+                if self.outcomes.get(order_id, {}).get("status") in (None, UNKNOWN)]
+
+    def completed_rows(self) -> set:
+        """已确定提现成功的文件行号"""
+        return {self.intents[order_id]["row"] for order_id, outcome in self.outcomes.items()
+                if outcome["status"] == SUCCESS and order_id in self.intents}
+
+    def reconcile(self, history: list, grace_ms: int = RECONCILE_GRACE_MS, now_ms: int = None) -> dict:
+        """
+        用提现历史对账未确定的记录
+
+        Args:
+            history: /sapi/v1/capital/withdraw/history 返回的记录
+            grace_ms: 意图记录超过该时间仍查不到才确认未受理
+            now_ms: 当前时间（毫秒），默认本地时间
+
+        Returns:
+            {"found": n, "missing": n, "pending": n, "retry_after": 秒}
+            missing 的记录确认未被受理，续跑时会重新提交；
+            pending 的记录太新、历史中可能还没出现，保持未确定，retry_after 秒后可再次对账
+        """
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        by_order_id = {h.get("withdrawOrderId"): h for h in history if h.get("withdrawOrderId")}
+        found = missing = pending = 0
+        retry_after = 0.0
+        for intent in self.unresolved():
+            entry = by_order_id.get(intent["order_id"])
+            if entry:
+                self.record_outcome(intent["order_id"], SUCCESS, entry.get("id"), {"reconciled": True, **entry})
+                found += 1
+            elif now_ms - intent["time"] >= grace_ms:
+                self.record_outcome(intent["order_id"], FAILED, response="续跑对账: 提现历史中不存在")
+                missing += 1
+            else:
+                pending += 1
+                retry_after = max(retry_after, (intent["time"] + grace_ms - now_ms) / 1000)
+        return {"found": found, "missing": missing, "pending": pending, "retry_after": retry_after}
@@ -0,0 +1,311 @@
+"""
+本地 Binance API 替身服务器
+实现 batch_withdraw.py 用到的接口，带 HMAC 签名校验、SAPI 权重响应头、可注入的延迟和 429/-1021 故障，
+用于基准测试和回归验证，不会触碰真实资金
+"""
+
+import hmac
+import json
+import time
+import random
+import hashlib
+import calendar
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qsl
+from rate_limiter import ENDPOINT_WEIGHTS, SAPI_IP_LIMIT, SAPI_UID_LIMIT
+
+
+# 不需要签名的接口
+UNSIGNED_PATHS = ("/api/v3/time",)
+
+EVM_REGEX = "^(0x)[0-9A-Fa-f]{40}$"
+TRX_REGEX = "^T[1-9A-HJ-NP-Za-km-z]{33}$"
+
+# /sapi/v1/capital/config/getall 示例数据
+COIN_CONFIG = [
+    {
+        "coin": "USDT",
+        "name": "TetherUS",
+        "networkList": [
+            {"network": "BSC", "name": "BNB Smart Chain (BEP20)", "isDefault": False, "withdrawEnable": True,
+             "withdrawMin": "10", "withdrawMax": "10000000", "withdrawFee": "0", "withdrawIntegerMultiple": "0.00000001",
+             "addressRegex": EVM_REGEX, "memoRegex": "", "sameAddress": False},
+            {"network": "TRX", "name": "Tron (TRC20)", "isDefault": True, "withdrawEnable": True,
+             "withdrawMin": "10", "withdrawMax": "10000000", "withdrawFee": "1", "withdrawIntegerMultiple": "0.000001",
+             "addressRegex": TRX_REGEX, "memoRegex": "", "sameAddress": False},
+            {"network": "ETH", "name": "Ethereum (ERC20)", "isDefault": False, "withdrawEnable": True,
+             "withdrawMin": "20", "withdrawMax": "10000000", "withdrawFee": "4", "withdrawIntegerMultiple": "0.000001",
+             "addressRegex": EVM_REGEX, "memoRegex": "", "sameAddress": False},
+            {"network": "ARBITRUM", "name": "Arbitrum One", "isDefault": False, "withdrawEnable": False,
+             "withdrawMin": "1", "withdrawMax": "10000000", "withdrawFee": "0.1", "withdrawIntegerMultiple": "0.000001",
+             "addressRegex": EVM_REGEX, "memoRegex": "", "sameAddress": False},
+        ]
+    },
+    {
+        "coin": "BNB",
+        "name": "BNB",
+        "networkList": [
+            {"network": "BSC", "name": "BNB Smart Chain (BEP20)", "isDefault": True, "withdrawEnable": True,
+             "withdrawMin": "0.01", "withdrawMax": "10000", "withdrawFee": "0.0005", "withdrawIntegerMultiple": "0.00000001",
+             "addressRegex": EVM_REGEX, "memoRegex": "", "sameAddress": False},
+        ]
+    },
+]
+
+
+def _apply_ms(apply_time: str) -> int:
+    return calendar.timegm(time.strptime(apply_time, "%Y-%m-%d %H:%M:%S")) * 1000
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Binance 接口替身，支持 HTTP/1.1 长连接"""
+
+    protocol_version = "HTTP/1.1"
+    # 头部与正文分两次写出，关闭 Nagle 避免 40ms 延迟确认干扰测量
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        # 每个新连接模拟一次 TCP+TLS(+代理 CONNECT) 握手开销
+        self.server.connections += 1
+        if self.server.connect_delay:
+            time.sleep(self.server.connect_delay)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> str:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length).decode("utf-8") if length else ""
+
+    def _gate(self, path: str, raw_params: str):
+        """
+        模拟 Binance 的前置检查：注入延迟、权重限流、签名与时间戳校验
+
+        Returns:
+            (被拒绝时的 (status, payload), 响应头)
+        """
+        server = self.server
+        server.count("requests")
+        if server.latency:
+            time.sleep(server.latency)
+
+        headers = {}
+        if path.startswith("/sapi/"):
+            rejected, headers = server.consume_weight(path)
+            if rejected:
+                return (429, {"code": -1003, "msg": "Too much request weight used."}), headers
+            if server.roll("rate_429"):
+                server.count("injected_429")
+                return (429, {"code": -1003, "msg": "Too many requests."}), dict(headers, **{"Retry-After": 1})
+
+        if path in UNSIGNED_PATHS or server.api_secret is None:
+            return None, headers
+
+        if self.headers.get("X-MBX-APIKEY") != server.api_key:
+            server.count("bad_api_key")
+            return (401, {"code": -2015, "msg": "Invalid API-key, IP, or permissions for action."}), headers
+        payload, _, signature = raw_params.rpartition("&signature=")
+        expected = hmac.new(server.api_secret.encode("utf-8"), payload.encode("utf-8"), hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(signature, expected):
+            server.count("bad_signature")
+            return (400, {"code": -1022, "msg": "Signature for this request is not valid."}), headers
+
+        params = dict(parse_qsl(payload))
+        server_now = server.now_ms()
+        timestamp = int(params.get("timestamp", 0))
+        recv_window = int(params.get("recvWindow", 5000))
+        if timestamp > server_now + 1000 or server_now - timestamp > recv_window or server.roll("rate_1021"):
+            server.count("rejected_1021")
+            return (400, {"code": -1021, "msg": "Timestamp for this request is outside of the recvWindow."}), headers
+        return None, headers
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        path = parsed.path
+        rejection, headers = self._gate(path, parsed.query)
+        if rejection:
+            self._send_json(*rejection, headers=headers)
+            return
+
+        query = dict(parse_qsl(parsed.query))
+        if path == "/api/v3/time":
+            self._send_json(200, {"serverTime": int(self.server.now_ms())})
+        elif path == "/sapi/v1/capital/config/getall":
+            self._send_json(200, COIN_CONFIG, headers)
+        elif path == "/sapi/v1/capital/withdraw/history":
+            offset = int(query.get("offset", 0))
+            limit = int(query.get("limit", 1000))
+            start = int(query.get("startTime", 0))
+            end = int(query.get("endTime", time.time() * 1000))
+            with self.server.lock:
+                history = [w for w in reversed(self.server.withdrawals)
+                           if start <= _apply_ms(w["applyTime"]) <= end]
+            self._send_json(200, history[offset:offset + limit], headers)
+        elif path in ("/sapi/v1/simple-earn/flexible/position", "/sapi/v1/simple-earn/locked/position"):
+            page = int(query.get("current", 1))
+            size = int(query.get("size", 10))
+            rows = self.server.earn_positions
+            self._send_json(200, {"rows": rows[(page - 1) * size:page * size], "total": len(rows)}, headers)
+        elif path == "/api/v3/account":
+            self._send_json(200, {"balances": [{"asset": "USDT", "free": "1000000.0", "locked": "0.0"}]})
+        else:
+            self._send_json(200, {}, headers)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self._read_body()
+        rejection, headers = self._gate(path, body)
+        if rejection:
+            self._send_json(*rejection, headers=headers)
+            return
+
+        params = dict(parse_qsl(body))
+        if path == "/sapi/v1/capital/withdraw/apply":
+            self._send_json(200, {"id": self.server.record_withdrawal(params)}, headers)
+        elif path == "/sapi/v1/asset/get-funding-asset":
+            self._send_json(200, [{"asset": "USDT", "free": "50", "locked": "0", "freeze": "0"}], headers)
+        else:
+            self._send_json(200, {"id": "mock"}, headers)
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        server_address,
+        connect_delay: float = 0.0,
+        clock_offset_ms: float = 0.0,
+        api_key: str = None,
+        api_secret: str = None,
+        latency: float = 0.0,
+        rate_429: float = 0.0,
+        rate_1021: float = 0.0,
+        ip_limit: int = SAPI_IP_LIMIT,
+        uid_limit: int = SAPI_UID_LIMIT
+    ):
+        super().__init__(server_address, MockHandler)
+        self.connect_delay = connect_delay
+        self.clock_offset_ms = clock_offset_ms
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.latency = latency
+        self.rates = {"rate_429": rate_429, "rate_1021": rate_1021}
+        self.ip_limit = ip_limit
+        self.uid_limit = uid_limit
+        self.connections = 0
+        self.withdrawals = []
+        self.lock = threading.Lock()
+        self.random = random.Random(0)
+        # 当前分钟的已用权重
+        self.weight_minute = 0
+        self.used_ip = 0
+        self.used_uid = 0
+        # 计数: requests / rejected_429 / injected_429 / rejected_1021 / bad_signature / bad_api_key
+        self.counters = {}
+        # 理财持仓（活期与定期共用），按页返回
+        self.earn_positions = [
+            {"asset": f"T{i % 50}", "totalAmount": "1", "amount": "2"} for i in range(250)
+        ]
+
+    def now_ms(self) -> float:
+        """服务器时间（毫秒）"""
+        return time.time() * 1000 + self.clock_offset_ms
+
+    def count(self, key: str):
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def roll(self, key: str) -> bool:
+        """按配置的概率决定是否注入故障"""
+        rate = self.rates[key]
+        if not rate:
+            return False
+        with self.lock:
+            return self.random.random() < rate
+
+    def consume_weight(self, path: str) -> tuple:
+        """
+        按接口权重累加当前分钟的已用权重（Binance 按自然分钟重置）
+
+        Returns:
+            (是否超限被拒, 权重响应头)
+        """
+        ip_weight, uid_weight = ENDPOINT_WEIGHTS.get(path, (1, 1))
+        now = time.time()
+        with self.lock:
+            minute = int(now // 60)
+            if minute != self.weight_minute:
+                self.weight_minute, self.used_ip, self.used_uid = minute, 0, 0
+            rejected = self.used_ip + ip_weight > self.ip_limit or self.used_uid + uid_weight > self.uid_limit
+            if rejected:
+                self.counters["rejected_429"] = self.counters.get("rejected_429", 0) + 1
+            else:
+                self.used_ip += ip_weight
+                self.used_uid += uid_weight
+            headers = {"X-SAPI-USED-IP-WEIGHT-1M": self.used_ip, "X-SAPI-USED-UID-WEIGHT-1M": self.used_uid}
+        if rejected:
+            headers["Retry-After"] = max(1, int(60 - now % 60))
+        return rejected, headers
+
+    def record_withdrawal(self, params: dict, apply_time: float = None) -> str:
+        """
+        记录一笔提现，返回提现 ID
+
+        Args:
+            params: 提现请求参数
+            apply_time: 申请时间（秒级时间戳），默认当前时间
+        """
+        with self.lock:
+            withdraw_id = f"mock{len(self.withdrawals) + 1}"
+            self.withdrawals.append({
+                "id": withdraw_id,
+                "amount": params.get("amount"),
+                "coin": params.get("coin"),
+                "address": params.get("address"),
+                "network": params.get("network"),
+                "withdrawOrderId": params.get("withdrawOrderId"),
+                "status": 6,
+                "applyTime": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(apply_time))
+            })
+        return withdraw_id
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, **options) -> MockServer:
+    """
+    在后台线程启动替身服务器
+
+    Args:
+        host: 监听地址
+        port: 监听端口，0 表示随机分配
+        **options: MockServer 的参数
+            connect_delay: 每个新连接的模拟握手延迟（秒）
+            clock_offset_ms: 服务器时钟相对本地的偏移（毫秒）
+            api_key / api_secret: 设置后校验 X-MBX-APIKEY 和 HMAC 签名（以及时间戳）
+            latency: 每个请求的处理延迟（秒）
+            rate_429 / rate_1021: 随机返回 429 / -1021 的概率
+            ip_limit / uid_limit: 每分钟 SAPI 权重上限，超出返回 429
+
+    Returns:
+        MockServer 实例，使用完后调用 shutdown()
+    """
+    server = MockServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,153 @@
+"""
+提现网络到账耗时分析
+基于本地同步的提现历史（withdraw_store），统计各 币种/网络 从申请到完成的耗时分位数，
+并在手续费不高于当前网络的可用网络中推荐最快的网络
+"""
+
+import time
+from calendar import timegm
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+# 参与推荐所需的最少完成记录数
+MIN_SAMPLES = 5
+# 推荐依据的分位数
+DEFAULT_METRIC = "p50"
+# 完成状态
+STATUS_COMPLETED = 6
+
+
+class LatencyStats(NamedTuple):
+    """单个 (币种, 网络) 的到账耗时统计，单位秒"""
+    coin: str
+    network: str
+    count: int
+    p50: float
+    p90: float
+    p99: float
+
+
+class NetworkChoice(NamedTuple):
+    """单行提现的网络推荐结果"""
+    row: int
+    coin: str
+    current: str
+    best: str
+    current_latency: Optional[float]
+    best_latency: float
+
+
+def percentile(values: list, pct: float) -> float:
+    """计算百分位数（最近秩法）"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def network_latency(store, coin: str = None, since_ms: int = None) -> dict:
+    """
+    统计到账耗时
+
+    Args:
+        store: WithdrawHistoryStore
+        coin: 只统计该币种
+        since_ms: 只统计该时间之后申请的提现
+
+    Returns:
+        (coin, network) -> LatencyStats
+    """
+    sql = "SELECT coin, network, apply_time, complete_time FROM withdrawals " \
+          "WHERE status = ? AND complete_time IS NOT NULL"
+    params = [STATUS_COMPLETED]
+    if coin:
+        sql += " AND coin = ?"
+        params.append(coin)
+    if since_ms:
+        sql += " AND apply_time >= ?"
+        params.append(since_ms)
+
+    samples = {}
+    for row in store.conn.execute(sql, params):
+        try:
+            complete_ms = timegm(time.strptime(row["complete_time"], "%Y-%m-%d %H:%M:%S")) * 1000
+        except ValueError:
+            continue
+        latency = (complete_ms - row["apply_time"]) / 1000
+        if latency >= 0:
+            samples.setdefault((row["coin"], row["network"]), []).append(latency)
+
+    return {
+        (c, n): LatencyStats(c, n, len(values), percentile(values, 50), percentile(values, 90), percentile(values, 99))
+        for (c, n), values in samples.items()
+    }
+
+
+def _fits(rule, addr: dict) -> bool:
+    """该网络是否可以直接接收这一行（可提现、地址格式、数量限制）"""
+    amount = addr["amount"]
+    return (
+        rule.withdraw_enable
+        and (not rule.address_regex or bool(rule.address_regex.fullmatch(addr["address"])))
+        and (not addr["address_tag"] or not rule.memo_regex or bool(rule.memo_regex.fullmatch(addr["address_tag"])))
+        and amount >= rule.withdraw_min
+        and (not rule.withdraw_max or amount <= rule.withdraw_max)
+        and (not rule.withdraw_multiple or not amount % rule.withdraw_multiple)
+    )
+
+
+def recommend_networks(addresses: list, coin_config, stats: dict, metric: str = DEFAULT_METRIC) -> list:
+    """
+    为每行提现推荐最快的网络
+
+    候选网络: 同一币种下可提现、手续费不高于当前网络（同档位或更便宜）、地址和数量都符合规则，
+    且至少有 MIN_SAMPLES 条完成记录的网络
+
+    Args:
+        addresses: 预检通过的提现行
+        coin_config: CoinConfigCache
+        stats: network_latency() 的结果
+        metric: 比较的分位数 p50 / p90 / p99
+
+    Returns:
+        NetworkChoice 列表，只包含推荐网络与当前网络不同的行
+    """
+    choices = []
+    # (coin, 当前网络) -> 手续费不高于当前网络的网络
+    tiers = {}
+    for addr in addresses:
+        current = coin_config.get_rule(addr["coin"], addr["network"])
+        if current is None:
+            continue
+        key = (current.coin, current.network)
+        if key not in tiers:
+            tiers[key] = [rule for rule in coin_config.networks(current.coin)
+                          if rule.withdraw_fee <= current.withdraw_fee]
+
+        row = dict(addr, amount=Decimal(str(addr["amount"])))
+        best, best_latency = None, None
+        for rule in tiers[key]:
+            stat = stats.get((rule.coin, rule.network))
+            if not stat or stat.count < MIN_SAMPLES or not _fits(rule, row):
+                continue
+            latency = getattr(stat, metric)
+            if best_latency is None or latency < best_latency:
+                best, best_latency = rule.network, latency
+
+        if best and best != current.network:
+            stat = stats.get(key)
+            current_latency = getattr(stat, metric) if stat and stat.count >= MIN_SAMPLES else None
+            if current_latency is None or best_latency < current_latency:
+                choices.append(NetworkChoice(addr["row"], current.coin, current.network, best,
+                                             current_latency, best_latency))
+    return choices
+
+
+def format_seconds(seconds: Optional[float]) -> str:
+    """耗时转为易读格式"""
+    if seconds is None:
+        return "N/A"
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f}m"
+    return f"{seconds / 3600:.1f}h"
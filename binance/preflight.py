@@ -0,0 +1,173 @@
+"""
+提现地址文件预检
+在发起任何提现之前一次性校验整个 CSV：地址格式、最小数量/手续费/精度、余额是否足够
+"""
+
+import csv
+from decimal import Decimal, InvalidOperation
+
+# 拒绝报告文件
+REJECT_FILE = "preflight_rejects.csv"
+
+# 拒绝原因代码
+BAD_ROW = "BAD_ROW"
+BAD_AMOUNT = "BAD_AMOUNT"
+UNKNOWN_NETWORK = "UNKNOWN_NETWORK"
+WITHDRAW_DISABLED = "WITHDRAW_DISABLED"
+BAD_ADDRESS = "BAD_ADDRESS"
+BAD_MEMO = "BAD_MEMO"
+BELOW_MIN = "BELOW_MIN"
+ABOVE_MAX = "ABOVE_MAX"
+FEE_EXCEEDS_AMOUNT = "FEE_EXCEEDS_AMOUNT"
+BAD_PRECISION = "BAD_PRECISION"
+INSUFFICIENT_BALANCE = "INSUFFICIENT_BALANCE"
+
+
+class PreflightReport:
+    """预检结果"""
+
+    def __init__(self):
+        self.valid = []
+        self.rejects = []
+        # (coin, network) -> {"rows": n, "amount": Decimal, "fee": Decimal}
+        self.totals = {}
+        # coin -> Decimal
+        self.balances = {}
+
+    @property
+    def ok(self) -> bool:
+        return not self.rejects
+
+    def reject(self, line: int, row: dict, code: str, detail: str = ""):
+        self.rejects.append({
+            "row": line,
+            "coin": row.get("coin", ""),
+            "address": row.get("address", ""),
+            "amount": row.get("amount", ""),
+            "network": row.get("network", ""),
+            "code": code,
+            "detail": detail
+        })
+
+    def save_rejects(self, filename: str = REJECT_FILE):
+        """写出机器可读的拒绝报告"""
+        with open(filename, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["row", "coin", "address", "amount", "network", "code", "detail"])
+            writer.writeheader()
+            writer.writerows(self.rejects)
+
+    def print_summary(self):
+        """打印预检汇总"""
+        print(f"\n预检结果: 通过 {len(self.valid)} 行，拒绝 {len(self.rejects)} 行")
+        if self.totals:
+            print("-" * 60)
+            for (coin, network), total in sorted(self.totals.items()):
+                print(f"  {coin}/{network}: {total['rows']} 笔，合计 {total['amount']} (手续费 {total['fee']})")
+        if self.rejects:
+            counts = {}
+            for r in self.rejects:
+                counts[r["code"]] = counts.get(r["code"], 0) + 1
+            print("-" * 60)
+            for code, count in sorted(counts.items(), key=lambda x: -x[1]):
+                print(f"  ✗ {code}: {count} 行")
+
+
+def run_preflight(filename: str, coin_config, balances: dict, skip_rows: set = None) -> PreflightReport:
+    """
+    预检提现地址文件
+
+    按 (币种, 网络) 分组复用规则和已编译的地址正则，单次遍历完成全部校验；
+    余额按文件顺序累加，超出余额的行标记为 INSUFFICIENT_BALANCE。
+
+    Args:
+        filename: CSV 文件路径，格式: coin,address,amount,network,address_tag
+        coin_config: CoinConfigCache
+        balances: 币种 -> 可用余额（提现扣款的钱包快照）
+        skip_rows: 跳过的文件行号（续跑时已完成的行），不校验也不计入余额
+
+    Returns:
+        PreflightReport
+    """
+    report = PreflightReport()
+    report.balances = {coin: Decimal(str(free)) for coin, free in balances.items()}
+    remaining = dict(report.balances)
+    rules = {}
+    skip_rows = skip_rows or set()
+
+    with open(filename, "r", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        # 表头占第 1 行
+        for line, raw in enumerate(reader, 2):
+            if line in skip_rows:
+                continue
+            row = {k: (v or "").strip() for k, v in raw.items() if k}
+            coin = row.get("coin", "").upper()
+            address = row.get("address", "")
+            network = row.get("network", "").upper() or None
+            tag = row.get("address_tag", "") or None
+
+            if not coin or not address:
+                report.reject(line, row, BAD_ROW, "缺少 coin 或 address")
+                continue
+
+            try:
+                amount = Decimal(row.get("amount", ""))
+            except InvalidOperation:
+                report.reject(line, row, BAD_AMOUNT, f"无效数量: {row.get('amount')}")
+                continue
+            if not amount.is_finite() or amount <= 0:
+                report.reject(line, row, BAD_AMOUNT, f"无效数量: {row.get('amount')}")
+                continue
+
+            key = (coin, network)
+            if key not in rules:
+                rules[key] = coin_config.get_rule(coin, network)
+            rule = rules[key]
+
+            if rule is None:
+                report.reject(line, row, UNKNOWN_NETWORK, f"{coin} 不支持网络 {network or '默认'}")
+                continue
+            if not rule.withdraw_enable:
+                report.reject(line, row, WITHDRAW_DISABLED, f"{coin}/{rule.network} 暂停提现")
+                continue
+            if rule.address_regex and not rule.address_regex.fullmatch(address):
+                report.reject(line, row, BAD_ADDRESS, f"地址不符合 {rule.network} 格式")
+                continue
+            if tag and rule.memo_regex and not rule.memo_regex.fullmatch(tag):
+                report.reject(line, row, BAD_MEMO, f"标签不符合 {rule.network} 格式")
+                continue
+            if amount < rule.withdraw_min:
+                report.reject(line, row, BELOW_MIN, f"低于最小提现 {rule.withdraw_min}")
+                continue
+            if rule.withdraw_max and amount > rule.withdraw_max:
+                report.reject(line, row, ABOVE_MAX, f"高于最大提现 {rule.withdraw_max}")
+                continue
+            if amount <= rule.withdraw_fee:
+                report.reject(line, row, FEE_EXCEEDS_AMOUNT, f"数量不足以支付手续费 {rule.withdraw_fee}")
+                continue
+            if rule.withdraw_multiple and amount % rule.withdraw_multiple:
+                report.reject(line, row, BAD_PRECISION, f"数量必须是 {rule.withdraw_multiple} 的整数倍")
+                continue
+
+            # 提现数量从余额中扣除，手续费从提现数量中扣除
+            left = remaining.get(coin, Decimal(0)) - amount
+            if left < 0:
+                report.reject(line, row, INSUFFICIENT_BALANCE, f"{coin} 余额不足，累计超出 {-left}")
+                continue
+            remaining[coin] = left
+
+            total = report.totals.setdefault((coin, rule.network), {"rows": 0, "amount": Decimal(0), "fee": Decimal(0)})
+            total["rows"] += 1
+            total["amount"] += amount
+            total["fee"] += rule.withdraw_fee
+
+            report.valid.append({
+                "row": line,
+                "coin": coin,
+                "address": address,
+                "amount": float(amount),
+                "network": network,
+                "address_tag": tag
+            })
+
+    return report
@@ -0,0 +1,176 @@
+"""
+Binance SAPI 权重限流器
+令牌桶 + 响应头 X-SAPI-USED-*-WEIGHT-1M 实时校正，429/418 时遵守 Retry-After
+"""
+
+import time
+import threading
+
+# SAPI 每分钟权重上限（以 Binance 文档为准）
+SAPI_IP_LIMIT = 12000
+SAPI_UID_LIMIT = 180000
+
+# 各接口权重 (IP 权重, UID 权重)，未列出的按 (1, 1) 计
+ENDPOINT_WEIGHTS = {
+    "/sapi/v1/capital/withdraw/apply": (1, 600),
+    "/sapi/v1/capital/withdraw/history": (1, 18000),
+    "/sapi/v1/capital/config/getall": (10, 1),
+    "/sapi/v1/asset/get-funding-asset": (1, 1),
+    "/sapi/v1/simple-earn/flexible/position": (150, 1),
+    "/sapi/v1/simple-earn/locked/position": (150, 1),
+}
+
+# 保留的安全余量，令桶容量为上限的 90%
+DEFAULT_SAFETY = 0.9
+
+
+class WeightBucket:
+    """单个权重维度（IP 或 UID）的令牌桶"""
+
+    def __init__(self, limit_per_minute: int, safety: float = DEFAULT_SAFETY):
+        """
+        Args:
+            limit_per_minute: 每分钟权重上限
+            safety: 实际使用的比例，留出余量给其它程序
+        """
+        self.capacity = limit_per_minute * safety
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.header_seen = False
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, weight: int, now: float) -> float:
+        """返回获取 weight 个令牌还需等待的秒数"""
+        self._refill(now)
+        if self.tokens >= weight:
+            return 0.0
+        return (weight - self.tokens) / self.rate
+
+    def take(self, weight: int):
+        self.tokens -= weight
+
+    def sync(self, used_weight: int, now: float):
+        """
+        用服务端返回的已用权重校正桶内令牌
+
+        只向下校正：并发响应乱序到达时，旧的较小值不会让令牌虚高
+        """
+        self._refill(now)
+        self.tokens = min(self.tokens, self.capacity - used_weight)
+        self.header_seen = True
+
+
+class SapiRateLimiter:
+    """
+    SAPI 限流器，供 BinanceClient 在每次请求前后调用
+
+    - acquire(): 按接口权重从 IP/UID 两个桶取令牌，不足时阻塞
+    - observe(): 读取响应头校正令牌；429/418 时按 Retry-After 暂停所有线程
+    - 在还没有拿到任何权重响应头之前，按 fallback_interval 兜底控制请求间隔
+    """
+
+    def __init__(
+        self,
+        ip_limit: int = SAPI_IP_LIMIT,
+        uid_limit: int = SAPI_UID_LIMIT,
+        safety: float = DEFAULT_SAFETY,
+        fallback_interval: float = 1.0
+    ):
+        """
+        Args:
+            ip_limit: 每分钟 IP 权重上限
+            uid_limit: 每分钟 UID 权重上限
+            safety: 实际使用的比例
+            fallback_interval: 无权重响应头时的最小请求间隔（秒）
+        """
+        self.ip_bucket = WeightBucket(ip_limit, safety)
+        self.uid_bucket = WeightBucket(uid_limit, safety)
+        self.fallback_interval = fallback_interval
+        self.resume_at = 0.0
+        self.last_request = 0.0
+        self.lock = threading.Lock()
+
+        # 统计
+        self.requests = 0
+        self.throttled = 0
+        self.waited = 0.0
+        self.retry_after_hits = 0
+
+    @property
+    def header_seen(self) -> bool:
+        return self.ip_bucket.header_seen or self.uid_bucket.header_seen
+
+    def acquire(self, endpoint: str):
+        """
+        请求前获取令牌，必要时阻塞
+
+        Args:
+            endpoint: 接口路径
+        """
+        ip_weight, uid_weight = ENDPOINT_WEIGHTS.get(endpoint, (1, 1))
+        waited = False
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                delay = max(
+                    self.resume_at - now,
+                    self.ip_bucket.wait_time(ip_weight, now),
+                    self.uid_bucket.wait_time(uid_weight, now)
+                )
+                if not self.header_seen:
+                    delay = max(delay, self.last_request + self.fallback_interval - now)
+                if delay <= 0:
+                    self.ip_bucket.take(ip_weight)
+                    self.uid_bucket.take(uid_weight)
+                    self.last_request = now
+                    self.requests += 1
+                    if waited:
+                        self.throttled += 1
+                    return
+                self.waited += delay
+            waited = True
+            time.sleep(delay)
+
+    def observe(self, response) -> bool:
+        """
+        请求后根据响应头校正限流状态
+
+        Args:
+            response: requests.Response
+
+        Returns:
+            是否被限流拒绝（429/418），调用方应在暂停结束后重试
+        """
+        now = time.monotonic()
+        headers = response.headers
+        with self.lock:
+            for key, value in headers.items():
+                key = key.upper()
+                if not key.endswith("-WEIGHT-1M"):
+                    continue
+                if key.startswith("X-SAPI-USED-IP-WEIGHT"):
+                    self.ip_bucket.sync(int(value), now)
+                elif key.startswith("X-SAPI-USED-UID-WEIGHT"):
+                    self.uid_bucket.sync(int(value), now)
+
+            if response.status_code in (418, 429):
+                retry_after = float(headers.get("Retry-After") or 60)
+                self.resume_at = max(self.resume_at, now + retry_after)
+                self.retry_after_hits += 1
+                return True
+        return False
+
+    def stats(self) -> dict:
+        """返回限流统计"""
+        return {
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "waited_seconds": round(self.waited, 3),
+            "retry_after_hits": self.retry_after_hits,
+            "ip_tokens": round(self.ip_bucket.tokens, 1),
+            "uid_tokens": round(self.uid_bucket.tokens, 1)
+        }
@@ -0,0 +1,60 @@
+import sys
+import types
+
+import pytest
+
+from journal import WithdrawJournal, RECONCILE_GRACE_MS, SUCCESS
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload):
+        self.status_code = status_code
+        self.payload = payload
+        self.text = str(payload)
+
+    def json(self):
+        return self.payload
+
+
+@pytest.fixture
+def batch_withdraw(monkeypatch):
+    """导入 batch_withdraw（脚本在模块级读取 config.py，这里提供不带代理的测试配置）"""
+    config = types.ModuleType("config")
+    config.API_KEY, config.API_SECRET, config.WHITELIST_PROXY = "key", "secret", ""
+    monkeypatch.setitem(sys.modules, "config", config)
+    import batch_withdraw
+    return batch_withdraw
+
+
+@pytest.fixture
+def journal(tmp_path):
+    """上一批次留下一条超过宽限期、结果未确定的提现记录"""
+    journal = WithdrawJournal(str(tmp_path / "journal.jsonl"))
+    journal.start_batch("addresses.csv")
+    order_id = journal.record_intent({"row": 2, "coin": "USDT", "address": "0x" + "ab" * 20, "amount": "10",
+                                      "network": "BSC", "address_tag": None})
+    journal.intents[order_id]["time"] -= 2 * RECONCILE_GRACE_MS
+    return journal
+
+
+@pytest.mark.parametrize("response", [
+    FakeResponse(500, {"msg": "Internal error"}),
+    FakeResponse(200, {"code": -1021, "msg": "Timestamp for this request is outside of the recvWindow."}),
+])
+def test_failed_history_read_leaves_intents_unresolved(batch_withdraw, journal, monkeypatch, response):
+    monkeypatch.setattr(batch_withdraw.client, "get", lambda endpoint, params=None, signed=True: response)
+
+    assert batch_withdraw.get_withdraw_history(limit=1000) is None
+    assert not batch_withdraw.reconcile_journal(journal)
+    assert len(journal.unresolved()) == 1
+    assert journal.completed_rows() == set()
+
+
+def test_reconcile_with_history(batch_withdraw, journal, monkeypatch):
+    order_id = journal.unresolved()[0]["order_id"]
+    history = [{"withdrawOrderId": order_id, "id": "w1"}]
+    monkeypatch.setattr(batch_withdraw.client, "get",
+                        lambda endpoint, params=None, signed=True: FakeResponse(200, history))
+
+    assert batch_withdraw.reconcile_journal(journal)
+    assert journal.outcomes[order_id]["status"] == SUCCESS
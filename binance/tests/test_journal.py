@@ -0,0 +1,68 @@
+import pytest
+
+from journal import (WithdrawJournal, make_withdraw_order_id, RECONCILE_GRACE_MS,
+                     SUCCESS, FAILED, UNKNOWN)
+
+
+def make_addr(row, network="BSC"):
+    return {"row": row, "coin": "USDT", "address": f"0x{row:040x}", "amount": "10",
+            "network": network, "address_tag": None}
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = WithdrawJournal(str(tmp_path / "journal.jsonl"))
+    journal.start_batch("addresses.csv")
+    return journal
+
+
+def test_order_id_is_deterministic_and_independent_of_network():
+    assert make_withdraw_order_id("b1", make_addr(2)) == make_withdraw_order_id("b1", make_addr(2))
+    assert make_withdraw_order_id("b1", make_addr(2, "BSC")) == make_withdraw_order_id("b1", make_addr(2, "TRX"))
+    assert make_withdraw_order_id("b1", make_addr(2)) != make_withdraw_order_id("b1", make_addr(3))
+    assert make_withdraw_order_id("b1", make_addr(2)) != make_withdraw_order_id("b2", make_addr(2))
+
+
+def test_reload_ignores_torn_last_line(journal):
+    order_id = journal.record_intent(make_addr(2))
+    journal.record_outcome(order_id, SUCCESS, "w1")
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"type": "outcome", "batch_')
+
+    reloaded = WithdrawJournal(journal.path)
+    assert reloaded.load_last_batch()
+    assert reloaded.batch_id == journal.batch_id
+    assert reloaded.completed_rows() == {2}
+
+
+def test_reconcile_found_in_history_is_success(journal):
+    order_id = journal.record_intent(make_addr(2))
+    journal.record_outcome(order_id, UNKNOWN, response="timeout")
+
+    summary = journal.reconcile([{"withdrawOrderId": order_id, "id": "w1"}])
+    assert summary["found"] == 1
+    assert journal.outcomes[order_id]["status"] == SUCCESS
+    assert journal.completed_rows() == {2}
+    assert journal.unresolved() == []
+
+
+def test_reconcile_keeps_recent_missing_intent_unknown(journal):
+    order_id = journal.record_intent(make_addr(2))
+    journal.record_outcome(order_id, UNKNOWN, response="timeout")
+    now_ms = journal.intents[order_id]["time"] + 1000
+
+    summary = journal.reconcile([], now_ms=now_ms)
+    assert summary["missing"] == 0
+    assert summary["pending"] == 1
+    assert summary["retry_after"] == pytest.approx((RECONCILE_GRACE_MS - 1000) / 1000)
+    assert [i["order_id"] for i in journal.unresolved()] == [order_id]
+
+
+def test_reconcile_marks_old_missing_intent_failed(journal):
+    order_id = journal.record_intent(make_addr(2))
+    now_ms = journal.intents[order_id]["time"] + RECONCILE_GRACE_MS
+
+    summary = journal.reconcile([], now_ms=now_ms)
+    assert summary == {"found": 0, "missing": 1, "pending": 0, "retry_after": 0.0}
+    assert journal.outcomes[order_id]["status"] == FAILED
+    assert journal.unresolved() == []
@@ -0,0 +1,69 @@
+import re
+import csv
+from decimal import Decimal
+
+from coin_config import NetworkRule
+from preflight import (run_preflight, BAD_ROW, BAD_AMOUNT, UNKNOWN_NETWORK, WITHDRAW_DISABLED, BAD_ADDRESS,
+                       BELOW_MIN, FEE_EXCEEDS_AMOUNT, BAD_PRECISION, INSUFFICIENT_BALANCE)
+
+BSC = NetworkRule(coin="USDT", network="BSC", name="BNB Smart Chain", is_default=True, withdraw_enable=True,
+                  withdraw_min=Decimal("10"), withdraw_max=Decimal("0"), withdraw_fee=Decimal("0.5"),
+                  withdraw_multiple=Decimal("0.01"), address_regex=re.compile(r"0x[0-9a-fA-F]{40}"),
+                  memo_regex=None, same_address=False)
+TRX = BSC._replace(network="TRX", name="Tron", is_default=False, withdraw_enable=False)
+
+
+class FakeCoinConfig:
+    rules = {("USDT", "BSC"): BSC, ("USDT", "TRX"): TRX}
+
+    def get_rule(self, coin, network=None):
+        return self.rules.get((coin, network or "BSC"))
+
+
+def write_rows(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["coin", "address", "amount", "network", "address_tag"])
+        writer.writerows(rows)
+
+
+ADDRESS = "0x" + "ab" * 20
+
+
+def test_rejects_each_rule(tmp_path):
+    path = tmp_path / "addresses.csv"
+    write_rows(path, [
+        ["USDT", ADDRESS, "20", "BSC", ""],        # 2 通过
+        ["", ADDRESS, "20", "BSC", ""],            # 3 缺少币种
+        ["USDT", ADDRESS, "abc", "BSC", ""],       # 4
+        ["USDT", ADDRESS, "20", "ETH", ""],        # 5
+        ["USDT", ADDRESS, "20", "TRX", ""],        # 6
+        ["USDT", "0x1234", "20", "BSC", ""],       # 7
+        ["USDT", ADDRESS, "5", "BSC", ""],         # 8
+        ["USDT", ADDRESS, "20.001", "BSC", ""],    # 9
+    ])
+    report = run_preflight(str(path), FakeCoinConfig(), {"USDT": 100})
+    assert [r["row"] for r in report.valid] == [2]
+    assert [(r["row"], r["code"]) for r in report.rejects] == [
+        (3, BAD_ROW), (4, BAD_AMOUNT), (5, UNKNOWN_NETWORK), (6, WITHDRAW_DISABLED),
+        (7, BAD_ADDRESS), (8, BELOW_MIN), (9, BAD_PRECISION)]
+    assert not report.ok
+
+
+def test_fee_exceeds_amount(tmp_path):
+    path = tmp_path / "addresses.csv"
+    write_rows(path, [["USDT", ADDRESS, "0.5", "BSC", ""]])
+    rules = {("USDT", "BSC"): BSC._replace(withdraw_min=Decimal("0"))}
+    config = FakeCoinConfig()
+    config.rules = rules
+    report = run_preflight(str(path), config, {"USDT": 100})
+    assert [r["code"] for r in report.rejects] == [FEE_EXCEEDS_AMOUNT]
+
+
+def test_balance_is_consumed_in_file_order_and_skip_rows(tmp_path):
+    path = tmp_path / "addresses.csv"
+    write_rows(path, [["USDT", ADDRESS, "40", "", ""]] * 4)
+    report = run_preflight(str(path), FakeCoinConfig(), {"USDT": "100"}, skip_rows={2})
+    assert [r["row"] for r in report.valid] == [3, 4]
+    assert [(r["row"], r["code"]) for r in report.rejects] == [(5, INSUFFICIENT_BALANCE)]
+    assert report.totals[("USDT", "BSC")] == {"rows": 2, "amount": Decimal("80"), "fee": Decimal("1.0")}
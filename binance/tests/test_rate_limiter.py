@@ -0,0 +1,48 @@
+import time
+
+from rate_limiter import WeightBucket, SapiRateLimiter
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def test_bucket_waits_for_refill():
+    bucket = WeightBucket(600, safety=1.0)
+    now = bucket.updated
+    assert bucket.wait_time(600, now) == 0.0
+    bucket.take(600)
+    # 每秒补充 10 个
+    assert bucket.wait_time(100, now) == 10.0
+    assert bucket.wait_time(100, now + 10) == 0.0
+
+
+def test_bucket_refill_is_capped_at_capacity():
+    bucket = WeightBucket(600, safety=0.5)
+    bucket._refill(bucket.updated + 3600)
+    assert bucket.tokens == 300
+
+
+def test_sync_only_lowers_tokens():
+    bucket = WeightBucket(600, safety=1.0)
+    now = bucket.updated
+    bucket.sync(200, now)
+    assert bucket.tokens == 400
+    assert bucket.header_seen
+    # 乱序到达的旧响应（已用权重更小）不会让令牌变多
+    bucket.sync(50, now)
+    assert bucket.tokens == 400
+
+
+def test_observe_headers_and_retry_after():
+    limiter = SapiRateLimiter(ip_limit=1000, uid_limit=1000, safety=1.0)
+    assert not limiter.observe(FakeResponse(headers={"x-sapi-used-ip-weight-1m": "300"}))
+    assert limiter.header_seen
+    assert limiter.ip_bucket.tokens <= 700
+
+    before = time.monotonic()
+    assert limiter.observe(FakeResponse(429, {"Retry-After": "30"}))
+    assert limiter.retry_after_hits == 1
+    assert limiter.resume_at >= before + 30
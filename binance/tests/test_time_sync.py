@@ -0,0 +1,50 @@
+from time_sync import ServerTimeSync, ALPHA, MAX_AHEAD_MS
+
+
+def make_sync(samples):
+    """按顺序返回给定 (offset_ms, rtt_ms) 采样的 ServerTimeSync"""
+    sync = ServerTimeSync(client=None)
+    samples = iter(samples)
+    sync._sample = lambda: next(samples)
+    return sync
+
+
+def test_initial_sync_uses_lowest_rtt_sample():
+    sync = make_sync([(500, 80), (300, 20), (900, 200)])
+    assert sync.sync(3)
+    assert (sync.offset_ms, sync.rtt_ms) == (300, 20)
+
+
+def test_later_samples_are_smoothed():
+    sync = make_sync([(1000, 40), (2000, 60)])
+    sync.sync()
+    sync.sync()
+    assert sync.offset_ms == 1000 + ALPHA * 1000
+    assert sync.rtt_ms == 40 + ALPHA * 20
+
+
+def test_reset_replaces_estimate():
+    sync = make_sync([(1000, 40), (2000, 60)])
+    sync.sync()
+    sync.sync(reset=True)
+    assert (sync.offset_ms, sync.rtt_ms) == (2000, 60)
+
+
+def test_sync_fails_when_every_sample_fails():
+    sync = ServerTimeSync(client=None)
+
+    def fail():
+        raise ConnectionError("down")
+
+    sync._sample = fail
+    assert not sync.sync(2)
+    assert not sync.synced
+    assert sync.offset_ms == 0.0
+
+
+def test_rejected_rules():
+    arrival = 1_000_000
+    assert ServerTimeSync._rejected(arrival + MAX_AHEAD_MS + 1, arrival, 5000)
+    assert not ServerTimeSync._rejected(arrival + MAX_AHEAD_MS, arrival, 5000)
+    assert ServerTimeSync._rejected(arrival - 5001, arrival, 5000)
+    assert not ServerTimeSync._rejected(arrival - 5000, arrival, 5000)
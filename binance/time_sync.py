@@ -0,0 +1,151 @@
+"""
+Binance 服务器时间同步
+采样 /api/v3/time，维护平滑后的时钟偏移和 RTT，签名请求使用校正后的时间戳
+"""
+
+import time
+import threading
+
+# 服务器时间接口
+TIME_ENDPOINT = "/api/v3/time"
+# 时间戳超前服务器超过该值（毫秒）会被拒绝
+MAX_AHEAD_MS = 1000
+# 初次同步的采样次数，取 RTT 最小的一次
+INITIAL_SAMPLES = 5
+# 平滑系数
+ALPHA = 0.2
+
+
+class ServerTimeSync:
+    """
+    服务器时钟偏移估计
+
+    offset = 服务器时间 - 本地时间，按 NTP 方式用 RTT 中点估计，
+    初次同步取多次采样中 RTT 最小的一次，之后用 EWMA 平滑。
+    首次调用 now() 时自动同步并启动后台线程定期重新同步。
+    """
+
+    def __init__(self, client, interval: float = 60.0):
+        """
+        Args:
+            client: BinanceClient，用于请求 /api/v3/time
+            interval: 后台重新同步间隔（秒）
+        """
+        self.client = client
+        self.interval = interval
+        self.offset_ms = 0.0
+        self.rtt_ms = 0.0
+        self.synced = False
+        self.lock = threading.Lock()
+        self.start_lock = threading.Lock()
+        self.thread = None
+        self.stop_event = threading.Event()
+
+        # 统计
+        self.samples = 0
+        self.avoided = 0
+        self.rejections = 0
+
+    def _sample(self):
+        """采样一次，返回 (offset_ms, rtt_ms)"""
+        t0 = time.time() * 1000
+        response = self.client.get(TIME_ENDPOINT, signed=False)
+        t1 = time.time() * 1000
+        response.raise_for_status()
+        server_time = response.json()["serverTime"]
+        rtt = t1 - t0
+        return server_time - (t0 + rtt / 2), rtt
+
+    def sync(self, samples: int = 1, reset: bool = False) -> bool:
+        """
+        同步时钟
+
+        Args:
+            samples: 采样次数，取 RTT 最小的一次
+            reset: 直接采用本次结果，不做平滑
+
+        Returns:
+            是否同步成功
+        """
+        best = None
+        for _ in range(samples):
+            try:
+                result = self._sample()
+            except Exception as e:
+                print(f"⚠ 服务器时间同步失败: {e}")
+                continue
+            if best is None or result[1] < best[1]:
+                best = result
+        if best is None:
+            return False
+
+        offset, rtt = best
+        with self.lock:
+            if self.synced and not reset:
+                self.offset_ms += ALPHA * (offset - self.offset_ms)
+                self.rtt_ms += ALPHA * (rtt - self.rtt_ms)
+            else:
+                self.offset_ms, self.rtt_ms = offset, rtt
+                self.synced = True
+            self.samples += 1
+        return True
+
+    def start(self):
+        """初次同步并启动后台重新同步线程"""
+        with self.start_lock:
+            if self.thread:
+                return
+            self.sync(INITIAL_SAMPLES)
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """停止后台线程"""
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.sync()
+
+    def now(self, recv_window: int) -> int:
+        """
+        返回校正后的时间戳（毫秒），并统计未校正时间戳本会被拒绝的次数
+
+        Args:
+            recv_window: 本次请求的 recvWindow
+
+        Returns:
+            时间戳（毫秒）
+        """
+        if not self.thread:
+            self.start()
+        local = time.time() * 1000
+        with self.lock:
+            corrected = local + self.offset_ms
+            # 请求到达服务器时的服务器时间
+            arrival = corrected + self.rtt_ms / 2
+            if self.synced and self._rejected(local, arrival, recv_window) \
+                    and not self._rejected(corrected, arrival, recv_window):
+                self.avoided += 1
+        return int(corrected)
+
+    @staticmethod
+    def _rejected(timestamp: float, arrival: float, recv_window: int) -> bool:
+        """按 Binance 规则判断时间戳是否会被拒绝（-1021）"""
+        return timestamp > arrival + MAX_AHEAD_MS or arrival - timestamp > recv_window
+
+    def on_rejection(self):
+        """收到 -1021 后立即重新同步"""
+        with self.lock:
+            self.rejections += 1
+        self.sync(INITIAL_SAMPLES, reset=True)
+
+    def stats(self) -> dict:
+        """返回同步统计"""
+        return {
+            "offset_ms": round(self.offset_ms, 1),
+            "rtt_ms": round(self.rtt_ms, 1),
+            "samples": self.samples,
+            "avoided": self.avoided,
+            "rejections": self.rejections
+        }
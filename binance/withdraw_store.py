@@ -0,0 +1,253 @@
+"""
+提现历史本地存储
+按 90 天时间窗口并发拉取全部提现历史，写入 SQLite（按 id / txId / 地址 / 状态建索引），之后增量同步
+"""
+
+import json
+import sqlite3
+import time
+from calendar import timegm
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+HISTORY_ENDPOINT = "/sapi/v1/capital/withdraw/history"
+# 数据库文件
+DB_FILE = "withdraw_history.db"
+# Binance 单次查询的最大时间跨度
+WINDOW_MS = 90 * 24 * 3600 * 1000
+# 每页最大条数
+PAGE_LIMIT = 1000
+# 首次同步的默认起点（Binance 上线时间）
+DEFAULT_SINCE = "2017-07-01"
+# 增量同步时向前多取的时间，覆盖本地与服务器的时钟差
+OVERLAP_MS = 60 * 1000
+
+# 提现状态: 0 邮件已发送, 1 已取消, 2 等待确认, 3 被拒绝, 4 处理中, 5 失败, 6 完成
+FINAL_STATUSES = (1, 3, 5, 6)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS withdrawals (
+    id TEXT PRIMARY KEY,
+    tx_id TEXT,
+    address TEXT,
+    address_tag TEXT,
+    coin TEXT,
+    network TEXT,
+    amount TEXT,
+    transaction_fee TEXT,
+    status INTEGER,
+    apply_time INTEGER,
+    complete_time TEXT,
+    withdraw_order_id TEXT,
+    info TEXT,
+    raw TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_withdrawals_tx_id ON withdrawals (tx_id);
+CREATE INDEX IF NOT EXISTS idx_withdrawals_address ON withdrawals (address);
+CREATE INDEX IF NOT EXISTS idx_withdrawals_status ON withdrawals (status);
+CREATE INDEX IF NOT EXISTS idx_withdrawals_apply_time ON withdrawals (apply_time);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def parse_apply_time(value: str) -> int:
+    """applyTime（UTC，"YYYY-MM-DD HH:MM:SS"）转毫秒时间戳"""
+    return timegm(time.strptime(value, "%Y-%m-%d %H:%M:%S")) * 1000
+
+
+def parse_date(value: str) -> int:
+    """"YYYY-MM-DD"（UTC）转毫秒时间戳"""
+    return timegm(datetime.strptime(value, "%Y-%m-%d").timetuple()) * 1000
+
+
+def split_windows(start_ms: int, end_ms: int, window_ms: int = WINDOW_MS) -> list:
+    """
+    把 [start_ms, end_ms] 切成不超过 window_ms 的时间窗口
+
+    Returns:
+        [(start, end), ...]，相邻窗口不重叠
+    """
+    windows = []
+    while start_ms <= end_ms:
+        windows.append((start_ms, min(start_ms + window_ms - 1, end_ms)))
+        start_ms += window_ms
+    return windows
+
+
+class WithdrawHistoryStore:
+    """SQLite 提现历史，只在创建它的线程中使用"""
+
+    def __init__(self, path: str = DB_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # ==================== 写入 ====================
+
+    def upsert(self, rows: list) -> int:
+        """
+        写入或更新提现记录
+
+        Args:
+            rows: /sapi/v1/capital/withdraw/history 返回的记录
+
+        Returns:
+            写入的条数
+        """
+        records = [(
+            row["id"],
+            row.get("txId"),
+            row.get("address"),
+            row.get("addressTag"),
+            row.get("coin"),
+            row.get("network"),
+            row.get("amount"),
+            row.get("transactionFee"),
+            row.get("status"),
+            parse_apply_time(row["applyTime"]),
+            row.get("completeTime"),
+            row.get("withdrawOrderId"),
+            row.get("info"),
+            json.dumps(row, ensure_ascii=False)
+        ) for row in rows]
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO withdrawals (id, tx_id, address, address_tag, coin, network, amount, transaction_fee,
+                                         status, apply_time, complete_time, withdraw_order_id, info, raw)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    tx_id = excluded.tx_id,
+                    status = excluded.status,
+                    complete_time = excluded.complete_time,
+                    info = excluded.info,
+                    raw = excluded.raw
+            """, records)
+        return len(records)
+
+    def set_state(self, key: str, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def delete_state(self, key: str):
+        with self.conn:
+            self.conn.execute("DELETE FROM sync_state WHERE key = ?", (key,))
+
+    def get_state(self, key: str, default=None):
+        row = self.conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    # ==================== 查询 ====================
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM withdrawals").fetchone()[0]
+
+    def last_apply_time(self):
+        """已同步的最新 applyTime（毫秒），没有记录时返回 None"""
+        return self.conn.execute("SELECT MAX(apply_time) FROM withdrawals").fetchone()[0]
+
+    def oldest_pending_time(self):
+        """最早一笔未到终态的提现 applyTime（毫秒），状态可能已变化需要重新拉取"""
+        placeholders = ",".join("?" * len(FINAL_STATUSES))
+        return self.conn.execute(
+            f"SELECT MIN(apply_time) FROM withdrawals WHERE status NOT IN ({placeholders})", FINAL_STATUSES
+        ).fetchone()[0]
+
+    def find(self, address: str = None, tx_id: str = None, status: int = None, withdraw_id: str = None,
+             limit: int = 100) -> list:
+        """
+        按索引字段查询，按 applyTime 倒序
+
+        Returns:
+            原始记录列表
+        """
+        conditions, params = [], []
+        for column, value in (("address", address), ("tx_id", tx_id), ("status", status), ("id", withdraw_id)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self.conn.execute(
+            f"SELECT raw FROM withdrawals {where} ORDER BY apply_time DESC LIMIT ?", (*params, limit)
+        ).fetchall()
+        return [json.loads(row["raw"]) for row in rows]
+
+
+def _fetch_window(client, start_ms: int, end_ms: int) -> tuple:
+    """拉取一个时间窗口的全部分页，返回 (rows, pages)"""
+    rows, pages = [], 0
+    while True:
+        params = {"startTime": start_ms, "endTime": end_ms, "limit": PAGE_LIMIT}
+        if rows:
+            params["offset"] = len(rows)
+        response = client.get(HISTORY_ENDPOINT, params)
+        if response.status_code != 200:
+            raise RuntimeError(f"获取提现历史失败: {response.text}")
+        page = response.json()
+        rows.extend(page)
+        pages += 1
+        if len(page) < PAGE_LIMIT:
+            return rows, pages
+
+
+def sync_history(client, store: WithdrawHistoryStore, since_ms: int = None, workers: int = 4) -> dict:
+    """
+    同步提现历史到本地
+
+    起点: 指定 since_ms 时从该时间开始；否则取上次同步的最新 applyTime、
+    最早一笔未到终态的提现、上次失败窗口的起点中最早的；首次同步从 DEFAULT_SINCE 开始。
+    各时间窗口并发拉取，速率由 client.limiter 按 SAPI 权重控制。
+
+    Args:
+        client: BinanceClient
+        store: WithdrawHistoryStore
+        since_ms: 起始时间（毫秒）
+        workers: 并发线程数
+
+    Returns:
+        {"windows": n, "pages": n, "rows": n, "failed": n, "start": ms, "end": ms}
+    """
+    end_ms = int(time.time() * 1000)
+    if since_ms is None:
+        # 上次同步没有新记录时，last_apply_time 可能为空，用 synced_at 兜底
+        candidates = [int(t) for t in (store.last_apply_time(), store.oldest_pending_time(),
+                                       store.get_state("resync_from"), store.get_state("synced_at"))
+                      if t is not None]
+        since_ms = min(candidates) - OVERLAP_MS if candidates else parse_date(DEFAULT_SINCE)
+
+    windows = split_windows(since_ms, end_ms)
+    summary = {"windows": len(windows), "pages": 0, "rows": 0, "failed": 0, "start": since_ms, "end": end_ms}
+
+    failed_from = None
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(_fetch_window, client, start, end): (start, end) for start, end in windows}
+        for future in as_completed(futures):
+            start, end = futures[future]
+            try:
+                rows, pages = future.result()
+            except Exception as e:
+                summary["failed"] += 1
+                failed_from = start if failed_from is None else min(failed_from, start)
+                print(f"✗ {_format_ms(start)} ~ {_format_ms(end)}: {e}")
+                continue
+            # SQLite 写入只在当前线程进行
+            summary["rows"] += store.upsert(rows)
+            summary["pages"] += pages
+
+    # 失败的窗口下次从其起点重新拉取
+    if failed_from is not None:
+        store.set_state("resync_from", failed_from)
+    else:
+        store.delete_state("resync_from")
+    store.set_state("synced_at", end_ms)
+    return summary
+
+
+def _format_ms(ms: int) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(ms / 1000))
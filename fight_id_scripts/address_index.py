@@ -0,0 +1,166 @@
+"""
+私钥 → 地址索引
+secp256k1 公钥推导是各脚本启动时最主要的 CPU 开销，同一个私钥每次运行、每个步骤都在重复推导。
+索引文件按私钥指纹 (sha256，不保存私钥本身) 记录地址，首次建立时在进程池中并行推导，
+之后 wallet.txt 新增的私钥才需要推导。
+文件带整体校验和，读取时再抽查几条重新推导，不一致则丢弃重建
+"""
+
+import os
+import json
+import random
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from eth_account import Account
+
+from parallel import parallel_map
+
+try:
+    from config import ADDRESS_INDEX_FILE
+except ImportError:
+    ADDRESS_INDEX_FILE = "wallet_index.json"
+
+# ==================== 配置 ====================
+# 推导进程数，默认 CPU 核数
+DERIVE_WORKERS = os.cpu_count() or 1
+# 少于该数量的私钥直接在当前进程推导（启动进程池的开销更大）
+MIN_PARALLEL = 256
+# 读取时抽查重新推导的条数
+VERIFY_SAMPLES = 2
+INDEX_VERSION = 1
+
+
+def normalize_key(private_key: str) -> str:
+    """统一为小写 0x 开头的私钥字符串"""
+    key = private_key.strip().lower()
+    return key if key.startswith('0x') else '0x' + key
+
+
+def fingerprint(private_key: str) -> str:
+    return hashlib.sha256(normalize_key(private_key).encode()).hexdigest()
+
+
+def derive_address(private_key: str) -> Optional[str]:
+    """推导地址，私钥无效时返回 None"""
+    try:
+        return Account.from_key(normalize_key(private_key)).address
+    except Exception:
+        return None
+
+
+def _derive_chunk(private_keys: List[str]) -> List[Optional[str]]:
+    return [derive_address(k) for k in private_keys]
+
+
+def _checksum(entries: Dict[str, str]) -> str:
+    return hashlib.sha256(json.dumps(entries, sort_keys=True).encode()).hexdigest()
+
+
+class AddressIndex:
+    """私钥指纹 → 地址（线程安全）"""
+
+    def __init__(self, path: Optional[str] = ADDRESS_INDEX_FILE, workers: int = DERIVE_WORKERS):
+        self.path = path
+        self.workers = max(1, workers)
+        self.lock = threading.Lock()
+        self.entries: Dict[str, str] = {}
+        self.verified = False
+
+        # 统计
+        self.hits = 0
+        self.derived = 0
+
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            entries = data["entries"]
+            if data.get("version") != INDEX_VERSION or data.get("checksum") != _checksum(entries):
+                raise ValueError("校验和不一致")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"⚠ 地址索引 {self.path} 无效，将重新建立: {e}")
+            return
+        self.entries = entries
+
+    def save(self):
+        if not self.path:
+            return
+        with self.lock:
+            data = {"version": INDEX_VERSION, "checksum": _checksum(self.entries), "entries": self.entries}
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+
+    def _verify(self, pairs: List[tuple]):
+        """抽查已索引的私钥，地址不一致说明索引已损坏，清空后全部重新推导"""
+        if self.verified or not pairs:
+            return
+        self.verified = True
+        for private_key, fp in random.sample(pairs, min(VERIFY_SAMPLES, len(pairs))):
+            if derive_address(private_key) != self.entries.get(fp):
+                print(f"⚠ 地址索引 {self.path} 抽查不一致，将重新建立")
+                with self.lock:
+                    self.entries = {}
+                return
+
+    def _derive(self, private_keys: List[str]) -> List[Optional[str]]:
+        if len(private_keys) < MIN_PARALLEL or self.workers == 1:
+            return _derive_chunk(private_keys)
+        return parallel_map(_derive_chunk, private_keys, self.workers)
+
+    def addresses(self, private_keys: Iterable[str]) -> List[Optional[str]]:
+        """
+        批量获取地址，未索引的私钥并行推导后写入索引文件
+
+        Args:
+            private_keys: 私钥列表
+
+        Returns:
+            与 private_keys 顺序相同的 checksum 地址，私钥无效时为 None
+        """
+        private_keys = list(private_keys)
+        fps = [fingerprint(k) for k in private_keys]
+        self._verify([(k, fp) for k, fp in zip(private_keys, fps) if fp in self.entries])
+
+        with self.lock:
+            missing = list({fp: k for k, fp in zip(private_keys, fps) if fp not in self.entries}.items())
+        if missing:
+            derived = self._derive([k for _, k in missing])
+            with self.lock:
+                for (fp, _), address in zip(missing, derived):
+                    if address:
+                        self.entries[fp] = address
+                self.derived += len(missing)
+            self.save()
+
+        with self.lock:
+            self.hits += len(private_keys) - len(missing)
+            return [self.entries.get(fp) for fp in fps]
+
+    def address_of(self, private_key: str) -> Optional[str]:
+        """单个私钥的地址（checksum 格式），私钥无效时返回 None"""
+        return self.addresses([private_key])[0]
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits, "derived": self.derived}
+
+
+_shared_indexes: Dict[str, AddressIndex] = {}
+_shared_lock = threading.Lock()
+
+
+def get_address_index(path: str = ADDRESS_INDEX_FILE) -> AddressIndex:
+    """获取进程内共享的地址索引（每个索引文件一个）"""
+    with _shared_lock:
+        key = os.path.abspath(path)
+        if key not in _shared_indexes:
+            _shared_indexes[key] = AddressIndex(path)
+        return _shared_indexes[key]
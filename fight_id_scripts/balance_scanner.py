@@ -0,0 +1,166 @@
+"""
+批量余额扫描
+优先用 Multicall3（getEthBalance / ERC-20 balanceOf，一次 eth_call 读一批），
+节点不支持时改用 JSON-RPC 批量请求；批次大小按节点的限制自适应调整。
+所有读取固定在同一区块，结果作为快照供 mint / stake / 分发脚本跳过或排序钱包
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from web3 import Web3
+
+from multicall import MULTICALL3, MULTICALL_CHUNK, AdaptiveChunker, aggregate3, has_multicall, read_in_chunks
+
+# ==================== 配置 ====================
+# JSON-RPC 批量请求的请求数（公共节点常见限制 100~1000）
+BATCH_CHUNK = 100
+
+SELECTOR_GET_ETH_BALANCE = bytes.fromhex('4d2301cc')  # getEthBalance(address)
+SELECTOR_BALANCE_OF = bytes.fromhex('70a08231')  # balanceOf(address)
+
+
+class WalletBalanceSnapshot:
+    """同一区块的钱包余额快照（单位 wei）"""
+
+    def __init__(self, block: int, method: str):
+        self.block = block
+        self.method = method
+        self.bnb: Dict[str, int] = {}
+        # token 地址 -> {钱包地址: 余额}
+        self.tokens: Dict[str, Dict[str, int]] = {}
+        self.errors: Dict[str, str] = {}
+        self.requests = 0
+
+    def bnb_of(self, address: str) -> Optional[int]:
+        return self.bnb.get(Web3.to_checksum_address(address))
+
+    def token_of(self, token: str, address: str) -> Optional[int]:
+        return self.tokens.get(Web3.to_checksum_address(token), {}).get(Web3.to_checksum_address(address))
+
+    def below(self, min_wei: int) -> List[str]:
+        """BNB 余额低于 min_wei 的地址（读取失败的地址也算在内）"""
+        return [a for a in self.addresses() if (self.bnb.get(a) is None or self.bnb[a] < min_wei)]
+
+    def addresses(self) -> List[str]:
+        return list(dict.fromkeys(list(self.bnb) + list(self.errors)))
+
+    def by_bnb(self, addresses: Iterable[str], reverse: bool = False) -> List[str]:
+        """按 BNB 余额排序（读取失败的排在最前，reverse 时排在最后）"""
+        def key(address):
+            balance = self.bnb_of(address)
+            return -1 if balance is None else balance
+        return sorted(addresses, key=key, reverse=reverse)
+
+
+def _encode_address_call(selector: bytes, address: str) -> bytes:
+    return selector + bytes(12) + bytes.fromhex(address[2:])
+
+
+def _decode_uint(data: bytes) -> Optional[int]:
+    return int.from_bytes(data[:32], 'big') if len(data) >= 32 else None
+
+
+def _queries(addresses: List[str], tokens: List[str]) -> List[tuple]:
+    """(token 或 None, 钱包地址)，None 表示 BNB"""
+    queries = [(None, a) for a in addresses]
+    for token in tokens:
+        queries.extend((token, a) for a in addresses)
+    return queries
+
+
+def _multicall_read(w3: Web3, queries: List[tuple], block: int, chunker: AdaptiveChunker) -> List[Optional[int]]:
+    calls = []
+    for token, address in queries:
+        if token is None:
+            calls.append((MULTICALL3, _encode_address_call(SELECTOR_GET_ETH_BALANCE, address)))
+        else:
+            calls.append((token, _encode_address_call(SELECTOR_BALANCE_OF, address)))
+    results = aggregate3(w3, calls, block, chunker=chunker)
+    return [_decode_uint(data) if success else None for success, data in results]
+
+
+def _batch_chunk(w3: Web3, queries: List[tuple], block: int) -> List[Optional[int]]:
+    block_hex = hex(block)
+    requests_list = []
+    for token, address in queries:
+        if token is None:
+            requests_list.append(("eth_getBalance", [address, block_hex]))
+        else:
+            data = '0x' + _encode_address_call(SELECTOR_BALANCE_OF, address).hex()
+            requests_list.append(("eth_call", [{"to": token, "data": data}, block_hex]))
+    responses = w3.provider.make_batch_request(requests_list)
+
+    # 超出批量限制时节点通常返回单个错误对象而不是数组
+    if not isinstance(responses, list) or len(responses) != len(queries):
+        raise ValueError(f"批量请求被拒绝: {str(responses)[:100]}")
+    responses = sorted(responses, key=lambda r: r.get('id', 0))
+    values = []
+    for response in responses:
+        if 'error' in response:
+            raise ValueError(f"批量请求出错: {response['error']}")
+        result = response.get('result')
+        if isinstance(result, str):
+            result = int(result, 16) if result not in ('0x', '') else None
+        values.append(result)
+    return values
+
+
+def scan_balances(w3: Web3, addresses: Iterable[str], tokens: Iterable[str] = None,
+                  use_multicall: Optional[bool] = None, block: Optional[int] = None) -> WalletBalanceSnapshot:
+    """
+    批量读取 BNB 和 ERC-20 余额
+
+    Args:
+        w3: Web3 实例（JSON-RPC 批量模式需要 provider 支持 make_batch_request）
+        addresses: 钱包地址
+        tokens: ERC-20 合约地址
+        use_multicall: 是否使用 Multicall3，默认自动检测
+        block: 读取的区块，默认最新区块
+
+    Returns:
+        WalletBalanceSnapshot
+    """
+    addresses = list(dict.fromkeys(Web3.to_checksum_address(a) for a in addresses))
+    tokens = [Web3.to_checksum_address(t) for t in (tokens or [])]
+    block = block if block is not None else w3.eth.block_number
+    if use_multicall is None:
+        use_multicall = has_multicall(w3)
+
+    snapshot = WalletBalanceSnapshot(block, "multicall3" if use_multicall else "batch")
+    for token in tokens:
+        snapshot.tokens[token] = {}
+
+    queries = _queries(addresses, tokens)
+    if use_multicall:
+        chunker = AdaptiveChunker(MULTICALL_CHUNK)
+        values = _multicall_read(w3, queries, block, chunker)
+    else:
+        def failed(query, error):
+            # 单个请求也失败，记录后跳过
+            snapshot.errors[query[1]] = str(error)[:100]
+            return None
+
+        chunker = AdaptiveChunker(BATCH_CHUNK)
+        values = read_in_chunks(queries, lambda chunk: _batch_chunk(w3, chunk, block), chunker, failed)
+    snapshot.requests = chunker.requests
+
+    for (token, address), value in zip(queries, values):
+        if value is None:
+            snapshot.errors.setdefault(address, "读取失败")
+        elif token is None:
+            snapshot.bnb[address] = value
+        else:
+            snapshot.tokens[token][address] = value
+
+    return snapshot
+
+
+def print_snapshot_summary(w3: Web3, snapshot: WalletBalanceSnapshot, min_wei: int = 0):
+    """打印快照摘要"""
+    total = sum(snapshot.bnb.values())
+    print(f"✓ 余额快照: 区块 {snapshot.block}，{len(snapshot.bnb)} 个地址，"
+          f"{snapshot.requests} 次请求 ({snapshot.method})，合计 {w3.from_wei(total, 'ether'):.6f} BNB")
+    if min_wei:
+        print(f"  > 低于 {w3.from_wei(min_wei, 'ether')} BNB: {len(snapshot.below(min_wei))} 个地址")
+    if snapshot.errors:
+        print(f"  ⚠ {len(snapshot.errors)} 个地址读取失败")
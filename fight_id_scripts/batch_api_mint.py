@@ -1,23 +1,20 @@
 """
 Fight.id API Mint调用脚本 + BSC合约调用 (批量版本)
-从 wallet.txt 读取私钥，从 tokens.csv 读取对应的 token
+从 wallet.txt 读取私钥，token 由 token_manager 提供（即将过期时按需重新登录）
 """
 
 import requests
 import json
 import time
-import csv
 from web3 import Web3
 
-try:
-    from web3.middleware import ExtraDataToPOAMiddleware
-
-    geth_poa_middleware = ExtraDataToPOAMiddleware
-except ImportError:
-    try:
-        from web3.middleware import geth_poa_middleware
-    except ImportError:
-        geth_poa_middleware = None
+from rpc_pool import get_web3
+from receipt_watcher import get_receipt_watcher
+from gas_oracle import get_gas_oracle
+from gas_limits import get_gas_limit_cache
+from token_manager import get_token_manager
+from address_index import get_address_index
+from wallet_vault import read_key_lines
 
 
 def call_mint_api(blockchain_address: str, authorization: str, max_retries: int = 3):
@@ -103,17 +100,14 @@ def call_mint_api(blockchain_address: str, authorization: str, max_retries: int
 
 
 def read_private_keys(file_path="wallet.txt"):
-    """从文件读取所有私钥"""
+    """从文件读取所有私钥（存在 wallet.vault 时从加密钱包库读取）"""
     try:
-        with open(file_path, 'r') as f:
-            private_keys = []
-            for line in f:
-                private_key = line.strip()
-                if private_key:
-                    if not private_key.startswith('0x'):
-                        private_key = '0x' + private_key
-                    private_keys.append(private_key)
-            return private_keys
+        private_keys = []
+        for private_key in read_key_lines(file_path):
+            if not private_key.startswith('0x'):
+                private_key = '0x' + private_key
+            private_keys.append(private_key)
+        return private_keys
     except FileNotFoundError:
         print(f"✗ 未找到文件: {file_path}")
         return []
@@ -122,35 +116,24 @@ def read_private_keys(file_path="wallet.txt"):
         return []
 
 
-def load_tokens_mapping(file_path="tokens.csv"):
-    """从 CSV 文件加载钱包地址到 token 的映射"""
-    tokens_map = {}
+def load_token_manager(file_path="tokens.csv"):
+    """加载 token 管理器（file_path 有更新时先合并导入，即将过期或没有 token 的钱包按需重新登录）"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                wallet = row['wallet'].strip().lower()
-                token = row['token'].strip()
-                tokens_map[wallet] = token
-
-        print(f"✓ 成功加载 {len(tokens_map)} 个钱包的 token 映射")
-        return tokens_map
-    except FileNotFoundError:
-        print(f"✗ 未找到文件: {file_path}")
-        return {}
+        manager = get_token_manager(csv_path=file_path)
+        manager.print_summary()
+        return manager
     except Exception as e:
-        print(f"✗ 读取 tokens.csv 失败: {e}")
-        return {}
+        print(f"✗ 读取 token 记录失败: {e}")
+        return None
 
 
 def get_address_from_private_key(private_key):
-    """从私钥推导出钱包地址"""
-    try:
-        account = Web3().eth.account.from_key(private_key)
-        return account.address.lower()
-    except Exception as e:
-        print(f"✗ 从私钥推导地址失败: {e}")
+    """从私钥推导出钱包地址（查地址索引，未索引时推导一次）"""
+    address = get_address_index().address_of(private_key)
+    if not address:
+        print(f"✗ 从私钥推导地址失败: 无效的私钥")
         return None
+    return address.lower()
 
 
 def call_bsc_claim(index, amount, expire_at, signature, private_key):
@@ -161,30 +144,12 @@ def call_bsc_claim(index, amount, expire_at, signature, private_key):
 
     contract_address = Web3.to_checksum_address("0xD0B591751E6aa314192810471461bDE963796306")
 
-    rpc_urls = [
-        'https://bsc-dataseed.binance.org/',
-        'https://bsc-dataseed1.defibit.io/',
-        'https://bsc-dataseed1.ninicoin.io/',
-    ]
-
-    web3 = None
-    for rpc_url in rpc_urls:
-        try:
-            w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={'timeout': 60}))
-            if w3.is_connected():
-                web3 = w3
-                print(f"✓ 已连接BSC节点: {rpc_url}")
-                break
-        except:
-            continue
-
-    if not web3:
+    # 连接BSC节点（共享节点池，自动选择最快的健康节点）
+    web3 = get_web3()
+    if not web3.is_connected():
         print("✗ 无法连接到BSC节点")
         return None
 
-    if geth_poa_middleware:
-        web3.middleware_onion.inject(geth_poa_middleware, layer=0)
-
     account = web3.eth.account.from_key(private_key)
     print(f"✓ 账户地址: {account.address}")
 
@@ -226,19 +191,23 @@ def call_bsc_claim(index, amount, expire_at, signature, private_key):
     print(f"  signature: {signature[:20] if isinstance(signature, str) else '0x' + signature_bytes.hex()[:20]}...")
 
     try:
+        claim_call = contract.functions.claim(index, amount, expire_at, signature_bytes)
+        gas_limits = get_gas_limit_cache()
+
         print("\n正在估算Gas...")
         try:
-            estimated_gas = contract.functions.claim(
-                index, amount, expire_at, signature_bytes
-            ).estimate_gas({'from': account.address})
-            gas_limit = int(estimated_gas * 1.2)
-            print(f"✓ 预估Gas: {estimated_gas}, 使用限制: {gas_limit}")
+            # 同一合约函数的 gas 消耗基本不变，优先用历史回执学习到的 gas limit
+            gas_limit, source, estimated_gas = gas_limits.gas_limit(claim_call, {'from': account.address})
+            if source == "cache":
+                print(f"✓ 使用缓存Gas限制: {gas_limit}")
+            else:
+                print(f"✓ 预估Gas: {estimated_gas}, 使用限制: {gas_limit}")
         except Exception as e:
             print(f"⚠️  Gas估算失败: {e}")
             print("使用默认Gas限制: 300000")
             gas_limit = 300000
 
-        gas_price = web3.eth.gas_price
+        gas_price = get_gas_oracle(web3).price()
         gas_price_gwei = web3.from_wei(gas_price, 'gwei')
         print(f"✓ 当前Gas价格: {gas_price_gwei} Gwei")
 
@@ -248,9 +217,7 @@ def call_bsc_claim(index, amount, expire_at, signature, private_key):
         nonce = web3.eth.get_transaction_count(account.address)
 
         print("\n正在构建交易...")
-        transaction = contract.functions.claim(
-            index, amount, expire_at, signature_bytes
-        ).build_transaction({
+        transaction = claim_call.build_transaction({
             'from': account.address,
             'gas': gas_limit,
             'gasPrice': gas_price,
@@ -269,7 +236,8 @@ def call_bsc_claim(index, amount, expire_at, signature, private_key):
         print(f"  查看详情: https://bscscan.com/tx/{tx_hash.hex()}")
 
         print("\n等待交易确认...")
-        tx_receipt = web3.eth.wait_for_transaction_receipt(tx_hash, timeout=180)
+        tx_receipt = get_receipt_watcher(web3).wait(tx_hash, timeout=180)
+        gas_limits.observe(claim_call, tx_receipt)
 
         if tx_receipt['status'] == 1:
             print("\n" + "=" * 60)
@@ -361,13 +329,15 @@ def main():
         return
 
     print(f"✓ 成功读取 {len(private_keys)} 个私钥")
+    # 预先建立地址索引（未索引的私钥在进程池中并行推导），之后逐个查询不再推导
+    get_address_index().addresses(private_keys)
 
-    print("\n【阶段2】加载 tokens.csv 映射")
+    print("\n【阶段2】加载 token 记录")
     print("-" * 80)
-    tokens_map = load_tokens_mapping("tokens.csv")
+    tokens = load_token_manager("tokens.csv")
 
-    if not tokens_map:
-        print("✗ 未能加载 token 映射，程序终止")
+    if not tokens:
+        print("✗ 未能加载 token 记录，程序终止")
         return
 
     print("\n【阶段3】开始批量处理")
@@ -396,15 +366,15 @@ def main():
             })
             continue
 
-        authorization = tokens_map.get(wallet_address)
+        authorization = tokens.get_token(wallet_address, private_key)
         if not authorization:
-            print(f"✗ 钱包 {wallet_address} 在 tokens.csv 中未找到对应的 token，跳过")
+            print(f"✗ 钱包 {wallet_address} 无法获取有效的 token，跳过")
             skip_count += 1
             results.append({
                 'index': idx,
                 'wallet': wallet_address,
                 'status': 'SKIP',
-                'reason': '未找到token'
+                'reason': '无法获取token'
             })
             continue
 
@@ -5,14 +5,14 @@ import requests
 import time
 import random
 import uuid
-import json
-import csv
 import os
-from datetime import datetime
-from eth_account import Account
-from eth_account.messages import encode_defunct
 import hashlib
 
+from wallet_store import get_wallet_store
+from address_index import get_address_index
+from wallet_vault import read_key_lines, VAULT_FILE
+from login_engine import LoginEngine, sign_login
+
 user_agents = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
     'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36',
@@ -30,6 +30,8 @@ class SIWAClient:
         self.session = requests.Session()
         self.wallet_private_key = wallet_private_key
         self.tokens_file = "tokens.csv"
+        # token 记录保存在 SQLite，每次登录只 upsert 一行；tokens.csv 在批量处理结束时导出
+        self.store = get_wallet_store(csv_path=self.tokens_file)
 
         # 基础头部配置
         self.base_headers = {
@@ -47,68 +49,46 @@ class SIWAClient:
         }
 
         self.session.headers.update(self.base_headers)
-        self._init_csv_file()
-
-    def _init_csv_file(self):
-        """初始化CSV文件"""
-        if not os.path.exists(self.tokens_file):
-            with open(self.tokens_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(['wallet', 'token', '更新时间'])
-
-    def _load_existing_tokens(self):
-        """加载现有的token记录"""
-        existing_tokens = {}
-        if os.path.exists(self.tokens_file):
-            try:
-                with open(self.tokens_file, 'r', newline='', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        if row['wallet']:
-                            existing_tokens[row['wallet'].lower()] = {
-                                'token': row.get('token', ''),
-                                '更新时间': row.get('更新时间', '')
-                            }
-                print(f"✅ 已加载 {len(existing_tokens)} 条现有token记录")
-            except Exception as e:
-                print(f"❌ 加载现有token记录失败: {e}")
-        return existing_tokens
+        # 并发登录时由 LoginEngine 设置：全局限速器，以及关闭逐步输出
+        self.limiter = None
+        self.verbose = True
+
+    def _log(self, message):
+        """逐步的过程输出（并发登录时关闭）"""
+        if self.verbose:
+            print(message)
+
+    def new_session(self):
+        """新建会话（基础头部 + 随机 User-Agent），供并发登录的会话池使用"""
+        session = requests.Session()
+        session.headers.update({**self.base_headers, 'User-Agent': random.choice(user_agents)})
+        return session
+
+    def _throttle(self):
+        if self.limiter:
+            self.limiter.acquire()
 
     def _update_token_record(self, wallet_address, access_token=None):
-        """更新token记录"""
-        existing_tokens = self._load_existing_tokens()
-        wallet_lower = wallet_address.lower()
-        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        if wallet_lower in existing_tokens:
-            if access_token:
-                existing_tokens[wallet_lower]['token'] = access_token
-                existing_tokens[wallet_lower]['更新时间'] = current_time
-                print(f"🔄 更新钱包 {wallet_address} 的token记录")
-            else:
-                existing_tokens[wallet_lower]['token'] = ''
-                existing_tokens[wallet_lower]['更新时间'] = current_time
-                print(f"🔄 清空钱包 {wallet_address} 的token记录（登录失败）")
-        else:
-            existing_tokens[wallet_lower] = {
-                'token': access_token if access_token else '',
-                '更新时间': current_time
-            }
-            print(f"🆕 新增钱包 {wallet_address} 的记录")
+        """更新token记录（只写这一个钱包）"""
+        try:
+            created = self.store.upsert_token(wallet_address, access_token)
+        except Exception as e:
+            print(f"❌ 保存token记录失败: {e}")
+            return False
 
-        self._write_tokens_to_csv(existing_tokens)
+        if created:
+            self._log(f"🆕 新增钱包 {wallet_address} 的记录")
+        elif access_token:
+            self._log(f"🔄 更新钱包 {wallet_address} 的token记录")
+        else:
+            self._log(f"🔄 清空钱包 {wallet_address} 的token记录（登录失败）")
         return True
 
-    def _write_tokens_to_csv(self, tokens_dict):
-        """将token字典写入CSV文件"""
+    def export_tokens_csv(self):
+        """导出 tokens.csv（兼容旧格式）"""
         try:
-            with open(self.tokens_file, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(['wallet', 'token', '更新时间'])
-                for wallet in sorted(tokens_dict.keys()):
-                    token_data = tokens_dict[wallet]
-                    writer.writerow([wallet, token_data['token'], token_data['更新时间']])
-            print(f"💾 Token记录已保存到 {self.tokens_file}")
+            count = self.store.export_csv(self.tokens_file)
+            print(f"💾 Token记录已保存到 {self.tokens_file}（{count} 条）")
         except Exception as e:
             print(f"❌ 保存token记录失败: {e}")
 
@@ -123,10 +103,9 @@ class SIWAClient:
         }
 
     def _load_wallet_private_keys(self, file_path="wallet.txt"):
-        """从文件加载所有钱包私钥"""
+        """从文件加载所有钱包私钥（存在 wallet.vault 时从加密钱包库读取）"""
         try:
-            with open(file_path, 'r') as f:
-                private_keys = [line.strip() for line in f if line.strip()]
+            private_keys = read_key_lines(file_path)
             print(f"✅ 从 {file_path} 加载了 {len(private_keys)} 个私钥")
             return private_keys
         except FileNotFoundError:
@@ -134,53 +113,45 @@ class SIWAClient:
             return []
 
     def _private_key_to_address(self, private_key_hex):
-        """将EVM私钥转换为地址"""
-        try:
-            account = Account.from_key(private_key_hex)
-            return account.address
-        except Exception as e:
-            print(f"❌ 地址生成失败: {e}")
-            return None
+        """将EVM私钥转换为地址（查地址索引，未索引时推导一次）"""
+        address = get_address_index().address_of(private_key_hex)
+        if not address:
+            print(f"❌ 地址生成失败: 无效的私钥")
+        return address
 
     def _generate_evm_signature(self, message, private_key_hex):
         """生成EVM兼容的签名"""
-        try:
-            account = Account.from_key(private_key_hex)
-            message_text = f"Sign in to get access to FIGHT.iD"
-            encoded_message = encode_defunct(text=message_text)
-            signed_message = Account.sign_message(encoded_message, private_key_hex)
-
-            return {
-                'address': account.address,
-                'signature': signed_message.signature.hex(),
-                'success': True
-            }
-        except Exception as e:
-            print(f"❌ EVM签名生成失败: {e}")
-            address = self._private_key_to_address(private_key_hex)
-            return {
-                'address': address,
-                'signature': '0x' + hashlib.sha256((message + private_key_hex).encode()).hexdigest()[:130],
-                'success': False
-            }
+        sign_result = sign_login(private_key_hex)
+        if sign_result:
+            return sign_result
+
+        print(f"❌ EVM签名生成失败: 无效的私钥")
+        address = self._private_key_to_address(private_key_hex)
+        return {
+            'address': address,
+            'signature': '0x' + hashlib.sha256((message + private_key_hex).encode()).hexdigest()[:130],
+            'success': False
+        }
 
-    def step1_get_nonce(self, max_retries=3):
-        """第一步：获取nonce数据"""
+    def step1_get_nonce(self, max_retries=3, session=None):
+        """第一步：获取nonce数据（session 为空时使用客户端自己的会话）"""
         url = "https://api.fight.id/auth/siwa"
+        session = session or self.session
 
         for attempt in range(max_retries):
             try:
-                dynamic_headers = self._generate_dynamic_headers()
-                headers = {**self.base_headers, **dynamic_headers}
+                # 基础头部由会话带上，这里只加每次请求不同的 sentry 头部
+                headers = self._generate_dynamic_headers()
 
-                print(f"🔄 第一步：获取nonce (尝试 {attempt + 1}/{max_retries})")
+                self._log(f"🔄 第一步：获取nonce (尝试 {attempt + 1}/{max_retries})")
 
-                response = self.session.get(url, headers=headers, timeout=10)
-                print(f"📥 状态码: {response.status_code}")
+                self._throttle()
+                response = session.get(url, headers=headers, timeout=10)
+                self._log(f"📥 状态码: {response.status_code}")
 
                 if response.status_code == 200:
                     result = response.json()
-                    print("✅ Nonce获取成功!")
+                    self._log("✅ Nonce获取成功!")
                     return {
                         'success': True,
                         'data': result.get('data'),
@@ -189,7 +160,11 @@ class SIWAClient:
                 elif response.status_code == 429:
                     wait_time = (2 ** attempt) + random.uniform(0.1, 0.5)
                     print(f"⏳ 频率限制，等待 {wait_time:.2f}秒")
-                    time.sleep(wait_time)
+                    if self.limiter:
+                        # 所有并发线程一起暂停，下次请求时在限速器中等待
+                        self.limiter.backoff(wait_time)
+                    else:
+                        time.sleep(wait_time)
                     continue
 
                 if attempt < max_retries - 1:
@@ -205,12 +180,13 @@ class SIWAClient:
 
         return {'success': False, 'error': '所有重试均失败'}
 
-    def step2_callback(self, nonce_data, private_key, max_retries=3):
-        """第二步：执行回调认证"""
+    def step2_callback(self, nonce_data, private_key, max_retries=3, session=None, sign_result=None):
+        """第二步：执行回调认证（sign_result 为提前签好的登录签名，为空时当场签名）"""
         url = "https://api.fight.id/auth/siwa/callback"
+        session = session or self.session
 
         message = "Sign in to get access to FIGHT.iD"
-        sign_result = self._generate_evm_signature(message, private_key)
+        sign_result = sign_result or self._generate_evm_signature(message, private_key)
 
         if not sign_result:
             return {'success': False, 'error': '签名生成失败'}
@@ -240,21 +216,21 @@ class SIWAClient:
             }
         }
 
-        print(f"📍 钱包地址: {wallet_address}")
+        self._log(f"📍 钱包地址: {wallet_address}")
 
         for attempt in range(max_retries):
             try:
-                dynamic_headers = self._generate_dynamic_headers()
-                headers = {**self.base_headers, **dynamic_headers}
+                headers = self._generate_dynamic_headers()
 
-                print(f"🔄 第二步：回调认证 (尝试 {attempt + 1}/{max_retries})")
+                self._log(f"🔄 第二步：回调认证 (尝试 {attempt + 1}/{max_retries})")
 
-                response = self.session.post(url, headers=headers, json=request_data, timeout=15)
-                print(f"📥 状态码: {response.status_code}")
+                self._throttle()
+                response = session.post(url, headers=headers, json=request_data, timeout=15)
+                self._log(f"📥 状态码: {response.status_code}")
 
                 if response.status_code == 201:
                     result = response.json()
-                    print("✅ 回调认证成功!")
+                    self._log("✅ 回调认证成功!")
 
                     access_token = result.get('data', {}).get('accessToken')
                     if access_token:
@@ -322,8 +298,15 @@ class SIWAClient:
             print(f"❌ 钱包处理失败: {step2_result.get('error', '未知错误')}")
             return None
 
-    def batch_process_wallets(self, wallet_file="wallet.txt", delay_between_wallets=3):
-        """批量处理所有钱包"""
+    def batch_process_wallets(self, wallet_file="wallet.txt", workers=None, rate=None):
+        """
+        批量并发登录所有钱包
+
+        Args:
+            wallet_file: 私钥文件
+            workers: 并发线程数，默认 LOGIN_CONFIG["WORKERS"]
+            rate: 全局请求速率 (请求/秒)，默认 LOGIN_CONFIG["RATE"]
+        """
         print("🚀 开始批量处理钱包")
         print("=" * 60)
 
@@ -334,22 +317,20 @@ class SIWAClient:
 
         print(f"📋 找到 {len(private_keys)} 个钱包")
 
-        existing_tokens = self._load_existing_tokens()
-        for private_key in private_keys:
-            wallet_address = self._private_key_to_address(private_key)
-            if wallet_address and wallet_address.lower() not in existing_tokens:
-                self._update_token_record(wallet_address, None)
+        # 一次取回全部地址，未索引的私钥在进程池中并行推导
+        addresses = get_address_index().addresses(private_keys)
+        added = self.store.ensure_wallets(a for a in addresses if a)
+        if added:
+            print(f"🆕 新增 {added} 个钱包的记录")
+
+        options = {k: v for k, v in (('workers', workers), ('rate', rate)) if v is not None}
+        engine = LoginEngine(self, **options)
+        results = engine.run(private_keys)
 
         successful_tokens = []
         failed_wallets = []
-
-        for i, private_key in enumerate(private_keys, 1):
-            print(f"\n📦 处理第 {i}/{len(private_keys)} 个钱包")
-            print("=" * 40)
-
-            result = self.process_single_wallet(private_key)
-
-            if result and result['success']:
+        for private_key, result in zip(private_keys, results):
+            if result['success']:
                 successful_tokens.append({
                     'address': result['address'],
                     'access_token': result['access_token']
@@ -357,15 +338,12 @@ class SIWAClient:
             else:
                 failed_wallets.append(private_key[:20] + "...")
 
-            if i < len(private_keys):
-                print(f"⏳ 等待 {delay_between_wallets} 秒后处理下一个钱包...")
-                time.sleep(delay_between_wallets)
-
         print("\n" + "=" * 60)
         print("📊 批量处理完成!")
         print(f"✅ 成功: {len(successful_tokens)} 个钱包")
         print(f"❌ 失败: {len(failed_wallets)} 个钱包")
-        print(f"💾 Token记录已更新到 {self.tokens_file}")
+        engine.print_stats()
+        self.export_tokens_csv()
 
         return {
             'successful': successful_tokens,
@@ -384,6 +362,7 @@ def main_single_wallet():
     
     client = SIWAClient()
     result = client.process_single_wallet(example_private_key)
+    client.export_tokens_csv()
     if result and result['success']:
         print(f"🎉 认证成功! Address: {result['address']}")
     else:
@@ -394,7 +373,7 @@ def main_batch_wallets():
     """批量处理所有钱包"""
     print("🔐 批量处理模式")
     client = SIWAClient()
-    result = client.batch_process_wallets("wallet.txt", delay_between_wallets=2)
+    result = client.batch_process_wallets("wallet.txt")
     print(f"\n🎯 处理完成! 成功: {len(result['successful'])}, 失败: {len(result['failed'])}")
 
 
@@ -409,7 +388,7 @@ if __name__ == "__main__":
         exit(1)
 
     wallet_file = "wallet.txt"
-    if os.path.exists(wallet_file):
+    if os.path.exists(wallet_file) or os.path.exists(VAULT_FILE):
         print("📁 检测到钱包文件，开始批量处理...")
         main_batch_wallets()
     else:
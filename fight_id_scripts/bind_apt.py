@@ -6,6 +6,9 @@ import time
 import csv
 from aptos_sdk.account import Account
 
+from wallet_store import get_wallet_store
+from wallet_vault import read_key_lines
+
 
 def get_apt_address_and_sign(private_key_hex: str, message: str):
     """从十六进制私钥获取 Aptos 地址和签名"""
@@ -149,19 +152,16 @@ def batch_bind_wallets():
     print("=" * 60)
 
     try:
-        with open('tokens.csv', 'r', encoding='utf-8') as f:
-            csv_reader = csv.DictReader(f)
-            tokens_data = list(csv_reader)
-    except FileNotFoundError:
-        print("❌ 错误: tokens.csv 文件不存在")
-        return
+        tokens_data = get_wallet_store().rows(valid_only=False)
+        if not tokens_data:
+            print("❌ 错误: tokens.csv 文件不存在")
+            return
     except Exception as e:
         print(f"❌ 读取 tokens.csv 失败: {str(e)}")
         return
 
     try:
-        with open('apt_wallet.txt', 'r', encoding='utf-8') as f:
-            apt_wallets = [line.strip() for line in f if line.strip()]
+        apt_wallets = read_key_lines('apt_wallet.txt')
     except FileNotFoundError:
         print("❌ 错误: apt_wallet.txt 文件不存在")
         return
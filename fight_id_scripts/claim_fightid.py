@@ -6,10 +6,11 @@ import time
 import random
 import uuid
 import csv
-import os
 from datetime import datetime
 import string
 
+from wallet_store import get_wallet_store
+
 user_agents = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
     'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36',
@@ -61,32 +62,17 @@ class FightIDClaimer:
         return username
 
     def read_token_csv(self, file_path="tokens.csv"):
-        """读取tokens.csv文件，过滤掉token为空的行"""
-        tokens_data = []
+        """从钱包存储读取token记录（file_path 有更新时先合并导入），过滤掉token为空的行"""
         try:
-            with open(file_path, 'r', newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    wallet = row.get('wallet', '').strip()
-                    token = row.get('token', '').strip()
-                    updated_time = row.get('更新时间', '').strip()
-
-                    if wallet and token:
-                        tokens_data.append({
-                            'wallet': wallet,
-                            'token': token,
-                            '更新时间': updated_time
-                        })
+            store = get_wallet_store(csv_path=file_path)
+            tokens_data = store.rows()
 
             valid_count = len(tokens_data)
-            total_count = sum(1 for _ in open(file_path, 'r', encoding='utf-8')) - 1
+            total_count = store.count()
             print(
                 f"✅ 从 {file_path} 读取到 {valid_count} 个有效钱包（共 {total_count} 行，跳过 {total_count - valid_count} 个空token行）")
             return tokens_data
 
-        except FileNotFoundError:
-            print(f"❌ 文件 {file_path} 未找到")
-            return []
         except Exception as e:
             print(f"❌ 读取文件失败: {e}")
             return []
@@ -305,7 +291,7 @@ def main():
     print("🎯 FightID Claim工具（仅处理claim-fightid）")
     print("=" * 40)
 
-    if not os.path.exists("tokens.csv"):
+    if not get_wallet_store(csv_path="tokens.csv").count():
         print("❌ 未找到 tokens.csv 文件")
         print("💡 请确保tokens.csv文件在当前目录下，且包含 wallet,token,更新时间 列")
         return
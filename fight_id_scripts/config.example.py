@@ -20,7 +20,59 @@ RPC_URLS = [
 GAS_CONFIG = {
     "MIN_AMOUNT_BNB": 0.00007,  # 最小分发金额
     "MAX_AMOUNT_BNB": 0.00011,  # 最大分发金额
-    "DELAY_BETWEEN_TX": 0.5    # 交易间隔 (秒)
+    "SEND_WORKERS": 8          # 并发发送线程数 (nonce 本地分配，不再逐笔等待)
+}
+
+# Disperse 合约 (distribute_bnb.py --batch)，默认 disperse.app 在 BSC 上的部署
+DISPERSE_CONTRACT = '0xD152f549545093347A162Dce210e7293f1452150'
+
+# Gas price 预言机 (gas_oracle.py)，所有发送交易的脚本共用
+GAS_ORACLE_CONFIG = {
+    "TTL": 3.0,             # 缓存有效期 (秒)，约一个区块
+    "STRATEGY": "node",     # "node": eth_gasPrice；"percentile": eth_feeHistory 小费分位数 + baseFee
+    "PERCENTILE": 50,       # percentile 策略的分位数
+    "FEE_HISTORY_BLOCKS": 10,
+    "MULTIPLIER": 1.0       # 默认倍数
+}
+
+# 合约调用 gas limit 缓存 (gas_limits.py)，从成功回执的 gasUsed 学习，命中时不再 estimate_gas
+GAS_LIMIT_CONFIG = {
+    "CACHE_FILE": "gas_limit_cache.json",
+    "WINDOW": 50,           # 每个函数保留的样本数
+    "MIN_SAMPLES": 3,       # 样本数不足时仍然实时估算
+    "PERCENTILE": 95,       # 取样本的分位数
+    "HEADROOM": 1.2         # 余量
+}
+
+# 交易签名进程池 (tx_signer.py)
+SIGNER_CONFIG = {
+    "WORKERS": 0,           # 签名进程数，0 表示 CPU 核数
+    "MIN_PARALLEL": 64      # 少于该笔数时在当前进程签名
+}
+
+# 钱包 Token 存储 (wallet_store.py)，tokens.csv 会自动导入 / 导出
+WALLET_DB_FILE = "wallets.db"
+
+# 私钥 → 地址索引 (address_index.py)，只保存私钥的 sha256 指纹和地址
+ADDRESS_INDEX_FILE = "wallet_index.json"
+
+# 加密钱包库 (wallet_vault.py)，存在时各脚本从库中读取私钥，不再读明文私钥文件
+# 密码从环境变量 WALLET_VAULT_PASSWORD 读取，未设置时运行时提示输入
+VAULT_FILE = "wallet.vault"
+# 是否在进程内缓存已解密的私钥（默认每次读取都重新解密，明文不常驻内存）
+VAULT_CACHE = False
+
+# 批量登录 (batch_login.py → login_engine.py)
+LOGIN_CONFIG = {
+    "WORKERS": 8,           # 并发登录线程数 / 会话池大小
+    "RATE": 5.0,            # 全局 API 请求速率 (请求/秒)，每个钱包 2 个请求，0 表示不限速
+    "BURST": 5              # 空闲后允许连续发出的请求数
+}
+
+# Token 管理 (token_manager.py)，按 JWT 的 exp 判断是否需要重新登录
+TOKEN_CONFIG = {
+    "REFRESH_HORIZON": 6 * 3600,  # refresh 刷新多长时间内会过期的 token (秒)
+    "MIN_TTL": 600                # 下游脚本取 token 时剩余有效期不足该值则当场重新登录 (秒)
 }
 
 # ==================== 推荐码配置 ====================
@@ -5,17 +5,20 @@ import requests
 import time
 import random
 import uuid
-import json
 import csv
 import os
 from datetime import datetime
 import logging
 
 from web3 import Web3
-from web3.middleware import ExtraDataToPOAMiddleware
-from eth_account import Account
 
-geth_poa_middleware = ExtraDataToPOAMiddleware
+from rpc_pool import get_web3
+from receipt_watcher import get_receipt_watcher
+from gas_oracle import get_gas_oracle
+from gas_limits import get_gas_limit_cache
+from token_manager import get_token_manager
+from address_index import get_address_index
+from wallet_vault import read_key_lines, VAULT_FILE
 
 user_agents = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
@@ -44,31 +47,12 @@ def call_bsc_claim(index, amount, expire_at, signature, private_key):
     # 合约地址
     contract_address = Web3.to_checksum_address("0xD0B591751E6aa314192810471461bDE963796306")
 
-    # 连接BSC节点
-    rpc_urls = [
-        'https://bsc-dataseed.binance.org/',
-        'https://bsc-dataseed1.defibit.io/',
-        'https://bsc-dataseed1.ninicoin.io/',
-    ]
-
-    web3 = None
-    for rpc_url in rpc_urls:
-        try:
-            w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={'timeout': 60}))
-            if w3.is_connected():
-                web3 = w3
-                print(f"✓ 已连接BSC节点: {rpc_url}")
-                break
-        except:
-            continue
-
-    if not web3:
+    # 连接BSC节点（共享节点池，自动选择最快的健康节点）
+    web3 = get_web3()
+    if not web3.is_connected():
         print("✗ 无法连接到BSC节点")
         return None
 
-    if geth_poa_middleware:
-        web3.middleware_onion.inject(geth_poa_middleware, layer=0)
-
     try:
         account = web3.eth.account.from_key(private_key)
     except:
@@ -115,19 +99,23 @@ def call_bsc_claim(index, amount, expire_at, signature, private_key):
     print(f"  signature: {signature[:20] if isinstance(signature, str) else '0x' + signature_bytes.hex()[:20]}...")
 
     try:
+        claim_call = contract.functions.claim(index, amount, expire_at, signature_bytes)
+        gas_limits = get_gas_limit_cache()
+
         print("\n正在估算Gas...")
         try:
-            estimated_gas = contract.functions.claim(
-                index, amount, expire_at, signature_bytes
-            ).estimate_gas({'from': account.address})
-            gas_limit = int(estimated_gas * 1.2)
-            print(f"✓ 预估Gas: {estimated_gas}, 使用限制: {gas_limit}")
+            # 同一合约函数的 gas 消耗基本不变，优先用历史回执学习到的 gas limit
+            gas_limit, source, estimated_gas = gas_limits.gas_limit(claim_call, {'from': account.address})
+            if source == "cache":
+                print(f"✓ 使用缓存Gas限制: {gas_limit}")
+            else:
+                print(f"✓ 预估Gas: {estimated_gas}, 使用限制: {gas_limit}")
         except Exception as e:
             print(f"⚠️  Gas估算失败: {e}")
             print("使用默认Gas限制: 300000")
             gas_limit = 300000
 
-        gas_price = web3.eth.gas_price
+        gas_price = get_gas_oracle(web3).price()
         gas_price_gwei = web3.from_wei(gas_price, 'gwei')
         print(f"✓ 当前Gas价格: {gas_price_gwei} Gwei")
 
@@ -137,9 +125,7 @@ def call_bsc_claim(index, amount, expire_at, signature, private_key):
         nonce = web3.eth.get_transaction_count(account.address)
 
         print("\n正在构建交易...")
-        transaction = contract.functions.claim(
-            index, amount, expire_at, signature_bytes
-        ).build_transaction({
+        transaction = claim_call.build_transaction({
             'from': account.address,
             'gas': gas_limit,
             'gasPrice': gas_price,
@@ -158,7 +144,8 @@ def call_bsc_claim(index, amount, expire_at, signature, private_key):
         print(f"  查看详情: https://bscscan.com/tx/{tx_hash.hex()}")
 
         print("\n等待交易确认...")
-        tx_receipt = web3.eth.wait_for_transaction_receipt(tx_hash, timeout=180)
+        tx_receipt = get_receipt_watcher(web3).wait(tx_hash, timeout=180)
+        gas_limits.observe(claim_call, tx_receipt)
 
         if tx_receipt['status'] == 1:
             print("\n" + "=" * 60)
@@ -189,6 +176,8 @@ class PunchingBagGame:
         self.game_session_id = None
         self.available_reward_id = None
         self.mint_data = None
+        # start 接口返回 401（token 失效）时为 True，由调用方换新 token 后重试
+        self.unauthorized = False
 
         self._setup_logging()
 
@@ -251,6 +240,7 @@ class PunchingBagGame:
                     return False
             elif response.status_code == 401:
                 self.logger.error("❌ Token失效或认证失败")
+                self.unauthorized = True
                 return False
             else:
                 self.logger.error(f"❌ Start接口失败，状态码: {response.status_code}")
@@ -462,44 +452,26 @@ class GameBatchProcessor:
         )
         self.logger = logging.getLogger("BatchProcessor")
 
-    def load_tokens_from_csv(self):
-        """从tokens.csv文件加载钱包和token"""
-        tokens_map = {}
-
-        if not os.path.exists(self.token_file):
-            self.logger.error(f"❌ Token文件 {self.token_file} 不存在")
-            return tokens_map
-
+    def load_token_manager(self):
+        """加载 token 管理器（按 JWT 过期时间索引，即将过期或没有 token 的钱包处理前按需重新登录）"""
         try:
-            with open(self.token_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    wallet = row.get('wallet', '').strip().lower()
-                    token = row.get('token', '').strip()
-                    if wallet and token:
-                        tokens_map[wallet] = token
-
-            self.logger.info(f"✅ 从 {self.token_file} 加载了 {len(tokens_map)} 个有效Token")
-            return tokens_map
+            manager = get_token_manager(csv_path=self.token_file)
+            manager.print_summary()
+            return manager
 
         except Exception as e:
-            self.logger.error(f"❌ 加载token文件失败: {e}")
-            return {}
+            self.logger.error(f"❌ 加载token记录失败: {e}")
+            return None
 
     def load_private_keys(self):
-        """从wallets.txt文件加载私钥"""
-        private_keys = []
-        if not os.path.exists(self.key_file):
+        """从wallets.txt文件加载私钥（存在 wallet.vault 时从加密钱包库读取）"""
+        try:
+            private_keys = read_key_lines(self.key_file)
+        except FileNotFoundError:
             self.logger.error(f"❌ 私钥文件 {self.key_file} 不存在")
-            return private_keys
+            return []
 
         try:
-            with open(self.key_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    key = line.strip()
-                    if key:
-                        private_keys.append(key)
-
             self.logger.info(f"✅ 从 {self.key_file} 加载了 {len(private_keys)} 个私钥")
             return private_keys
 
@@ -537,44 +509,39 @@ class GameBatchProcessor:
             return
 
         private_keys = self.load_private_keys()
-        tokens_map = self.load_tokens_from_csv()
+        tokens = self.load_token_manager()
 
         if not private_keys:
             self.logger.error("❌ 没有可用的私钥数据")
             return
-        if not tokens_map:
+        if not tokens:
             self.logger.error("❌ 没有可用的Token数据")
             return
 
         wallets_to_process = []
-        for private_key in private_keys:
-            try:
-                account = Account.from_key(private_key)
-                wallet_address = account.address.lower()
-
-                if wallet_address in tokens_map:
-                    wallets_to_process.append({
-                        'wallet': account.address,
-                        'token': tokens_map[wallet_address],
-                        'private_key': private_key
-                    })
-                else:
-                    self.logger.warning(f"⚠️ 地址 {account.address} 在 tokens.csv 中未找到匹配的 Token，跳过。")
-            except Exception as e:
-                self.logger.error(f"❌ 私钥解析失败或Web3错误: {e}")
+        # 地址从索引读取，未索引的私钥在进程池中并行推导
+        addresses = get_address_index().addresses(private_keys)
+        for private_key, address in zip(private_keys, addresses):
+            if not address:
+                self.logger.error(f"❌ 私钥解析失败: {private_key[:10]}...")
+                continue
+            # token 在处理到该钱包时再取，即将过期或没有 token 时当场重新登录
+            wallets_to_process.append({
+                'wallet': address,
+                'private_key': private_key
+            })
 
         if not wallets_to_process:
-            self.logger.error("❌ 经过匹配，没有可处理的钱包/Token对")
+            self.logger.error("❌ 没有可处理的钱包")
             return
 
-        self.logger.info(f"📋 找到 {len(wallets_to_process)} 个钱包/Token/私钥对需要处理")
+        self.logger.info(f"📋 找到 {len(wallets_to_process)} 个钱包需要处理")
 
         successful_count = 0
         failed_count = 0
 
         for i, data in enumerate(wallets_to_process, 1):
             wallet = data['wallet']
-            token = data['token']
             private_key = data['private_key']
 
             self.logger.info(f"\n🎯 处理第 {i}/{len(wallets_to_process)} 个钱包: {wallet}")
@@ -582,8 +549,18 @@ class GameBatchProcessor:
             start_time = time.time()
 
             try:
+                token = tokens.get_token(wallet, private_key)
+                if not token:
+                    raise RuntimeError("无法获取有效Token")
                 game = PunchingBagGame(token, wallet, private_key)
                 success, message = game.run_complete_game()
+                if not success and game.unauthorized:
+                    # token 未到 exp 就被服务端判定失效，重新登录后重试一次
+                    tokens.invalidate(wallet)
+                    token = tokens.get_token(wallet, private_key)
+                    if token:
+                        game = PunchingBagGame(token, wallet, private_key)
+                        success, message = game.run_complete_game()
                 execution_time = time.time() - start_time
                 self.save_game_result(wallet, success, message, execution_time)
 
@@ -609,6 +586,7 @@ class GameBatchProcessor:
         self.logger.info(f"✅ 成功: {successful_count} 个钱包")
         self.logger.info(f"❌ 失败: {failed_count} 个钱包")
         self.logger.info(f"💾 详细结果已保存到: {self.results_file}")
+        tokens.print_summary()
 
         return {
             'successful': successful_count,
@@ -625,9 +603,8 @@ def main():
     token_file = "tokens.csv"
     key_file = "wallet.txt"
     if not os.path.exists(token_file):
-        print(f"❌ 未找到 {token_file} 文件")
-        return
-    if not os.path.exists(key_file):
+        print(f"⚠ 未找到 {token_file} 文件，各钱包将在处理时登录获取 Token")
+    if not os.path.exists(key_file) and not os.path.exists(VAULT_FILE):
         print(f"❌ 未找到 {key_file} 文件")
         return
 
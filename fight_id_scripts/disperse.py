@@ -0,0 +1,166 @@
+"""
+Disperse 合约批量分发 BNB
+一笔交易给一组地址转账（金额写在 calldata 里），按区块 gas 预算切分批次，
+替代每个地址一笔 21000 gas 的普通转账
+"""
+
+from typing import Callable, Dict, List, Optional
+
+from web3 import Web3
+
+from nonce_manager import NonceManager
+from receipt_watcher import get_receipt_watcher
+from gas_oracle import get_gas_oracle
+
+try:
+    from config import DISPERSE_CONTRACT
+except ImportError:
+    # disperse.app 在 BSC 上部署的合约
+    DISPERSE_CONTRACT = '0xD152f549545093347A162Dce210e7293f1452150'
+
+# ==================== 配置 ====================
+# 每个收款地址的 gas 上限估计（新地址转账 25000 + 调用 9000 + calldata 与循环开销）
+GAS_PER_RECIPIENT = 40000
+# 单批交易最多使用区块 gas 上限的比例
+BLOCK_GAS_RATIO = 0.1
+# 单批最多地址数（限制 calldata 大小）
+MAX_CHUNK_SIZE = 500
+# estimateGas 结果的缓冲
+GAS_BUFFER = 1.2
+# 等待回执的超时 (秒)
+RECEIPT_TIMEOUT = 180
+
+DISPERSE_ABI = [
+    {
+        "inputs": [
+            {"internalType": "address[]", "name": "recipients", "type": "address[]"},
+            {"internalType": "uint256[]", "name": "values", "type": "uint256[]"}
+        ],
+        "name": "disperseEther",
+        "outputs": [],
+        "stateMutability": "payable",
+        "type": "function"
+    }
+]
+
+
+def gas_budget(w3: Web3, ratio: float = BLOCK_GAS_RATIO) -> int:
+    """按最新区块的 gas 上限计算单批交易的 gas 预算"""
+    return int(w3.eth.get_block('latest')['gasLimit'] * ratio)
+
+
+def chunk_size(budget: int) -> int:
+    """gas 预算内单批最多的地址数"""
+    return max(1, min(MAX_CHUNK_SIZE, budget // GAS_PER_RECIPIENT))
+
+
+def split_chunks(recipients: List[str], amounts: List[int], budget: int) -> List[tuple]:
+    """
+    按 gas 预算切分批次
+
+    Args:
+        recipients: 收款地址
+        amounts: 对应金额 (wei)
+        budget: 单批交易的 gas 预算
+
+    Returns:
+        [(地址列表, 金额列表), ...]
+    """
+    size = chunk_size(budget)
+    return [(recipients[i:i + size], amounts[i:i + size]) for i in range(0, len(recipients), size)]
+
+
+def build_disperse_tx(contract, sender: str, recipients: List[str], amounts: List[int],
+                      nonce: int, gas_price: int, budget: int) -> dict:
+    """构建一批的 disperseEther 交易，gas 按 estimateGas 加缓冲（不超过预算）"""
+    call = contract.functions.disperseEther(recipients, amounts)
+    value = sum(amounts)
+    estimated = call.estimate_gas({'from': sender, 'value': value})
+    return call.build_transaction({
+        'from': sender,
+        'value': value,
+        'gas': min(int(estimated * GAS_BUFFER), max(budget, estimated)),
+        'gasPrice': gas_price,
+        'nonce': nonce,
+        'chainId': contract.w3.eth.chain_id
+    })
+
+
+def disperse_bnb(w3: Web3, sign: Callable[[dict], bytes], sender: str, recipients: List[str],
+                 amounts: List[int], contract_address: str = None, gas_price: Optional[int] = None,
+                 budget: Optional[int] = None) -> List[Dict]:
+    """
+    分批调用 Disperse 合约分发 BNB，所有批次连续发出后统一等待回执
+
+    Args:
+        w3: Web3 实例
+        sign: 签名函数，传入交易字典返回原始交易
+        sender: 发送地址
+        recipients: 收款地址
+        amounts: 对应金额 (wei)
+        contract_address: Disperse 合约地址，默认 DISPERSE_CONTRACT
+        gas_price: gas price，默认当前网络值
+        budget: 单批 gas 预算，默认按区块 gas 上限计算
+
+    Returns:
+        每批的结果: recipients, amounts, nonce, tx_hash, status, gas_used, error
+    """
+    contract = w3.eth.contract(address=Web3.to_checksum_address(contract_address or DISPERSE_CONTRACT),
+                               abi=DISPERSE_ABI)
+    gas_price = gas_price or get_gas_oracle(w3).price()
+    budget = budget or gas_budget(w3)
+    nonce_manager = NonceManager(w3, sender)
+
+    chunks = []
+    for chunk_recipients, chunk_amounts in split_chunks(recipients, amounts, budget):
+        chunk = {
+            'recipients': chunk_recipients,
+            'amounts': chunk_amounts,
+            'nonce': None,
+            'tx_hash': '',
+            'status': 'Failed',
+            'gas_used': 0,
+            'error': ''
+        }
+        chunks.append(chunk)
+        nonce = nonce_manager.allocate()
+        chunk['nonce'] = nonce
+        try:
+            tx = build_disperse_tx(contract, sender, chunk_recipients, chunk_amounts, nonce, gas_price, budget)
+            raw = sign(tx)
+            tx_hash = w3.eth.send_raw_transaction(raw)
+        except Exception as e:
+            nonce_manager.mark_failed(nonce)
+            chunk['error'] = str(e)[:100]
+            print(f"  - ✗ 第 {len(chunks)} 批 ({len(chunk_recipients)} 个地址) 发送失败: {e}")
+            continue
+        nonce_manager.mark_sent(nonce, tx, raw, tx_hash)
+        chunk['tx_hash'] = tx_hash.hex()
+        chunk['status'] = 'Pending'
+        print(f"  ✓ 第 {len(chunks)} 批 ({len(chunk_recipients)} 个地址) nonce={nonce} Hash: {tx_hash.hex()[:10]}...")
+
+    nonce_manager.fill_gaps(sign, gas_price)
+
+    # 所有批次的回执由同一个监听器按区块取回
+    watcher = get_receipt_watcher(w3)
+    hashes = nonce_manager.tx_hashes()
+    futures = {}
+    for chunk in chunks:
+        if chunk['status'] == 'Pending':
+            chunk['tx_hash'] = hashes.get(chunk['nonce'], chunk['tx_hash'])
+            futures[id(chunk)] = watcher.watch(chunk['tx_hash'], RECEIPT_TIMEOUT)
+
+    for chunk in chunks:
+        if id(chunk) not in futures:
+            continue
+        try:
+            receipt = futures[id(chunk)].result()
+        except Exception as e:
+            chunk['error'] = f"等待回执失败: {str(e)[:80]}"
+            continue
+        chunk['gas_used'] = receipt['gasUsed']
+        if receipt['status'] == 1:
+            chunk['status'] = 'Success'
+        else:
+            chunk['error'] = 'Reverted'
+    return chunks
@@ -3,32 +3,30 @@
 
 import csv
 import time
+import argparse
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from web3 import Web3
 from typing import List, Dict, Optional
 import os
 
-# ==================== PoA 中间件兼容性导入 ====================
+from rpc_pool import get_web3, RPC_URLS
+from nonce_manager import NonceManager
+from gas_oracle import get_gas_oracle
+from tx_signer import TransactionSigner
+from wallet_store import get_wallet_store
+from wallet_vault import read_key_lines, VAULT_FILE
+from balance_scanner import scan_balances, print_snapshot_summary
+from disperse import disperse_bnb, gas_budget, chunk_size
+
 try:
-    from web3.middleware import ExtraDataToPOAMiddleware
-    poa_middleware = ExtraDataToPOAMiddleware
-    print("✓ 使用新版 PoA 中间件: ExtraDataToPOAMiddleware")
+    from config import GAS_CONFIG
 except ImportError:
-    try:
-        from web3.middleware import geth_poa_middleware
-        poa_middleware = geth_poa_middleware
-        print("✓ 使用旧版 PoA 中间件: geth_poa_middleware")
-    except ImportError:
-        poa_middleware = None
-        print("✗ 警告: 无法导入任何 PoA 中间件，可能影响 BSC 连接稳定性。")
+    GAS_CONFIG = {}
 
 # ==================== 配置区域 ====================
-# 1. BNB Smart Chain (BSC) RPC 节点
-RPC_URLS = [
-    'https://bsc-dataseed.binance.org/',
-    'https://bsc-dataseed1.defibit.io/',
-    'https://bsc-dataseed1.ninicoin.io/',
-]
+# 1. BNB Smart Chain (BSC) RPC 节点: 见 config.py 的 RPC_URLS（由 rpc_pool 共享）
 
 # 2. 文件名配置
 MAIN_WALLET_FILE = "main_wallet.txt"
@@ -39,24 +37,34 @@ OUTPUT_CSV_FILE = "gas_distribution_report.csv"
 MIN_AMOUNT_BNB = 0.00007
 MAX_AMOUNT_BNB = 0.00011
 
-# 4. 延迟配置
-DELAY_BETWEEN_TX = 0.5
+# 子钱包 BNB 余额已达到该值时跳过 (0 表示不检查，全部分发)
+SKIP_IF_BALANCE_BNB = MIN_AMOUNT_BNB
+
+# 4. 发送配置
+# 并发发送线程数（nonce 在本地分配，不再逐笔等待）
+SEND_WORKERS = GAS_CONFIG.get("SEND_WORKERS", 8)
+# nonce 冲突时的最大重试次数
+NONCE_RETRIES = 3
+# 发送完成后是否等待全部确认（期间处理被丢弃的交易）
+WAIT_FOR_CONFIRMATION = True
+# 等待确认的超时 (秒)
+CONFIRM_TIMEOUT = 300
 
 
 # ==================== 工具函数 ====================
 
 def load_main_private_key(file_path: str) -> Optional[str]:
-    """从文件读取主钱包私钥"""
+    """从文件读取主钱包私钥（存在 wallet.vault 时从加密钱包库读取）"""
     try:
-        with open(file_path, 'r') as f:
-            private_key = f.read().strip()
-            if not private_key:
-                print(f"✗ 错误: 文件 {file_path} 内容为空。")
-                return None
-            if not private_key.startswith('0x'):
-                private_key = '0x' + private_key
-            print(f"✓ 成功读取主钱包私钥。")
-            return private_key
+        lines = read_key_lines(file_path)
+        if not lines:
+            print(f"✗ 错误: 文件 {file_path} 内容为空。")
+            return None
+        private_key = lines[0]
+        if not private_key.startswith('0x'):
+            private_key = '0x' + private_key
+        print(f"✓ 成功读取主钱包私钥。")
+        return private_key
     except FileNotFoundError:
         print(f"✗ 错误: 未找到主钱包文件: {file_path}")
         return None
@@ -66,51 +74,35 @@ def load_main_private_key(file_path: str) -> Optional[str]:
 
 
 def load_target_addresses(file_path: str) -> List[str]:
-    """从 tokens.csv 文件加载子钱包地址"""
+    """从钱包存储加载子钱包地址（file_path 即 tokens.csv 有更新时先合并导入）"""
     addresses = set()
     try:
-        with open(file_path, 'r', newline='') as f:
-            reader = csv.reader(f)
-            try:
-                next(reader)
-            except StopIteration:
-                print(f"✗ 警告: 文件 {file_path} 为空。")
-                return []
-
-            for row in reader:
-                if row and row[0].strip():
-                    address = row[0].strip()
-                    try:
-                        checksum_address = Web3.to_checksum_address(address)
-                        addresses.add(checksum_address)
-                    except ValueError:
-                        print(f"✗ 警告: 发现无效地址 '{address}'，已跳过。")
-                        continue
-
-    except FileNotFoundError:
-        print(f"✗ 错误: 未找到子钱包文件: {file_path}")
-        return []
+        wallets = get_wallet_store(csv_path=file_path).wallets()
     except Exception as e:
         print(f"✗ 错误: 读取子钱包地址失败: {e}")
         return []
+    if not wallets:
+        print(f"✗ 错误: 未找到子钱包文件或文件为空: {file_path}")
+        return []
+
+    for address in wallets:
+        try:
+            addresses.add(Web3.to_checksum_address(address))
+        except ValueError:
+            print(f"✗ 警告: 发现无效地址 '{address}'，已跳过。")
 
     print(f"✓ 成功从 {file_path} 加载 {len(addresses)} 个子钱包地址。")
     return list(addresses)
 
 
-def connect_bsc(rpc_urls: List[str]) -> Optional[Web3]:
-    """连接BSC节点"""
+def connect_bsc(rpc_urls: List[str] = None) -> Optional[Web3]:
+    """连接BSC节点（共享节点池，请求发往最快的健康节点）"""
     print("【步骤1】尝试连接 BSC 节点...")
-    for rpc_url in rpc_urls:
-        try:
-            w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={'timeout': 30}))
-            if w3.is_connected():
-                if poa_middleware:
-                    w3.middleware_onion.inject(poa_middleware, layer=0)
-                print(f"✓ 成功连接BSC节点: {rpc_url}")
-                return w3
-        except:
-            continue
+    w3 = get_web3(rpc_urls)
+    if w3.is_connected():
+        print("✓ 成功连接BSC节点池:")
+        w3.provider.print_status()
+        return w3
     print("✗ 无法连接到任何BSC节点，请检查网络或RPC配置。")
     return None
 
@@ -120,7 +112,7 @@ def write_report(results: List[Dict[str, str]], output_file: str):
     print(f"\n正在生成报告文件: {output_file}...")
     try:
         with open(output_file, 'w', newline='') as f:
-            fieldnames = ['target_wallet', 'amount_bnb', 'status', 'tx_hash', 'error']
+            fieldnames = ['target_wallet', 'amount_bnb', 'status', 'tx_hash', 'nonce', 'error']
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
             writer.writerows(results)
@@ -131,8 +123,55 @@ def write_report(results: List[Dict[str, str]], output_file: str):
 
 # ==================== 核心分发逻辑 ====================
 
-def distribute_gas():
-    """执行Gas分发的主逻辑"""
+def distribute_gas_batched(w3: Web3, sign, sender_address: str, target_addresses: List[str]) -> List[Dict[str, str]]:
+    """
+    通过 Disperse 合约分批分发，每批一笔交易
+
+    Args:
+        w3: Web3 实例
+        sign: 签名函数，传入交易字典返回原始交易
+        sender_address: 主钱包地址
+        target_addresses: 子钱包地址
+
+    Returns:
+        每个子钱包的分发结果（同一批的地址共用交易哈希）
+    """
+    recipients = [a for a in target_addresses if a != sender_address]
+    amounts_bnb = [random.uniform(MIN_AMOUNT_BNB, MAX_AMOUNT_BNB) for _ in recipients]
+    amounts_wei = [w3.to_wei(amount, 'ether') for amount in amounts_bnb]
+
+    budget = gas_budget(w3)
+    print(f"  > 单批 gas 预算: {budget}，每批最多 {chunk_size(budget)} 个地址")
+    print("-" * 60)
+
+    started = time.time()
+    chunks = disperse_bnb(w3, sign, sender_address, recipients, amounts_wei, budget=budget)
+    elapsed = time.time() - started
+
+    results = []
+    gas_used = 0
+    for chunk in chunks:
+        gas_used += chunk['gas_used']
+        for address, amount in zip(chunk['recipients'], chunk['amounts']):
+            results.append({
+                'target_wallet': address,
+                'amount_bnb': f"{w3.from_wei(amount, 'ether'):.8f}",
+                'status': chunk['status'],
+                'tx_hash': chunk['tx_hash'],
+                'nonce': chunk['nonce'],
+                'error': chunk['error']
+            })
+    print(f"\n{len(chunks)} 笔交易，耗时 {elapsed:.1f}s，共消耗 gas {gas_used}")
+    return results
+
+
+def distribute_gas(batched: bool = False):
+    """
+    执行Gas分发的主逻辑
+
+    Args:
+        batched: 为 True 时通过 Disperse 合约分批分发，否则每个地址一笔转账
+    """
 
     print("=" * 60)
     print("BNB Gas 批量分发脚本启动 (随机金额)")
@@ -160,7 +199,36 @@ def distribute_gas():
         print(f"✗ 错误: 私钥格式无效，无法创建账户。{e}")
         return
 
-    # 3. 检查主钱包余额
+    # 3. 读取子钱包余额快照，跳过余额已足够的钱包，余额最低的优先分发
+    skipped_results = []
+    if SKIP_IF_BALANCE_BNB > 0:
+        try:
+            snapshot = scan_balances(w3, target_addresses)
+            threshold_wei = w3.to_wei(SKIP_IF_BALANCE_BNB, 'ether')
+            print_snapshot_summary(w3, snapshot, threshold_wei)
+            needy = set(snapshot.below(threshold_wei))
+            skipped = []
+            for address in target_addresses:
+                if address not in needy:
+                    skipped.append({
+                        'target_wallet': address,
+                        'amount_bnb': '',
+                        'status': 'Skipped',
+                        'tx_hash': '',
+                        'nonce': '',
+                        'error': f"HasBalance {w3.from_wei(snapshot.bnb_of(address), 'ether'):.8f}"
+                    })
+            skipped_results = skipped
+            target_addresses = snapshot.by_bnb(a for a in target_addresses if a in needy)
+            print(f"✓ 跳过余额已达 {SKIP_IF_BALANCE_BNB} BNB 的子钱包 {len(skipped_results)} 个，"
+                  f"待分发 {len(target_addresses)} 个")
+        except Exception as e:
+            print(f"⚠ 读取子钱包余额失败，将分发给全部子钱包: {e}")
+        if not target_addresses:
+            write_report(skipped_results, OUTPUT_CSV_FILE)
+            return
+
+    # 检查主钱包余额
     total_required_bnb_max = MAX_AMOUNT_BNB * len(target_addresses)
 
     try:
@@ -184,10 +252,28 @@ def distribute_gas():
     print("【步骤2】开始批量分发 Gas")
     print("=" * 60)
 
-    results = []
+    def sign(tx: dict) -> bytes:
+        signed_tx = w3.eth.account.sign_transaction(tx, private_key=main_pk)
+        raw_tx = getattr(signed_tx, 'raw_transaction', None) or getattr(signed_tx, 'rawTransaction', None)
+        if not raw_tx:
+            raise AttributeError("SignedTransaction object is missing 'raw_transaction' attribute.")
+        return raw_tx
+
+    if batched:
+        results = distribute_gas_batched(w3, sign, sender_address, target_addresses)
+        print("\n" + "=" * 60)
+        print("Gas 分发任务完成 (Disperse 合约)")
+        print("=" * 60)
+        write_report(skipped_results + results, OUTPUT_CSV_FILE)
+        success_count = sum(1 for r in results if r['status'] == 'Success')
+        print(f"总计尝试分发: {len(results)} 个地址")
+        print(f"链上确认成功: {success_count} 个地址")
+        print("请查看 gas_distribution_report.csv 文件获取详细状态。")
+        return
 
-    nonce = w3.eth.get_transaction_count(sender_address)
-    gas_price = w3.eth.gas_price
+    nonce_manager = NonceManager(w3, sender_address)
+    gas_oracle = get_gas_oracle(w3)
+    gas_price = gas_oracle.price()
     gas_limit = 25000
 
     gas_price_gwei = w3.from_wei(gas_price, 'gwei')
@@ -195,96 +281,166 @@ def distribute_gas():
 
     print(f"  > Gas Price: {gas_price_gwei} Gwei")
     print(f"  > 每笔交易估计Gas费: {estimated_tx_cost:.6f} BNB")
+    print(f"  > 并发发送线程: {SEND_WORKERS}")
     print("-" * 60)
 
-    for i, recipient_address in enumerate(target_addresses):
+    # 余额不足后停止发送剩余交易
+    stop_event = threading.Event()
+    total = len(target_addresses)
+    results = [None] * total
 
-        amount_bnb_to_send = random.uniform(MIN_AMOUNT_BNB, MAX_AMOUNT_BNB)
-        amount_wei = w3.to_wei(amount_bnb_to_send, 'ether')
-
-        current_result = {
+    def new_result(recipient_address: str, amount_bnb: float) -> Dict[str, str]:
+        return {
             'target_wallet': recipient_address,
-            'amount_bnb': f"{amount_bnb_to_send:.8f}",
+            'amount_bnb': f"{amount_bnb:.8f}",
             'status': 'Failed',
             'tx_hash': '',
+            'nonce': '',
             'error': ''
         }
 
-        print(f"[{i + 1}/{len(target_addresses)}] 发送到 {recipient_address} (金额: {amount_bnb_to_send:.8f} BNB)...")
+    def build_tx(recipient_address: str, amount_wei: int, nonce: int) -> dict:
+        return {
+            'from': sender_address,
+            'to': recipient_address,
+            'value': amount_wei,
+            'gas': gas_limit,
+            'gasPrice': gas_price,
+            'nonce': nonce,
+            'chainId': 56
+        }
 
+    # 先按顺序分配 nonce 并构建全部交易，在进程池中批量签名
+    planned = []
+    for i, recipient_address in enumerate(target_addresses):
+        amount_bnb_to_send = random.uniform(MIN_AMOUNT_BNB, MAX_AMOUNT_BNB)
         if recipient_address == sender_address:
-            current_result['status'] = 'Skipped'
-            current_result['error'] = 'SelfTransfer'
-            print("  - 警告: 目标地址是主钱包自己，跳过。")
-            results.append(current_result)
+            results[i] = new_result(recipient_address, amount_bnb_to_send)
+            results[i]['status'] = 'Skipped'
+            results[i]['error'] = 'SelfTransfer'
+            print(f"[{i + 1}/{total}] - 警告: 目标地址 {recipient_address} 是主钱包自己，跳过。")
             continue
+        tx = build_tx(recipient_address, w3.to_wei(amount_bnb_to_send, 'ether'), nonce_manager.allocate())
+        planned.append((i, recipient_address, amount_bnb_to_send, tx))
+
+    with TransactionSigner([main_pk]) as signer:
+        raw_txs = signer.sign_batch([tx for _, _, _, tx in planned])
+    signer.print_stats()
+
+    def send_one(i: int, recipient_address: str, amount_bnb_to_send: float,
+                 tx: dict, raw_tx: Optional[bytes]) -> Dict[str, str]:
+        current_result = new_result(recipient_address, amount_bnb_to_send)
+        # 原 nonce 已被链上其它交易占用并 release，需要换一个新 nonce
+        renonce = False
+
+        for _ in range(NONCE_RETRIES):
+            if stop_event.is_set():
+                # 预先分配的 nonce 没有发送，稍后作为末尾空洞丢弃
+                nonce_manager.mark_failed(tx['nonce'])
+                current_result['error'] = 'Aborted'
+                return current_result
+
+            if renonce:
+                tx = dict(tx, nonce=nonce_manager.allocate())
+                renonce = False
+            nonce = tx['nonce']
+            current_result['nonce'] = nonce
 
-        try:
-            tx = {
-                'from': sender_address,
-                'to': recipient_address,
-                'value': amount_wei,
-                'gas': gas_limit,
-                'gasPrice': gas_price,
-                'nonce': nonce,
-                'chainId': 56
-            }
-
-            signed_tx = w3.eth.account.sign_transaction(tx, private_key=main_pk)
-
-            raw_tx = getattr(signed_tx, 'raw_transaction', None) or getattr(signed_tx, 'rawTransaction', None)
-
-            if not raw_tx:
-                raise AttributeError("SignedTransaction object is missing 'raw_transaction' attribute.")
-
-            tx_hash = w3.eth.send_raw_transaction(raw_tx)
-
-            print(f"  - ✓ 交易已发送! Hash: {tx_hash.hex()[:10]}...")
-            print(f"  - 详情: https://bscscan.com/tx/{tx_hash.hex()}")
-
-            nonce += 1
-
+            try:
+                raw_tx = raw_tx or sign(tx)
+                try:
+                    tx_hash = w3.eth.send_raw_transaction(raw_tx)
+                except Exception as e:
+                    # 同一笔交易已在节点中（例如超时后切换节点重发）
+                    if "already known" not in str(e).lower():
+                        raise
+                    tx_hash = w3.keccak(raw_tx)
+            except Exception as e:
+                error_msg = str(e)
+
+                if "nonce too low" in error_msg.lower():
+                    # nonce 已被其它交易占用，重新同步后换一个 nonce 重试
+                    nonce_manager.release(nonce)
+                    nonce_manager.sync()
+                    current_result['error'] = 'NonceError'
+                    raw_tx = None
+                    renonce = True
+                    continue
+
+                nonce_manager.mark_failed(nonce)
+                if "insufficient funds" in error_msg.lower():
+                    print(f"[{i + 1}/{total}] - ✗ 错误: 主钱包余额不足以支付当前交易的 Gas 或金额。")
+                    current_result['error'] = 'InsufficientFunds'
+                    stop_event.set()
+                elif "raw_transaction" in error_msg:
+                    print(f"[{i + 1}/{total}] - ✗ 错误: web3.py 属性访问失败。请尝试升级或降级 web3.py 版本。")
+                    current_result['error'] = 'AttributeError'
+                else:
+                    print(f"[{i + 1}/{total}] - ✗ 交易失败: {error_msg}")
+                    current_result['error'] = error_msg[:100]
+                return current_result
+
+            nonce_manager.mark_sent(nonce, tx, raw_tx, tx_hash)
+            print(f"[{i + 1}/{total}] ✓ {recipient_address} {amount_bnb_to_send:.8f} BNB "
+                  f"nonce={nonce} Hash: {tx_hash.hex()[:10]}...")
             current_result['status'] = 'Success'
             current_result['tx_hash'] = tx_hash.hex()
-
-        except Exception as e:
-            error_msg = str(e)
-
-            if "nonce too low" in error_msg.lower():
-                print("  - ✗ 错误: Nonce 过低，尝试重新获取 Nonce。")
-                nonce = w3.eth.get_transaction_count(sender_address)
-                current_result['error'] = 'NonceError'
-            elif "insufficient funds" in error_msg.lower():
-                print("  - ✗ 错误: 主钱包余额不足以支付当前交易的 Gas 或金额。")
-                current_result['error'] = 'InsufficientFunds'
-                break
-            elif "raw_transaction" in error_msg:
-                print("  - ✗ 错误: web3.py 属性访问失败。请尝试升级或降级 web3.py 版本。")
-                current_result['error'] = 'AttributeError'
-
-            else:
-                print(f"  - ✗ 交易失败: {error_msg}")
-                current_result['error'] = error_msg[:100]
-
-        results.append(current_result)
-
-        time.sleep(DELAY_BETWEEN_TX)
+            current_result['error'] = ''
+            return current_result
+
+        return current_result
+
+    # 按 nonce 顺序交给发送线程，不再逐笔 sleep
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=SEND_WORKERS) as executor:
+        futures = {executor.submit(send_one, i, address, amount, tx, raw_tx): i
+                   for (i, address, amount, tx), raw_tx in zip(planned, raw_txs)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    elapsed = time.time() - started
+    print(f"\n发送耗时: {elapsed:.1f}s，速率: {total / elapsed if elapsed else 0:.1f} 笔/秒")
+
+    # 发送失败留下的 nonce 空洞会卡住其后的所有交易，用替换交易补齐
+    nonce_manager.trim_trailing()
+    filled = nonce_manager.fill_gaps(sign, gas_price)
+    if filled:
+        print(f"✓ 已用替换交易补齐 {filled} 个 nonce 空洞")
+    gaps = nonce_manager.gaps()
+    if gaps:
+        print(f"✗ 仍有 {len(gaps)} 个 nonce 空洞未补齐 (nonce {', '.join(map(str, gaps))})，"
+              f"其后的交易会一直卡在交易池，请给主钱包充值后重新运行")
+
+    if WAIT_FOR_CONFIRMATION:
+        print("等待全部交易确认...")
+        if nonce_manager.wait_confirmed(sign, CONFIRM_TIMEOUT):
+            print("✓ 全部交易已确认")
+        else:
+            print(f"⚠ {CONFIRM_TIMEOUT} 秒内未全部确认，请稍后在浏览器中检查")
+        # 被替换的交易哈希会变化
+        hashes = nonce_manager.tx_hashes()
+        for result in results:
+            if result['status'] == 'Success' and result['nonce'] in hashes:
+                result['tx_hash'] = hashes[result['nonce']]
 
     # 5. 总结和报告
     print("\n" + "=" * 60)
     print("Gas 分发任务完成")
     print("=" * 60)
-    write_report(results, OUTPUT_CSV_FILE)
+    write_report(skipped_results + results, OUTPUT_CSV_FILE)
 
     success_count = sum(1 for r in results if r['status'] == 'Success')
-    print(f"总计尝试分发: {len(target_addresses)} 笔")
-    print(f"成功发送交易: {success_count} 笔 (注意：发送成功不代表链上确认成功)")
+    stats = nonce_manager.stats()
+    print(f"总计尝试分发: {total} 笔")
+    print(f"成功发送交易: {success_count} 笔" + ("" if WAIT_FOR_CONFIRMATION else " (注意：发送成功不代表链上确认成功)"))
+    print(f"Nonce: 补齐空洞 {stats['gaps_filled']}，重新广播 {stats['rebroadcasts']}，"
+          f"替换 {stats['replacements']}，重新同步 {stats['resyncs']}")
+    gas_oracle.print_stats()
     print("请查看 gas_distribution_report.csv 文件获取详细状态。")
 
 
 if __name__ == "__main__":
     # 演示用的文件创建
-    if not os.path.exists(MAIN_WALLET_FILE):
+    if not os.path.exists(MAIN_WALLET_FILE) and not os.path.exists(VAULT_FILE):
         with open(MAIN_WALLET_FILE, "w") as f:
             f.write("# 请将您的主钱包私钥填入此文件（移除此注释行）\n")
             f.write("# YOUR_MAIN_WALLET_PRIVATE_KEY_HERE\n")
@@ -298,5 +454,9 @@ if __name__ == "__main__":
             writer.writerow(['0x0000000000000000000000000000000000000002', 'token2', '2025-01-01'])
         print(f"[INFO] 请将您的子钱包地址填入 {TOKENS_CSV_FILE} 文件的 'wallet' 列。")
 
-    distribute_gas()
+    parser = argparse.ArgumentParser(description="批量分发 BNB Gas")
+    parser.add_argument("--batch", action="store_true", help="通过 Disperse 合约分批分发（每批一笔交易）")
+    args = parser.parse_args()
+
+    distribute_gas(batched=args.batch)
 
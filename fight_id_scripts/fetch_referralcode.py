@@ -3,9 +3,10 @@
 
 import requests
 import csv
-import os
 import random
 
+from wallet_store import get_wallet_store
+
 user_agents = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
     'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36',
@@ -22,7 +23,8 @@ def fetch_referral_codes():
     input_csv = "tokens.csv"
     output_csv = "referral_info_main.csv"
 
-    if not os.path.exists(input_csv):
+    store = get_wallet_store(csv_path=input_csv)
+    if not store.count():
         print(f"❌ 输入文件 {input_csv} 不存在！")
         return
 
@@ -31,19 +33,17 @@ def fetch_referral_codes():
     valid_rows = []
 
     try:
-        with open(input_csv, mode='r', newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                wallet = row.get('wallet', '').strip()
-                token = row.get('token', '').strip()
-                if wallet and token:
-                    wallets.append(wallet)
-                    tokens.append(token)
-                    valid_rows.append(True)
-                else:
-                    wallets.append(wallet if wallet else f"EMPTY_WALLET_{len(wallets)}")
-                    tokens.append("")
-                    valid_rows.append(False)
+        for row in store.rows(valid_only=False):
+            wallet = row.get('wallet', '').strip()
+            token = row.get('token', '').strip()
+            if wallet and token:
+                wallets.append(wallet)
+                tokens.append(token)
+                valid_rows.append(True)
+            else:
+                wallets.append(wallet if wallet else f"EMPTY_WALLET_{len(wallets)}")
+                tokens.append("")
+                valid_rows.append(False)
     except Exception as e:
         print(f"❌ 读取 {input_csv} 失败: {e}")
         return
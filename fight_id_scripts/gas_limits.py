@@ -0,0 +1,147 @@
+"""
+Gas limit 缓存
+同一合约函数（合约地址 + 函数选择器）的 gas 消耗在不同钱包之间几乎相同，
+从成功交易回执的 gasUsed 学习，取高分位数再加余量作为 gas limit，
+只在缓存未命中或出现 revert 后才用 estimate_gas 在节点上完整模拟一次。
+学习结果保存到文件，下次运行直接使用
+"""
+
+import os
+import json
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+from parallel import percentile
+
+try:
+    from config import GAS_LIMIT_CONFIG
+except ImportError:
+    GAS_LIMIT_CONFIG = {}
+
+# ==================== 配置 ====================
+# 缓存文件
+CACHE_FILE = GAS_LIMIT_CONFIG.get("CACHE_FILE", "gas_limit_cache.json")
+# 每个函数保留的最近 gasUsed 样本数
+WINDOW = GAS_LIMIT_CONFIG.get("WINDOW", 50)
+# 至少有几个样本才使用缓存（之前用 estimate_gas 结果）
+MIN_SAMPLES = GAS_LIMIT_CONFIG.get("MIN_SAMPLES", 3)
+# 取样本的分位数
+PERCENTILE = GAS_LIMIT_CONFIG.get("PERCENTILE", 95)
+# 在分位数基础上的余量
+HEADROOM = GAS_LIMIT_CONFIG.get("HEADROOM", 1.2)
+# estimate_gas 结果的余量（与原来的估算逻辑一致）
+ESTIMATE_HEADROOM = 1.2
+
+
+def function_key(contract_function) -> str:
+    """缓存键: 小写合约地址:函数选择器"""
+    return f"{contract_function.address.lower()}:{contract_function.selector}"
+
+
+class GasLimitCache:
+    """按合约函数缓存 gas limit（线程安全）"""
+
+    def __init__(self, path: Optional[str] = CACHE_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.samples: Dict[str, deque] = {}
+        # 回执 revert 后需要重新估算的函数
+        self.stale = set()
+
+        # 统计
+        self.hits = 0
+        self.estimates = 0
+
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for key, values in data.items():
+            self.samples[key] = deque(values, maxlen=WINDOW)
+
+    def _save(self):
+        if not self.path:
+            return
+        data = {key: list(values) for key, values in self.samples.items()}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def cached_limit(self, key: str) -> Optional[int]:
+        """
+        缓存中的 gas limit
+
+        Returns:
+            样本不足或 revert 后返回 None
+        """
+        with self.lock:
+            values = self.samples.get(key)
+            if key in self.stale or not values or len(values) < MIN_SAMPLES:
+                return None
+            return int(percentile(values, PERCENTILE) * HEADROOM)
+
+    def gas_limit(self, contract_function, tx_params: dict) -> tuple:
+        """
+        获取合约调用的 gas limit，缓存未命中时 estimate_gas
+
+        Args:
+            contract_function: 已绑定参数的合约函数，例如 contract.functions.claim(...)
+            tx_params: estimate_gas 的交易参数（至少包含 from）
+
+        Returns:
+            (gas limit, 来源 "cache" 或 "estimate", estimate_gas 的原始值或 None)
+        """
+        key = function_key(contract_function)
+        limit = self.cached_limit(key)
+        if limit is not None:
+            with self.lock:
+                self.hits += 1
+            return limit, "cache", None
+
+        estimated = contract_function.estimate_gas(tx_params)
+        with self.lock:
+            self.estimates += 1
+            self.stale.discard(key)
+        return int(estimated * ESTIMATE_HEADROOM), "estimate", estimated
+
+    def observe(self, contract_function, receipt):
+        """
+        用交易回执更新缓存: 成功时记录 gasUsed，revert 时下次重新估算
+
+        Args:
+            contract_function: 发送交易用的合约函数
+            receipt: 交易回执
+        """
+        key = function_key(contract_function)
+        with self.lock:
+            if receipt['status'] == 1:
+                self.samples.setdefault(key, deque(maxlen=WINDOW)).append(receipt['gasUsed'])
+                self._save()
+            else:
+                # 可能是 gas limit 不够（out of gas），也可能是业务 revert，都回到实时估算
+                self.stale.add(key)
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {"hits": self.hits, "estimates": self.estimates, "functions": len(self.samples)}
+
+
+_shared_cache: Optional[GasLimitCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_gas_limit_cache() -> GasLimitCache:
+    """获取进程内共享的 gas limit 缓存"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = GasLimitCache()
+        return _shared_cache
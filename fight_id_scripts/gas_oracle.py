@@ -0,0 +1,128 @@
+"""
+共享 gas price 预言机
+按出块间隔缓存 gas price，所有发送交易的调用方共用，避免每笔交易前都请求一次 eth_gasPrice。
+支持节点报价或最近区块小费分位数两种策略，以及倍数缓冲
+"""
+
+import time
+import threading
+from typing import Dict, Optional
+
+from web3 import Web3
+
+try:
+    from config import GAS_ORACLE_CONFIG
+except ImportError:
+    GAS_ORACLE_CONFIG = {}
+
+# ==================== 配置 ====================
+# 缓存有效期 (秒)，BSC 约 3 秒出一个块，即每个区块最多刷新一次
+TTL = GAS_ORACLE_CONFIG.get("TTL", 3.0)
+# 策略: "node" 使用 eth_gasPrice；"percentile" 使用 eth_feeHistory 最近区块小费的分位数 + 下一块 baseFee
+STRATEGY = GAS_ORACLE_CONFIG.get("STRATEGY", "node")
+# percentile 策略的分位数和统计区块数
+PERCENTILE = GAS_ORACLE_CONFIG.get("PERCENTILE", 50)
+FEE_HISTORY_BLOCKS = GAS_ORACLE_CONFIG.get("FEE_HISTORY_BLOCKS", 10)
+# 默认倍数
+MULTIPLIER = GAS_ORACLE_CONFIG.get("MULTIPLIER", 1.0)
+
+
+class GasOracle:
+    """缓存的 gas price（线程安全）"""
+
+    def __init__(self, w3: Web3, ttl: float = TTL, strategy: str = STRATEGY,
+                 percentile: float = PERCENTILE, multiplier: float = MULTIPLIER):
+        self.w3 = w3
+        self.ttl = ttl
+        self.strategy = strategy
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.lock = threading.Lock()
+        self.cached = None
+        self.fetched_at = 0.0
+
+        # 统计
+        self.served = 0
+        self.refreshes = 0
+        self.fallbacks = 0
+
+    def _fetch_percentile(self) -> int:
+        history = self.w3.eth.fee_history(FEE_HISTORY_BLOCKS, 'latest', [self.percentile])
+        rewards = sorted(r[0] for r in history['reward'] if r)
+        if not rewards:
+            raise ValueError("feeHistory 没有小费数据")
+        # baseFeePerGas 的最后一项是下一个区块的 baseFee
+        return history['baseFeePerGas'][-1] + rewards[len(rewards) // 2]
+
+    def _fetch(self) -> int:
+        if self.strategy == "percentile":
+            self.refreshes += 1
+            try:
+                price = self._fetch_percentile()
+                if price > 0:
+                    return price
+            except Exception:
+                pass
+            # 节点不支持 feeHistory 或数据为 0 时退回节点报价
+            self.fallbacks += 1
+        self.refreshes += 1
+        return self.w3.eth.gas_price
+
+    def base_price(self) -> int:
+        """未加倍数的 gas price，缓存过期时刷新"""
+        with self.lock:
+            if self.cached is None or time.time() - self.fetched_at >= self.ttl:
+                self.cached = self._fetch()
+                self.fetched_at = time.time()
+            self.served += 1
+            return self.cached
+
+    def price(self, multiplier: Optional[float] = None) -> int:
+        """
+        获取 gas price
+
+        Args:
+            multiplier: 倍数缓冲，默认使用构造时的 multiplier
+
+        Returns:
+            gas price (wei)
+        """
+        return int(self.base_price() * (multiplier if multiplier is not None else self.multiplier))
+
+    def invalidate(self):
+        """丢弃缓存，下次调用时重新获取（例如替换交易前需要最新价格）"""
+        with self.lock:
+            self.cached = None
+
+    def stats(self) -> dict:
+        return {
+            "served": self.served,
+            "rpc_calls": self.refreshes,
+            "saved": max(0, self.served - self.refreshes),
+            "fallbacks": self.fallbacks
+        }
+
+    def print_stats(self):
+        stats = self.stats()
+        print(f"Gas 预言机: 提供 {stats['served']} 次报价，RPC 请求 {stats['rpc_calls']} 次，"
+              f"节省 {stats['saved']} 次")
+
+
+_shared_oracles: Dict[int, GasOracle] = {}
+_shared_lock = threading.Lock()
+
+
+def get_gas_oracle(w3: Optional[Web3] = None) -> GasOracle:
+    """
+    获取进程内共享的 gas 预言机（每个 Web3 实例一个）
+
+    Args:
+        w3: Web3 实例，默认使用 rpc_pool 的共享实例
+    """
+    if w3 is None:
+        from rpc_pool import get_web3
+        w3 = get_web3()
+    with _shared_lock:
+        if id(w3) not in _shared_oracles:
+            _shared_oracles[id(w3)] = GasOracle(w3)
+        return _shared_oracles[id(w3)]
@@ -0,0 +1,236 @@
+"""
+并发 SIWA 登录
+每个钱包登录是两次往返（获取 nonce、回调认证），原来逐个钱包处理并固定间隔等待，时间几乎都花在网络上。
+LoginEngine 在线程池中并发登录，所有请求经过同一个限速器，总请求速率不超过配置值；
+会话放在池里复用（保持连接），每个钱包借用一个会话完成两步，归还前清空 cookie。
+登录签名的是固定文本、与 nonce 无关，所以先在进程池中签好，请求线程只负责网络
+"""
+
+import os
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from eth_account import Account
+from eth_account.messages import encode_defunct
+
+from parallel import parallel_chunks, percentile
+
+try:
+    from config import LOGIN_CONFIG
+except ImportError:
+    LOGIN_CONFIG = {}
+
+# ==================== 配置 ====================
+# 并发登录线程数（同时也是会话池大小）
+LOGIN_WORKERS = LOGIN_CONFIG.get("WORKERS", 8)
+# 全局 API 请求速率 (请求/秒)，0 表示不限速
+LOGIN_RATE = LOGIN_CONFIG.get("RATE", 5.0)
+# 空闲后允许连续发出的请求数
+LOGIN_BURST = LOGIN_CONFIG.get("BURST", 5)
+# 签名进程数，默认 CPU 核数
+SIGN_WORKERS = os.cpu_count() or 1
+# 少于该数量的钱包直接在当前进程签名（启动进程池的开销更大）
+MIN_PARALLEL_SIGN = 256
+
+SIWA_MESSAGE = "Sign in to get access to FIGHT.iD"
+STEPS = ("nonce", "callback")
+
+
+def sign_login(private_key: str) -> Optional[dict]:
+    """
+    签名 SIWA 登录消息
+
+    Returns:
+        {'address', 'signature', 'success'}，私钥无效时返回 None
+    """
+    try:
+        account = Account.from_key(private_key)
+        signed_message = account.sign_message(encode_defunct(text=SIWA_MESSAGE))
+    except Exception:
+        return None
+    return {
+        'address': account.address,
+        'signature': signed_message.signature.hex(),
+        'success': True
+    }
+
+
+def _sign_chunk(private_keys: List[str]) -> List[Optional[dict]]:
+    return [sign_login(k) for k in private_keys]
+
+
+class RateLimiter:
+    """全局请求限速（令牌桶，线程安全）"""
+
+    def __init__(self, rate: float = LOGIN_RATE, burst: int = LOGIN_BURST):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.burst = max(1, burst)
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+        self.local = threading.local()
+        # 统计: 累计等待时间
+        self.waited = 0.0
+
+    def acquire(self):
+        """等到可以发出下一个请求"""
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            # 空闲期间最多积攒 burst 个请求
+            self.next_slot = max(self.next_slot, now - (self.burst - 1) * self.interval)
+            wait = self.next_slot - now
+            self.next_slot += self.interval
+            if wait > 0:
+                self.waited += wait
+        if wait > 0:
+            self.local.waited = self.thread_waited() + wait
+            time.sleep(wait)
+
+    def thread_waited(self) -> float:
+        """当前线程累计的限速等待时间"""
+        return getattr(self.local, "waited", 0.0)
+
+    def backoff(self, seconds: float):
+        """服务端返回 429 时，所有线程一起暂停 seconds 秒"""
+        with self.lock:
+            self.next_slot = max(self.next_slot, time.monotonic() + seconds)
+
+
+class LoginEngine:
+    """
+    并发登录
+
+    client 提供协议实现（batch_login.SIWAClient）:
+        new_session()、step1_get_nonce(session=)、step2_callback(nonce_data, private_key, session=, sign_result=)、
+        _update_token_record(address, token)，以及 limiter / verbose 属性
+    """
+
+    def __init__(self, client, workers: int = LOGIN_WORKERS, rate: float = LOGIN_RATE,
+                 burst: int = LOGIN_BURST, sign_workers: int = SIGN_WORKERS):
+        self.client = client
+        self.workers = max(1, workers)
+        self.sign_workers = max(1, sign_workers)
+        self.rate = rate
+        self.limiter = RateLimiter(rate, burst)
+        self.client.limiter = self.limiter
+        self.sessions: "queue.Queue" = queue.Queue()
+        for _ in range(self.workers):
+            self.sessions.put(client.new_session())
+        self.lock = threading.Lock()
+
+        # 统计
+        self.latencies: Dict[str, List[float]] = {step: [] for step in STEPS}
+        self.successful = 0
+        self.failed = 0
+        self.elapsed = 0.0
+
+    def _signed_chunks(self, private_keys: List[str]) -> Iterator[Tuple[int, List[Optional[dict]]]]:
+        """按块签名，逐块返回 (起始下标, 签名结果)，签好一块就可以开始登录"""
+        if len(private_keys) < MIN_PARALLEL_SIGN or self.sign_workers == 1:
+            yield 0, _sign_chunk(private_keys)
+            return
+        yield from parallel_chunks(_sign_chunk, private_keys, self.sign_workers)
+
+    def _timed(self, step: str, func, *args, **kwargs):
+        """执行一步并记录耗时（不含限速等待）"""
+        started = time.perf_counter()
+        waited = self.limiter.thread_waited()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started - (self.limiter.thread_waited() - waited)
+            with self.lock:
+                self.latencies[step].append(elapsed)
+
+    def login(self, private_key: str, sign_result: Optional[dict]) -> dict:
+        """
+        登录单个钱包（借用池中的会话）
+
+        Returns:
+            step2_callback 的结果，失败时 {'success': False, 'address', 'error'}
+        """
+        if not sign_result:
+            return {'success': False, 'address': None, 'error': '无效的私钥'}
+        address = sign_result['address']
+
+        session = self.sessions.get()
+        try:
+            # 会话在钱包之间复用连接，但不能带上一个钱包的 cookie
+            session.cookies.clear()
+            step1 = self._timed("nonce", self.client.step1_get_nonce, session=session)
+            nonce_data = step1.get('data') if step1['success'] else None
+            if not nonce_data:
+                self.client._update_token_record(address, None)
+                return {'success': False, 'address': address, 'error': step1.get('error', '未获取到nonce数据')}
+            return self._timed("callback", self.client.step2_callback, nonce_data, private_key,
+                               session=session, sign_result=sign_result)
+        except Exception as e:
+            return {'success': False, 'address': address, 'error': str(e)}
+        finally:
+            self.sessions.put(session)
+
+    def run(self, private_keys: List[str]) -> List[dict]:
+        """
+        并发登录全部钱包
+
+        Args:
+            private_keys: 私钥列表
+
+        Returns:
+            每个钱包的结果，顺序与 private_keys 相同
+        """
+        total = len(private_keys)
+        results: List[Optional[dict]] = [None] * total
+        verbose = self.client.verbose
+        # 并发时逐步输出会交错在一起，只输出每个钱包的结果
+        self.client.verbose = False
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = {}
+                for start, signed in self._signed_chunks(private_keys):
+                    for offset, sign_result in enumerate(signed):
+                        index = start + offset
+                        futures[executor.submit(self.login, private_keys[index], sign_result)] = index
+
+                for done, future in enumerate(as_completed(futures), 1):
+                    index = futures[future]
+                    result = results[index] = future.result()
+                    if result['success']:
+                        self.successful += 1
+                        print(f"[{done}/{total}] ✅ {result['address']}")
+                    else:
+                        self.failed += 1
+                        wallet = result.get('address') or private_keys[index][:20] + "..."
+                        print(f"[{done}/{total}] ❌ {wallet}: {result.get('error', '未知错误')}")
+        finally:
+            self.elapsed += time.perf_counter() - started
+            self.client.verbose = verbose
+        return results
+
+    def stats(self) -> dict:
+        with self.lock:
+            processed = self.successful + self.failed
+            stats = {
+                "successful": self.successful,
+                "failed": self.failed,
+                "workers": self.workers,
+                "per_second": processed / self.elapsed if self.elapsed else 0.0,
+                "throttled": self.limiter.waited
+            }
+            for step in STEPS:
+                stats[f"{step}_p50"] = percentile(self.latencies[step], 50)
+                stats[f"{step}_p95"] = percentile(self.latencies[step], 95)
+            return stats
+
+    def print_stats(self):
+        stats = self.stats()
+        rate = f"限速 {self.rate:g} 请求/秒" if self.rate > 0 else "不限速"
+        print(f"登录: {stats['per_second']:.2f} 个/秒，{stats['workers']} 个线程，{rate}，"
+              f"限速累计等待 {stats['throttled']:.1f} 秒")
+        print(f"  获取nonce: p50 {stats['nonce_p50'] * 1000:.0f}ms，p95 {stats['nonce_p95'] * 1000:.0f}ms；"
+              f"回调认证: p50 {stats['callback_p50'] * 1000:.0f}ms，p95 {stats['callback_p95'] * 1000:.0f}ms")
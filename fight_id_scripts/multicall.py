@@ -0,0 +1,189 @@
+"""
+Multicall3 工具
+把大量 view 调用合并为少量 aggregate3 eth_call，批次过大被节点拒绝时自动减半，之后连续成功再逐步放大
+"""
+
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from eth_abi import decode, encode
+from web3 import Web3
+
+# Multicall3 在 BSC 等链上的统一部署地址
+MULTICALL3 = '0xcA11bde05977b3631167028862bE2a173976CA11'
+
+# ==================== 配置 ====================
+# 单次 aggregate3 的调用数
+MULTICALL_CHUNK = 500
+# 批次失败后的重试等待 (秒)
+RETRY_DELAY = 0.5
+# 缩小后连续成功多少批再尝试加倍
+GROW_AFTER = 4
+
+MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Call3[]",
+                "name": "calls",
+                "type": "tuple[]"
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"}
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]"
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function"
+    }
+]
+
+
+class AdaptiveChunker:
+    """
+    批次大小自适应：失败后减半重试，连续成功 grow_after 批后加倍（不超过初始大小）
+
+    一次瞬时的 RPC 错误不会让之后的请求一直停留在小批次；
+    放大后马上又失败的多半是节点的固定限制，下次放大前要连续成功更多批
+    """
+
+    def __init__(self, size: int, grow_after: int = GROW_AFTER):
+        self.max_size = size
+        self.size = size
+        self.grow_after = grow_after
+        self.streak = 0
+        self.grown = False
+        # 统计
+        self.requests = 0
+        self.failures = 0
+
+    def success(self):
+        self.requests += 1
+        self.grown = False
+        self.streak += 1
+        if self.streak >= self.grow_after and self.size < self.max_size:
+            self.size = min(self.max_size, self.size * 2)
+            self.streak = 0
+            self.grown = True
+
+    def failure(self) -> bool:
+        """返回 False 表示已是最小批次，无法再缩小"""
+        self.requests += 1
+        self.failures += 1
+        self.streak = 0
+        if self.grown:
+            self.grow_after *= 2
+            self.grown = False
+        if self.size <= 1:
+            return False
+        self.size = max(1, self.size // 2)
+        return True
+
+
+def read_in_chunks(items: Sequence, read: Callable[[Sequence], list], chunker: AdaptiveChunker,
+                   failed: Callable[[object, Exception], object]) -> list:
+    """
+    按自适应批次读取，失败的批次减半重试
+
+    Args:
+        items: 输入
+        read: 读取一批，返回与该批等长的结果
+        chunker: 批次大小
+        failed: 批次减到 1 仍失败时，用 failed(该项, 异常) 作为该项的结果
+
+    Returns:
+        与 items 一一对应的结果
+    """
+    results = []
+    position = 0
+    while position < len(items):
+        chunk = items[position:position + chunker.size]
+        try:
+            values = read(chunk)
+        except Exception as e:
+            if chunker.failure():
+                time.sleep(RETRY_DELAY)
+                continue
+            results.append(failed(chunk[0], e))
+            position += 1
+            continue
+        chunker.success()
+        results.extend(values)
+        position += len(chunk)
+    return results
+
+
+def has_multicall(w3: Web3, address: str = MULTICALL3) -> bool:
+    """节点上是否部署了 Multicall3"""
+    try:
+        return len(w3.eth.get_code(Web3.to_checksum_address(address))) > 0
+    except Exception:
+        return False
+
+
+def _argument_types(signature: str) -> List[str]:
+    inner = signature[signature.index('(') + 1:signature.rindex(')')]
+    return [t.strip() for t in inner.split(',')] if inner.strip() else []
+
+
+def encode_call(signature: str, args: Sequence = ()) -> bytes:
+    """
+    编码函数调用
+
+    Args:
+        signature: 函数签名，如 "balanceOf(address,uint256)"
+        args: 参数
+
+    Returns:
+        calldata
+    """
+    selector = Web3.keccak(text=signature)[:4]
+    return bytes(selector) + encode(_argument_types(signature), list(args))
+
+
+def decode_result(types: Sequence[str], data: bytes) -> Optional[tuple]:
+    """解码返回值，数据为空或格式不符时返回 None"""
+    try:
+        return decode(list(types), data)
+    except Exception:
+        return None
+
+
+def aggregate3(w3: Web3, calls: List[Tuple[str, bytes]], block=None,
+               chunk_size: int = MULTICALL_CHUNK, chunker: Optional[AdaptiveChunker] = None) -> List[Tuple[bool, bytes]]:
+    """
+    用 Multicall3 aggregate3 批量执行 view 调用（allowFailure=True）
+
+    Args:
+        w3: Web3 实例
+        calls: [(合约地址, calldata), ...]
+        block: 读取的区块，默认最新区块
+        chunk_size: 初始批次大小
+        chunker: 批次大小控制（调用方需要请求数统计时传入），默认按 chunk_size 新建
+
+    Returns:
+        与 calls 一一对应的 [(是否成功, 返回数据), ...]；单个调用也无法执行时为 (False, b'')
+    """
+    multicall = w3.eth.contract(address=Web3.to_checksum_address(MULTICALL3), abi=MULTICALL3_ABI)
+    block = block if block is not None else w3.eth.block_number
+
+    def read(chunk):
+        returned = multicall.functions.aggregate3(
+            [(Web3.to_checksum_address(target), True, data) for target, data in chunk]
+        ).call(block_identifier=block)
+        return [(success, bytes(data)) for success, data in returned]
+
+    return read_in_chunks(calls, read, chunker or AdaptiveChunker(chunk_size), lambda call, error: (False, b''))
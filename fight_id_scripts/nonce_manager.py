@@ -0,0 +1,269 @@
+"""
+发送方 nonce 管理
+本地分配 nonce 以便连续发送交易，跟踪未确认的 nonce，
+发现发送失败或被节点丢弃造成的空洞时，用同 nonce 的替换交易补齐
+"""
+
+import time
+import threading
+from typing import Callable, Dict, Optional
+
+from web3.exceptions import TransactionNotFound
+
+from gas_oracle import get_gas_oracle
+
+# 替换交易的 gas price 提升比例（节点要求至少 +10%）
+REPLACE_BUMP = 1.125
+# 等待确认时的轮询间隔 (秒)
+POLL_INTERVAL = 3
+# 交易在节点中消失后，重新广播多少次仍未上链才改为替换交易
+REBROADCAST_LIMIT = 2
+# 补齐空洞的 0 金额转账的 gas
+FILL_GAS = 21000
+
+
+class PendingTx:
+    """一个已分配 nonce 的交易"""
+
+    def __init__(self, nonce: int):
+        self.nonce = nonce
+        self.tx = None
+        self.raw = None
+        self.tx_hash = None
+        self.gas_price = 0
+        self.rebroadcasts = 0
+        # 发送失败（未进入节点）时为 True，这个 nonce 成为空洞
+        self.failed = False
+
+    @property
+    def unsent(self) -> bool:
+        """发送失败，或已分配但从未发送（调用方中途放弃时没有 mark_failed）"""
+        return self.failed or self.raw is None
+
+
+class NonceManager:
+    """
+    单个发送地址的 nonce 管理器（线程安全）
+
+    用法:
+        nonce = manager.allocate()
+        ... 签名发送 ...
+        manager.mark_sent(nonce, tx, raw, tx_hash)   或   manager.mark_failed(nonce)
+        manager.fill_gaps(sign)                     补齐发送失败留下的空洞
+        manager.wait_confirmed(sign)                等待全部确认，期间处理被丢弃的交易
+    """
+
+    def __init__(self, w3, address: str):
+        self.w3 = w3
+        self.address = address
+        self.lock = threading.Lock()
+        self.next_nonce = None
+        self.pending: Dict[int, PendingTx] = {}
+        # nonce -> 最新交易哈希（替换后会变化），确认后也保留
+        self.hashes: Dict[int, str] = {}
+        # 余额不足以支付补齐交易的 gas，空洞无法补齐
+        self.underfunded = False
+
+        # 统计
+        self.sent = 0
+        self.gaps_filled = 0
+        self.rebroadcasts = 0
+        self.replacements = 0
+        self.resyncs = 0
+
+    def sync(self):
+        """从链上读取 pending nonce，丢弃已确认的记录"""
+        pending_count = self.w3.eth.get_transaction_count(self.address, 'pending')
+        with self.lock:
+            confirmed = self.w3.eth.get_transaction_count(self.address, 'latest')
+            self.pending = {n: p for n, p in self.pending.items() if n >= confirmed}
+            self.next_nonce = max(pending_count, self.next_nonce or 0)
+            self.resyncs += 1
+
+    def allocate(self) -> int:
+        """分配下一个 nonce，优先复用发送失败留下的空洞"""
+        if self.next_nonce is None:
+            self.sync()
+        with self.lock:
+            for nonce in sorted(self.pending):
+                pending = self.pending[nonce]
+                if pending.failed:
+                    pending.failed = False
+                    return nonce
+            nonce = self.next_nonce
+            self.next_nonce += 1
+            self.pending[nonce] = PendingTx(nonce)
+            return nonce
+
+    def mark_sent(self, nonce: int, tx: dict, raw: bytes, tx_hash):
+        """节点已接收交易"""
+        with self.lock:
+            pending = self.pending.setdefault(nonce, PendingTx(nonce))
+            pending.tx, pending.raw, pending.tx_hash = tx, raw, tx_hash
+            pending.gas_price = tx.get('gasPrice', 0)
+            pending.failed = False
+            self.hashes[nonce] = tx_hash.hex() if hasattr(tx_hash, 'hex') else str(tx_hash)
+            self.sent += 1
+
+    def mark_failed(self, nonce: int):
+        """交易未被节点接收，nonce 留下空洞"""
+        with self.lock:
+            if nonce in self.pending:
+                self.pending[nonce].failed = True
+
+    def release(self, nonce: int):
+        """nonce 已被链上其它交易占用（nonce too low），不再跟踪"""
+        with self.lock:
+            self.pending.pop(nonce, None)
+
+    def trim_trailing(self) -> int:
+        """
+        丢弃最高已发送 nonce 之上的空洞（预先分配但最终没有发送的 nonce 不需要补齐）
+
+        Returns:
+            丢弃的 nonce 数
+        """
+        with self.lock:
+            sent = [n for n, p in self.pending.items() if not p.unsent]
+            top = max(sent) if sent else -1
+            trailing = [n for n, p in self.pending.items() if p.unsent and n > top]
+            for nonce in trailing:
+                del self.pending[nonce]
+            if trailing:
+                self.next_nonce = min(trailing)
+            return len(trailing)
+
+    def gaps(self) -> list:
+        """
+        空洞 nonce: 发送失败的，以及已分配但从未发送的
+
+        批量发送全部结束后再调用，否则会把正在发送中的 nonce 也当成空洞
+        """
+        with self.lock:
+            return sorted(n for n, p in self.pending.items() if p.unsent)
+
+    # ==================== 补齐与替换 ====================
+
+    def _replace(self, nonce: int, sign: Callable[[dict], bytes], gas_price: int, tx: dict = None) -> bool:
+        """
+        发送同 nonce 的替换交易
+
+        Args:
+            nonce: 要替换/补齐的 nonce
+            sign: 签名函数，传入交易字典返回原始交易
+            gas_price: 使用的 gas price
+            tx: 原交易，为空时发送 0 金额转给自己的交易
+        """
+        if tx is None:
+            tx = {
+                'from': self.address,
+                'to': self.address,
+                'value': 0,
+                'gas': FILL_GAS,
+                'nonce': nonce,
+                'chainId': self.w3.eth.chain_id
+            }
+        tx = dict(tx, gasPrice=gas_price)
+        raw = sign(tx)
+        try:
+            tx_hash = self.w3.eth.send_raw_transaction(raw)
+        except Exception as e:
+            message = str(e).lower()
+            if "nonce too low" in message:
+                self.release(nonce)
+                return True
+            print(f"  - ✗ nonce {nonce} 替换交易发送失败: {e}")
+            return False
+        self.mark_sent(nonce, tx, raw, tx_hash)
+        return True
+
+    def fill_gaps(self, sign: Callable[[dict], bytes], gas_price: Optional[int] = None) -> int:
+        """
+        补齐发送失败留下的空洞，否则其后的交易会一直卡在节点的交易池里
+
+        补齐交易从同一个地址发出，余额不足以支付全部补齐交易的 gas 时（例如空洞本身就是
+        余额不足造成的）不发送，由调用方通过 gaps() 报告未补齐的空洞
+
+        Returns:
+            补齐的空洞数
+        """
+        gaps = self.gaps()
+        if not gaps:
+            return 0
+        gas_price = gas_price or get_gas_oracle(self.w3).price()
+        self.underfunded = self.w3.eth.get_balance(self.address) < len(gaps) * FILL_GAS * gas_price
+        if self.underfunded:
+            print(f"  - ✗ 余额不足以支付 {len(gaps)} 笔补齐交易的 gas，nonce 空洞未补齐")
+            return 0
+        filled = 0
+        for nonce in gaps:
+            if self._replace(nonce, sign, gas_price):
+                filled += 1
+        self.gaps_filled += filled
+        return filled
+
+    def wait_confirmed(self, sign: Callable[[dict], bytes], timeout: float = 300) -> bool:
+        """
+        等待所有已发送的交易确认
+
+        最低的未确认交易已不在节点中时视为被丢弃:
+        先按原样重新广播，多次无效后提高 gas price 重新签名同一笔交易
+
+        Returns:
+            是否全部确认
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            confirmed = self.w3.eth.get_transaction_count(self.address, 'latest')
+            with self.lock:
+                self.pending = {n: p for n, p in self.pending.items() if n >= confirmed}
+                if not self.pending:
+                    return True
+                lowest = self.pending[min(self.pending)]
+
+            if lowest.unsent:
+                self.fill_gaps(sign)
+                # 空洞补不上，其后的交易不会确认
+                if self.underfunded:
+                    return False
+            else:
+                self._check_dropped(lowest, sign)
+            time.sleep(POLL_INTERVAL)
+        return False
+
+    def _check_dropped(self, pending: PendingTx, sign: Callable[[dict], bytes]):
+        try:
+            self.w3.eth.get_transaction(pending.tx_hash)
+            return
+        except TransactionNotFound:
+            pass
+
+        if pending.rebroadcasts < REBROADCAST_LIMIT:
+            pending.rebroadcasts += 1
+            self.rebroadcasts += 1
+            try:
+                self.w3.eth.send_raw_transaction(pending.raw)
+                print(f"  - ⚠ nonce {pending.nonce} 的交易已被丢弃，重新广播")
+                return
+            except Exception as e:
+                if "nonce too low" in str(e).lower():
+                    return
+        gas_price = max(int(pending.gas_price * REPLACE_BUMP), get_gas_oracle(self.w3).price())
+        print(f"  - ⚠ nonce {pending.nonce} 的交易无法上链，提高 gasPrice 到 {gas_price} 后替换")
+        if self._replace(pending.nonce, sign, gas_price, pending.tx):
+            pending.rebroadcasts = 0
+            self.replacements += 1
+
+    def tx_hashes(self) -> Dict[int, str]:
+        """各 nonce 的最新交易哈希（替换后会变化）"""
+        with self.lock:
+            return dict(self.hashes)
+
+    def stats(self) -> dict:
+        return {
+            "sent": self.sent,
+            "gaps_filled": self.gaps_filled,
+            "rebroadcasts": self.rebroadcasts,
+            "replacements": self.replacements,
+            "resyncs": self.resyncs
+        }
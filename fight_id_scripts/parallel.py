@@ -0,0 +1,72 @@
+"""
+进程池分块执行，以及耗时 / gas 统计共用的分位数
+签名、地址推导等纯 CPU 计算在主进程里受 GIL 限制只能用到一个核，这里把输入切块分发到进程池。
+进程池统一用 spawn 方式启动: 调用方通常已有其它线程（节点探测、回执监听、请求线程），
+fork 带线程的进程可能死锁
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+# 每个进程分几块，进程间负载更均匀
+CHUNKS_PER_WORKER = 4
+
+
+def chunked(items: Sequence, workers: int) -> List[Sequence]:
+    """按进程数切块，除最后一块外每块大小相同"""
+    size = max(1, -(-len(items) // (max(1, workers) * CHUNKS_PER_WORKER)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def spawn_pool(workers: int, initializer: Optional[Callable] = None, initargs: tuple = ()) -> ProcessPoolExecutor:
+    """创建 spawn 方式的进程池"""
+    return ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn"),
+                               initializer=initializer, initargs=initargs)
+
+
+def parallel_chunks(fn: Callable, items: Sequence, workers: int,
+                    pool: Optional[ProcessPoolExecutor] = None) -> Iterator[Tuple[int, object]]:
+    """
+    在进程池中对每一块调用 fn，按块的顺序逐块返回，前面的块算完就可以开始使用
+
+    Args:
+        fn: 模块级函数，参数为一块输入
+        items: 输入列表
+        workers: 进程数
+        pool: 已有的进程池，为空时临时创建，结束后关闭
+
+    Returns:
+        (该块在 items 中的起始下标, fn 的返回值) 的迭代器
+    """
+    chunks = chunked(items, workers)
+    if not chunks:
+        return
+    size = len(chunks[0])
+    if pool is not None:
+        for n, result in enumerate(pool.map(fn, chunks)):
+            yield n * size, result
+        return
+    with spawn_pool(workers) as own_pool:
+        for n, result in enumerate(own_pool.map(fn, chunks)):
+            yield n * size, result
+
+
+def parallel_map(fn: Callable[[Sequence], list], items: Sequence, workers: int,
+                 pool: Optional[ProcessPoolExecutor] = None) -> list:
+    """
+    在进程池中分块执行 fn（每块返回与输入等长的列表），结果按输入顺序展开
+
+    Returns:
+        与 items 顺序相同的结果列表
+    """
+    return [result for _, chunk in parallel_chunks(fn, items, workers, pool) for result in chunk]
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """计算百分位数（最近秩法，与 binance/network_stats.py 相同），没有样本时返回 0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
@@ -0,0 +1,222 @@
+"""
+交易回执监听
+一个后台线程跟随新区块，每个区块用 eth_getBlockReceipts 一次取回全部回执
+（节点不支持时读区块交易列表，只对命中的交易批量取回执），
+调用方拿到 Future。RPC 次数取决于区块数，而不是交易数 × 轮询次数
+"""
+
+import time
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+from web3 import Web3
+from web3.exceptions import MethodNotSupported, MethodUnavailable, TransactionNotFound
+
+# ==================== 配置 ====================
+# 查询最新区块的间隔 (秒)，BSC 出块约 3 秒
+POLL_INTERVAL = 1.0
+# 默认等待超时 (秒)
+DEFAULT_TIMEOUT = 180
+# 节点不支持该 RPC 方法时的错误信息（各家节点写法不同，-32601 为 JSON-RPC 的 method not found）
+UNSUPPORTED_MARKERS = ("-32601", "method not found", "does not exist", "not supported", "unsupported")
+
+
+def normalize_hash(tx_hash) -> str:
+    """统一为小写 0x 开头的哈希字符串"""
+    value = tx_hash if isinstance(tx_hash, str) else bytes(tx_hash).hex()
+    value = value.lower()
+    return value if value.startswith('0x') else '0x' + value
+
+
+def is_unsupported_method(error: Exception) -> bool:
+    """错误是否表示节点不支持该方法（而不是超时、限流等临时错误）"""
+    if isinstance(error, (MethodNotSupported, MethodUnavailable)):
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in UNSUPPORTED_MARKERS)
+
+
+class ReceiptWatcher:
+    """
+    基于区块的回执监听器（线程安全）
+
+    用法:
+        future = watcher.watch(tx_hash)
+        receipt = future.result()          或   receipt = watcher.wait(tx_hash)
+    """
+
+    def __init__(self, w3: Web3, poll_interval: float = POLL_INTERVAL):
+        self.w3 = w3
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+        # 哈希 -> (Future, 截止时间)
+        self.pending: Dict[str, tuple] = {}
+        # 新加入、还没做过首次查询的哈希（可能在 watch 之前就已上链）
+        self.new_hashes: List[str] = []
+        self.last_block = None
+        # None 表示尚未检测节点是否支持 eth_getBlockReceipts
+        self.block_receipts = None
+
+        # 统计
+        self.blocks = 0
+        self.rpc_calls = 0
+        self.resolved = 0
+
+    def watch(self, tx_hash, timeout: float = DEFAULT_TIMEOUT) -> Future:
+        """
+        登记一笔交易，返回在回执到达时完成的 Future
+
+        Args:
+            tx_hash: 交易哈希
+            timeout: 超时 (秒)，超时后 Future 抛出 TimeoutError
+
+        Returns:
+            Future，结果为交易回执
+        """
+        tx_hash = normalize_hash(tx_hash)
+        with self.lock:
+            if tx_hash in self.pending:
+                return self.pending[tx_hash][0]
+            future = Future()
+            self.pending[tx_hash] = (future, time.time() + timeout)
+            self.new_hashes.append(tx_hash)
+            if not self.thread:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+        return future
+
+    def wait(self, tx_hash, timeout: float = DEFAULT_TIMEOUT) -> dict:
+        """阻塞等待回执，超过 timeout 抛出 TimeoutError（即使后台线程一直在重试 RPC 也不会一直等下去）"""
+        return self.watch(tx_hash, timeout).result(timeout)
+
+    # ==================== 后台线程 ====================
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.poll_interval)
+            self.wakeup.clear()
+            with self.lock:
+                idle = not self.pending
+            if idle:
+                # 空闲时不轮询，也不补扫空闲期间的区块
+                self.last_block = None
+                self.wakeup.wait()
+                continue
+            try:
+                self._tick()
+            except Exception as e:
+                print(f"  - ⚠ 回执监听出错，稍后重试: {str(e)[:100]}")
+            finally:
+                # RPC 持续失败时也要让超时的 Future 结束
+                self._expire()
+
+    def _tick(self):
+        # 先取最新区块，再查新哈希：新哈希在该区块及以前上链的由首次查询发现，之后的由扫块发现
+        head = self.w3.eth.block_number
+        self.rpc_calls += 1
+        with self.lock:
+            new_hashes, self.new_hashes = self.new_hashes, []
+        if new_hashes:
+            self._fetch_receipts(new_hashes, missing_ok=True)
+
+        if self.last_block is None:
+            self.last_block = head
+        for block in range(self.last_block + 1, head + 1):
+            self._scan_block(block)
+            self.last_block = block
+
+    def _scan_block(self, block: int):
+        self.blocks += 1
+        if self.block_receipts is not False:
+            try:
+                receipts = self.w3.eth.get_block_receipts(block)
+                self.rpc_calls += 1
+                self.block_receipts = True
+                for receipt in receipts:
+                    self._resolve(normalize_hash(receipt['transactionHash']), receipt)
+                return
+            except Exception as e:
+                if not is_unsupported_method(e):
+                    # 临时错误，下一轮从这个区块重试
+                    raise
+                # 节点不支持 eth_getBlockReceipts，改用区块交易列表
+                self.block_receipts = False
+
+        transactions = self.w3.eth.get_block(block)['transactions']
+        self.rpc_calls += 1
+        with self.lock:
+            matched = [h for h in map(normalize_hash, transactions) if h in self.pending]
+        if matched:
+            self._fetch_receipts(matched)
+
+    def _fetch_receipts(self, hashes: List[str], missing_ok: bool = False):
+        """批量取回执；provider 不支持批量请求时逐个获取"""
+        try:
+            with self.w3.batch_requests() as batch:
+                for tx_hash in hashes:
+                    batch.add(self.w3.eth.get_transaction_receipt(tx_hash))
+                receipts = batch.execute()
+            self.rpc_calls += 1
+        except Exception:
+            receipts = []
+            for tx_hash in hashes:
+                self.rpc_calls += 1
+                try:
+                    receipts.append(self.w3.eth.get_transaction_receipt(tx_hash))
+                except TransactionNotFound:
+                    if not missing_ok:
+                        raise
+                    receipts.append(None)
+
+        for tx_hash, receipt in zip(hashes, receipts):
+            if receipt:
+                self._resolve(tx_hash, receipt)
+
+    def _resolve(self, tx_hash: str, receipt):
+        with self.lock:
+            entry = self.pending.pop(tx_hash, None)
+        if entry:
+            self.resolved += 1
+            entry[0].set_result(receipt)
+
+    def _expire(self):
+        now = time.time()
+        with self.lock:
+            expired = [h for h, (_, deadline) in self.pending.items() if deadline <= now]
+            entries = [self.pending.pop(h) for h in expired]
+        for tx_hash, (future, _) in zip(expired, entries):
+            future.set_exception(TimeoutError(f"交易超时: {tx_hash}"))
+
+    def stats(self) -> dict:
+        with self.lock:
+            pending = len(self.pending)
+        return {
+            "pending": pending,
+            "resolved": self.resolved,
+            "blocks": self.blocks,
+            "rpc_calls": self.rpc_calls
+        }
+
+
+_shared_watchers: Dict[int, ReceiptWatcher] = {}
+_shared_lock = threading.Lock()
+
+
+def get_receipt_watcher(w3: Optional[Web3] = None) -> ReceiptWatcher:
+    """
+    获取进程内共享的回执监听器（每个 Web3 实例一个）
+
+    Args:
+        w3: Web3 实例，默认使用 rpc_pool 的共享实例
+    """
+    if w3 is None:
+        from rpc_pool import get_web3
+        w3 = get_web3()
+    with _shared_lock:
+        if id(w3) not in _shared_watchers:
+            _shared_watchers[id(w3)] = ReceiptWatcher(w3)
+        return _shared_watchers[id(w3)]
@@ -18,6 +18,9 @@ except ImportError:
     print("❌ 缺少EVM依赖库，请安装: pip install eth-account")
     exit(1)
 
+from address_index import get_address_index
+from wallet_vault import read_key_lines, VAULT_FILE
+
 user_agents = [
     'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36',
     'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36',
@@ -213,10 +216,9 @@ class SIWAClient:
         }
 
     def _load_wallet_private_keys(self, file_path="referral_wallet.txt"):
-        """从文件加载所有钱包私钥"""
+        """从文件加载所有钱包私钥（存在 wallet.vault 时从加密钱包库读取）"""
         try:
-            with open(file_path, 'r') as f:
-                private_keys = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+            private_keys = read_key_lines(file_path)
             print(f"✅ 从 {file_path} 加载了 {len(private_keys)} 个私钥")
             return private_keys
         except FileNotFoundError:
@@ -224,18 +226,14 @@ class SIWAClient:
             return []
 
     def _private_key_to_address(self, private_key_hex):
-        try:
-            account = Account.from_key(private_key_hex)
-            return account.address
-        except Exception:
-            return None
+        return get_address_index().address_of(private_key_hex)
 
     def _generate_evm_signature(self, message, private_key_hex):
         try:
             account = Account.from_key(private_key_hex)
             message_text = f"Sign in to get access to FIGHT.iD"
             encoded_message = encode_defunct(text=message_text)
-            signed_message = Account.sign_message(encoded_message, private_key_hex)
+            signed_message = account.sign_message(encoded_message)
 
             return {
                 'address': account.address,
@@ -502,13 +500,13 @@ if __name__ == "__main__":
     wallet_file = "referral_wallet.txt"
     referral_file = "referral_info_main.csv"
 
-    if os.path.exists(wallet_file) and os.path.exists(referral_file):
+    if (os.path.exists(wallet_file) or os.path.exists(VAULT_FILE)) and os.path.exists(referral_file):
         print("📁 检测到钱包和推荐码文件，开始批量并发处理...")
         main_batch_wallets()
     else:
         print(f"❌ 未找到所需文件：请确保 {wallet_file} 和 {referral_file} 文件存在。")
 
-        if not os.path.exists(wallet_file):
+        if not os.path.exists(wallet_file) and not os.path.exists(VAULT_FILE):
             print(f"💡 正在创建 {wallet_file} 示例文件...")
             with open(wallet_file, "w") as f:
                 f.write("# 请将您的EVM私钥按行添加到此文件\n")
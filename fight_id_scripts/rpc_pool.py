@@ -0,0 +1,226 @@
+"""
+BSC RPC 节点池
+基于 config.py 的 RPC_URLS，所有脚本共用：长连接、后台健康/延迟探测、
+请求发往最快的健康节点，超时、限流或区块高度落后时自动切换
+"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from web3 import Web3
+from web3.middleware import ExtraDataToPOAMiddleware
+from web3.providers.base import JSONBaseProvider
+
+try:
+    from config import RPC_URLS
+except ImportError:
+    RPC_URLS = [
+        'https://bsc-dataseed.binance.org/',
+        'https://bsc-dataseed1.defibit.io/',
+        'https://bsc-dataseed1.ninicoin.io/',
+    ]
+
+# ==================== 配置 ====================
+# 普通请求超时 (秒)
+REQUEST_TIMEOUT = 30
+# 探测请求超时 (秒)
+PROBE_TIMEOUT = 5
+# 后台探测间隔 (秒)
+PROBE_INTERVAL = 15
+# 区块高度落后最高节点超过该值视为过期
+MAX_BLOCK_LAG = 5
+# 每个节点的连接池大小
+POOL_SIZE = 20
+# 延迟平滑系数
+ALPHA = 0.3
+# 节点限流或服务端错误的 HTTP 状态码，与连接失败一样切换到下一个节点
+FAILOVER_STATUS = {429, 500, 502, 503, 504}
+
+
+def is_endpoint_failure(error: Exception) -> bool:
+    """是否是节点本身不可用（连接失败、超时、限流或 5xx），而不是请求本身的错误"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in FAILOVER_STATUS
+    return False
+
+
+class RpcEndpoint:
+    """单个 RPC 节点的连接和健康状态"""
+
+    def __init__(self, url: str, timeout: float = REQUEST_TIMEOUT, pool_size: int = POOL_SIZE):
+        self.url = url
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # 关闭 HTTPProvider 自带的重试，失败后由节点池切换节点
+        self.provider = Web3.HTTPProvider(
+            url,
+            request_kwargs={'timeout': timeout},
+            session=self.session,
+            exception_retry_configuration=None
+        )
+        self.latency_ms = None
+        self.block = 0
+        self.healthy = True
+        self.stale = False
+        self.requests = 0
+        self.failures = 0
+        self.last_error = ""
+
+    def probe(self) -> bool:
+        """请求 eth_blockNumber，更新延迟和区块高度"""
+        payload = {"jsonrpc": "2.0", "method": "eth_blockNumber", "params": [], "id": 1}
+        start = time.perf_counter()
+        try:
+            response = self.session.post(self.url, json=payload, timeout=PROBE_TIMEOUT)
+            response.raise_for_status()
+            block = int(response.json()["result"], 16)
+        except Exception as e:
+            self.mark_failed(e)
+            return False
+        latency = (time.perf_counter() - start) * 1000
+        self.latency_ms = latency if self.latency_ms is None else self.latency_ms + ALPHA * (latency - self.latency_ms)
+        self.block = block
+        self.healthy = True
+        return True
+
+    def mark_failed(self, error: Exception):
+        self.healthy = False
+        self.failures += 1
+        self.last_error = str(error)[:100]
+
+
+class RpcPoolProvider(JSONBaseProvider):
+    """
+    web3 Provider：按延迟选择健康节点，连接失败、超时、限流 (429) 或 5xx 时依次切换到下一个节点
+
+    JSON-RPC 层面的错误（如 nonce too low）属于正常返回，不切换节点
+    """
+
+    def __init__(self, rpc_urls: List[str] = None, probe_interval: float = PROBE_INTERVAL):
+        super().__init__()
+        self.endpoints = [RpcEndpoint(url) for url in (rpc_urls or RPC_URLS)]
+        self.probe_interval = probe_interval
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.failovers = 0
+
+    def __str__(self):
+        return f"RPC pool ({len(self.endpoints)} endpoints)"
+
+    # ==================== 健康探测 ====================
+
+    def probe_all(self):
+        """并发探测所有节点，并标记区块高度落后的节点"""
+        with ThreadPoolExecutor(max_workers=len(self.endpoints)) as executor:
+            list(executor.map(lambda endpoint: endpoint.probe(), self.endpoints))
+        with self.lock:
+            head = max((e.block for e in self.endpoints if e.healthy), default=0)
+            for endpoint in self.endpoints:
+                endpoint.stale = endpoint.healthy and head - endpoint.block > MAX_BLOCK_LAG
+
+    def start(self):
+        """首次探测并启动后台探测线程"""
+        with self.lock:
+            if self.thread:
+                return
+            self.thread = threading.Thread(target=self._run, daemon=True)
+        self.probe_all()
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        while not self.stop_event.wait(self.probe_interval):
+            self.probe_all()
+
+    def ranked(self) -> List[RpcEndpoint]:
+        """按优先级排序的节点：健康且未过期的按延迟排序，其余作为最后的备选"""
+        with self.lock:
+            def key(endpoint):
+                usable = endpoint.healthy and not endpoint.stale
+                latency = endpoint.latency_ms if endpoint.latency_ms is not None else float("inf")
+                return (not usable, latency)
+            return sorted(self.endpoints, key=key)
+
+    # ==================== 请求 ====================
+
+    def _call(self, send):
+        if not self.thread:
+            self.start()
+        last_error = None
+        for i, endpoint in enumerate(self.ranked()):
+            try:
+                endpoint.requests += 1
+                return send(endpoint)
+            except requests.RequestException as e:
+                if not is_endpoint_failure(e):
+                    raise
+                endpoint.mark_failed(e)
+                last_error = e
+                if i + 1 < len(self.endpoints):
+                    self.failovers += 1
+        raise last_error or requests.ConnectionError("没有可用的 RPC 节点")
+
+    def make_request(self, method, params):
+        return self._call(lambda endpoint: endpoint.provider.make_request(method, params))
+
+    def make_batch_request(self, requests_list):
+        return self._call(lambda endpoint: endpoint.provider.make_batch_request(requests_list))
+
+    def is_connected(self, show_traceback: bool = False) -> bool:
+        if not self.thread:
+            self.start()
+        return any(endpoint.healthy for endpoint in self.endpoints)
+
+    def stats(self) -> list:
+        """各节点状态"""
+        return [{
+            "url": e.url,
+            "healthy": e.healthy,
+            "stale": e.stale,
+            "latency_ms": round(e.latency_ms, 1) if e.latency_ms is not None else None,
+            "block": e.block,
+            "requests": e.requests,
+            "failures": e.failures
+        } for e in self.endpoints]
+
+    def print_status(self):
+        """打印节点状态"""
+        for s in self.stats():
+            mark = "✓" if s["healthy"] and not s["stale"] else "✗"
+            latency = f"{s['latency_ms']}ms" if s["latency_ms"] is not None else "N/A"
+            note = " (区块落后)" if s["stale"] else ""
+            print(f"  [{mark}] {s['url']} 延迟 {latency} 区块 {s['block']}{note}")
+
+
+_shared_web3 = None
+_shared_lock = threading.Lock()
+
+
+def get_web3(rpc_urls: List[str] = None) -> Optional[Web3]:
+    """
+    获取进程内共享的 BSC Web3 实例（已注入 PoA 中间件）
+
+    Args:
+        rpc_urls: 节点列表，默认使用 config.py 的 RPC_URLS，仅在首次调用时生效
+
+    Returns:
+        Web3 实例
+    """
+    global _shared_web3
+    with _shared_lock:
+        if _shared_web3 is None:
+            w3 = Web3(RpcPoolProvider(rpc_urls))
+            w3.middleware_onion.inject(ExtraDataToPOAMiddleware, layer=0)
+            _shared_web3 = w3
+    return _shared_web3
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 脚本之间按同目录导入（from nonce_manager import ...），测试时把脚本目录加入 sys.path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
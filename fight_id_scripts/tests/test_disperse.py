@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("eth_tester")
+
+from web3 import Web3
+
+from disperse import GAS_PER_RECIPIENT, MAX_CHUNK_SIZE, chunk_size, split_chunks, disperse_bnb
+from bench_disperse import setup, check_balances
+
+
+def test_chunk_size_bounds():
+    assert chunk_size(0) == 1
+    assert chunk_size(GAS_PER_RECIPIENT * 3 + 1) == 3
+    assert chunk_size(GAS_PER_RECIPIENT * (MAX_CHUNK_SIZE + 10)) == MAX_CHUNK_SIZE
+
+
+def test_split_chunks_keeps_order():
+    recipients = [f"0x{i:040x}" for i in range(5)]
+    amounts = list(range(1, 6))
+    chunks = split_chunks(recipients, amounts, GAS_PER_RECIPIENT * 2)
+    assert [len(r) for r, _ in chunks] == [2, 2, 1]
+    assert [a for _, chunk_amounts in chunks for a in chunk_amounts] == amounts
+    assert [r for chunk_recipients, _ in chunks for r in chunk_recipients] == recipients
+
+
+def test_disperse_on_eth_tester():
+    w3, sender, contract_address = setup()
+    recipients = [w3.eth.account.create().address for _ in range(5)]
+    amounts = [Web3.to_wei(0.0001, 'ether') + i for i in range(5)]
+    sign = lambda tx: sender.sign_transaction(tx).raw_transaction
+
+    chunks = disperse_bnb(w3, sign, sender.address, recipients, amounts,
+                          contract_address=contract_address, budget=GAS_PER_RECIPIENT * 2)
+
+    assert [c['status'] for c in chunks] == ['Success'] * 3
+    assert [c['nonce'] for c in chunks] == [0, 1, 2]
+    check_balances(w3, recipients, amounts)
+    assert w3.eth.get_balance(contract_address) == 0
@@ -0,0 +1,61 @@
+import json
+
+import gas_limits
+from gas_limits import GasLimitCache, function_key, ESTIMATE_HEADROOM, HEADROOM, MIN_SAMPLES
+
+
+class FakeFunction:
+    """只提供 GasLimitCache 用到的属性的合约函数"""
+
+    def __init__(self, estimated=50000):
+        self.address = "0xABCDEF0000000000000000000000000000000001"
+        self.selector = "0x4e71d92d"
+        self.estimated = estimated
+        self.estimate_calls = 0
+
+    def estimate_gas(self, tx_params):
+        self.estimate_calls += 1
+        return self.estimated
+
+
+def test_estimates_until_enough_samples():
+    cache = GasLimitCache(path=None)
+    fn = FakeFunction()
+    for _ in range(MIN_SAMPLES):
+        assert cache.gas_limit(fn, {}) == (int(50000 * ESTIMATE_HEADROOM), "estimate", 50000)
+        cache.observe(fn, {"status": 1, "gasUsed": 40000})
+    limit, source, estimated = cache.gas_limit(fn, {})
+    assert (limit, source, estimated) == (int(40000 * HEADROOM), "cache", None)
+    assert fn.estimate_calls == MIN_SAMPLES
+    assert cache.stats() == {"hits": 1, "estimates": MIN_SAMPLES, "functions": 1}
+
+
+def test_uses_high_percentile_of_samples(monkeypatch):
+    monkeypatch.setattr(gas_limits, "PERCENTILE", 95)
+    cache = GasLimitCache(path=None)
+    fn = FakeFunction()
+    for used in range(1, 21):
+        cache.observe(fn, {"status": 1, "gasUsed": used * 1000})
+    assert cache.cached_limit(function_key(fn)) == int(19000 * HEADROOM)
+
+
+def test_revert_forces_one_estimate():
+    cache = GasLimitCache(path=None)
+    fn = FakeFunction()
+    for _ in range(MIN_SAMPLES):
+        cache.observe(fn, {"status": 1, "gasUsed": 40000})
+    cache.observe(fn, {"status": 0, "gasUsed": 48000})
+    assert cache.gas_limit(fn, {})[1] == "estimate"
+    assert cache.gas_limit(fn, {})[1] == "cache"
+
+
+def test_samples_persist_to_file(tmp_path):
+    path = str(tmp_path / "gas_limit_cache.json")
+    fn = FakeFunction()
+    cache = GasLimitCache(path)
+    for _ in range(MIN_SAMPLES):
+        cache.observe(fn, {"status": 1, "gasUsed": 40000})
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {function_key(fn): [40000] * MIN_SAMPLES}
+    assert GasLimitCache(path).cached_limit(function_key(fn)) == int(40000 * HEADROOM)
+    assert function_key(fn) == "0xabcdef0000000000000000000000000000000001:0x4e71d92d"
@@ -0,0 +1,107 @@
+import pytest
+
+import multicall
+from multicall import AdaptiveChunker, read_in_chunks, MULTICALL3
+from balance_scanner import scan_balances, SELECTOR_GET_ETH_BALANCE
+
+WALLETS = [f"0x{i:040x}" for i in range(1, 11)]
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(multicall, "RETRY_DELAY", 0)
+
+
+class FlakyReader:
+    """批次超过 limit 时失败，另外让前 transient 次调用失败"""
+
+    def __init__(self, limit: int = 1000, transient: int = 0):
+        self.limit = limit
+        self.transient = transient
+        self.sizes = []
+
+    def __call__(self, chunk):
+        self.sizes.append(len(chunk))
+        if self.transient:
+            self.transient -= 1
+            raise ConnectionError("transient")
+        if len(chunk) > self.limit:
+            raise ValueError("batch too large")
+        return [x * 2 for x in chunk]
+
+
+def test_chunker_grows_back_after_transient_error():
+    chunker = AdaptiveChunker(8, grow_after=2)
+    read = FlakyReader(transient=1)
+    assert read_in_chunks(list(range(40)), read, chunker, lambda item, e: None) == [x * 2 for x in range(40)]
+    assert read.sizes[:5] == [8, 4, 4, 8, 8]
+    assert chunker.size == 8
+    assert chunker.requests == len(read.sizes)
+
+
+def test_chunker_backs_off_growing_past_node_limit():
+    chunker = AdaptiveChunker(8, grow_after=2)
+    read = FlakyReader(limit=4)
+    read_in_chunks(list(range(200)), read, chunker, lambda item, e: None)
+    # 每次放大到 8 都会失败，之后放大前要连续成功 4、8、16、32 批
+    assert read.sizes.count(8) == chunker.failures == 5
+    assert chunker.grow_after == 32
+
+
+def test_single_item_failure_uses_fallback():
+    chunker = AdaptiveChunker(4)
+    read = lambda chunk: [1 / x for x in chunk]
+    assert read_in_chunks([1, 0, 2], read, chunker, lambda item, e: "bad") == [1.0, "bad", 0.5]
+
+
+class FakeCall:
+    def __init__(self, contract, calls):
+        self.contract, self.calls = contract, calls
+
+    def call(self, block_identifier=None):
+        self.contract.chunks.append(len(self.calls))
+        if len(self.calls) > self.contract.limit:
+            raise ValueError("out of gas")
+        results = []
+        for target, allow_failure, data in self.calls:
+            assert target == MULTICALL3 and data[:4] == SELECTOR_GET_ETH_BALANCE
+            results.append((True, int.from_bytes(data[-20:], 'big').to_bytes(32, 'big')))
+        return results
+
+
+class FakeMulticall:
+    """getEthBalance 返回地址本身的数值"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.chunks = []
+        self.functions = self
+
+    def aggregate3(self, calls):
+        return FakeCall(self, calls)
+
+
+class FakeEth:
+    block_number = 100
+
+    def __init__(self, contract):
+        self._contract = contract
+
+    def contract(self, address, abi):
+        return self._contract
+
+
+class FakeWeb3:
+    def __init__(self, contract):
+        self.eth = FakeEth(contract)
+
+
+def test_scan_balances_uses_aggregate3(monkeypatch):
+    monkeypatch.setattr("balance_scanner.MULTICALL_CHUNK", 4)
+    contract = FakeMulticall(limit=2)
+    snapshot = scan_balances(FakeWeb3(contract), WALLETS, use_multicall=True)
+    assert snapshot.block == 100
+    assert [snapshot.bnb_of(a) for a in WALLETS] == list(range(1, 11))
+    assert not snapshot.errors
+    assert snapshot.requests == len(contract.chunks)
+    assert contract.chunks[0] == 4 and max(contract.chunks[1:]) <= 2
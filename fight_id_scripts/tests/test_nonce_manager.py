@@ -0,0 +1,135 @@
+import json
+import hashlib
+
+import pytest
+
+import nonce_manager
+from nonce_manager import NonceManager
+
+SENDER = "0x000000000000000000000000000000000000dEaD"
+
+
+class FakeEth:
+    """只在 nonce 连续时出块的链：中间有空洞时后面的交易一直留在交易池"""
+
+    chain_id = 56
+    gas_price = 10 ** 9
+
+    def __init__(self):
+        self.mined = 0
+        self.mempool = {}
+        self.balance = 10 ** 18
+
+    def _mine(self):
+        while self.mined in self.mempool:
+            del self.mempool[self.mined]
+            self.mined += 1
+
+    def get_transaction_count(self, address, block):
+        if block == 'latest':
+            self._mine()
+            return self.mined
+        return max([self.mined] + [n + 1 for n in self.mempool])
+
+    def send_raw_transaction(self, raw):
+        nonce = json.loads(raw)['nonce']
+        if nonce < self.mined:
+            raise ValueError("nonce too low")
+        self.mempool[nonce] = raw
+        return hashlib.sha256(raw).digest()
+
+    def get_balance(self, address):
+        return self.balance
+
+    def get_transaction(self, tx_hash):
+        return {}
+
+
+class FakeWeb3:
+    def __init__(self):
+        self.eth = FakeEth()
+
+
+def sign(tx):
+    return json.dumps(tx, sort_keys=True).encode()
+
+
+def send(manager, w3, nonce):
+    tx = {'from': SENDER, 'to': SENDER, 'value': 1, 'gas': 21000, 'gasPrice': 10 ** 9, 'nonce': nonce}
+    raw = sign(tx)
+    manager.mark_sent(nonce, tx, raw, w3.eth.send_raw_transaction(raw))
+
+
+@pytest.fixture(autouse=True)
+def no_poll_delay(monkeypatch):
+    monkeypatch.setattr(nonce_manager, "POLL_INTERVAL", 0)
+
+
+def test_unsent_nonce_in_middle_of_batch_is_filled():
+    w3 = FakeWeb3()
+    manager = NonceManager(w3, SENDER)
+    nonces = [manager.allocate() for _ in range(3)]
+    assert nonces == [0, 1, 2]
+
+    # nonce 1 已分配，但调用方放弃发送且没有 mark_failed
+    send(manager, w3, 0)
+    send(manager, w3, 2)
+    assert manager.gaps() == [1]
+
+    assert manager.wait_confirmed(sign, timeout=5)
+    assert w3.eth.mined == 3
+    assert manager.stats()["gaps_filled"] == 1
+
+
+def test_failed_nonce_is_reused_by_allocate():
+    w3 = FakeWeb3()
+    manager = NonceManager(w3, SENDER)
+    first, second = manager.allocate(), manager.allocate()
+    manager.mark_failed(first)
+    # second 已分配但还没发送，也算空洞；只有发送失败的 nonce 会被重新分配
+    assert manager.gaps() == [first, second]
+    assert manager.allocate() == first
+    assert manager.allocate() == second + 1
+
+
+def test_trim_trailing_drops_unsent_nonces_above_last_sent():
+    w3 = FakeWeb3()
+    manager = NonceManager(w3, SENDER)
+    for _ in range(4):
+        manager.allocate()
+    send(manager, w3, 0)
+    send(manager, w3, 1)
+    manager.mark_failed(3)
+
+    assert manager.trim_trailing() == 2
+    assert manager.gaps() == []
+    assert manager.allocate() == 2
+
+
+def test_replace_of_nonce_taken_on_chain_releases_it():
+    w3 = FakeWeb3()
+    manager = NonceManager(w3, SENDER)
+    nonce = manager.allocate()
+    # 同一个 nonce 已被其它交易占用并上链
+    w3.eth.mined = 1
+    assert manager.fill_gaps(sign) == 1
+    assert manager.gaps() == []
+    assert manager.wait_confirmed(sign, timeout=1)
+
+
+def test_underfunded_sender_reports_gap_instead_of_filling():
+    w3 = FakeWeb3()
+    manager = NonceManager(w3, SENDER)
+    for _ in range(3):
+        manager.allocate()
+    send(manager, w3, 0)
+    manager.mark_failed(1)
+    send(manager, w3, 2)
+    # nonce 1 因余额不足发送失败，补齐交易同样付不起 gas
+    w3.eth.balance = 0
+
+    assert manager.fill_gaps(sign) == 0
+    assert manager.underfunded
+    assert manager.gaps() == [1]
+    assert not manager.wait_confirmed(sign, timeout=5)
+    assert w3.eth.mined == 1
@@ -0,0 +1,33 @@
+from parallel import chunked, parallel_chunks, parallel_map, percentile
+
+
+def square_chunk(values):
+    return [v * v for v in values]
+
+
+def test_chunked_covers_items_in_order():
+    items = list(range(23))
+    chunks = chunked(items, 2)
+    assert len(chunks) == 8
+    assert [v for chunk in chunks for v in chunk] == items
+    assert chunked([], 4) == []
+
+
+def test_parallel_map_preserves_order():
+    items = list(range(50))
+    assert parallel_map(square_chunk, items, 2) == [v * v for v in items]
+
+
+def test_parallel_chunks_reports_start_index():
+    items = list(range(10))
+    for start, result in parallel_chunks(square_chunk, items, 2):
+        assert result == [v * v for v in items[start:start + len(result)]]
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 100) == 100
+    assert percentile([7], 95) == 7
+    assert percentile([], 95) == 0.0
@@ -0,0 +1,87 @@
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from receipt_watcher import ReceiptWatcher, normalize_hash
+
+
+class FailingEth:
+    """RPC 一直失败的节点"""
+
+    @property
+    def block_number(self):
+        raise ConnectionError("rpc down")
+
+
+class FailingWeb3:
+    eth = FailingEth()
+
+
+def test_normalize_hash():
+    assert normalize_hash("0xABCD") == "0xabcd"
+    assert normalize_hash(bytes.fromhex("abcd")) == "0xabcd"
+
+
+def test_future_expires_while_rpc_keeps_failing():
+    watcher = ReceiptWatcher(FailingWeb3(), poll_interval=0.05)
+    future = watcher.watch("0x01", timeout=0.2)
+    with pytest.raises(TimeoutError):
+        future.result(2)
+    assert watcher.stats()["pending"] == 0
+
+
+def test_wait_is_bounded_by_timeout():
+    watcher = ReceiptWatcher(FailingWeb3(), poll_interval=10)
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        watcher.wait("0x02", timeout=0.2)
+    assert time.monotonic() - started < 2
+
+
+class BlockEth:
+    """eth_getBlockReceipts 按给定的错误依次失败，之后正常返回"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.block_calls = 0
+
+    def get_block_receipts(self, block):
+        if self.errors:
+            raise self.errors.pop(0)
+        return [{"transactionHash": "0xaa", "status": 1}]
+
+    def get_block(self, block):
+        self.block_calls += 1
+        return {"transactions": []}
+
+
+class BlockWeb3:
+    def __init__(self, errors):
+        self.eth = BlockEth(errors)
+
+
+def watcher_with_pending(errors):
+    watcher = ReceiptWatcher(BlockWeb3(errors))
+    future = Future()
+    watcher.pending["0xaa"] = (future, time.time() + 60)
+    return watcher, future
+
+
+def test_transient_block_receipts_error_is_retried():
+    watcher, future = watcher_with_pending([TimeoutError("read timed out")])
+    with pytest.raises(TimeoutError):
+        watcher._scan_block(1)
+    assert watcher.block_receipts is None
+
+    watcher._scan_block(1)
+    assert watcher.block_receipts is True
+    assert future.result(0)["status"] == 1
+
+
+def test_unsupported_block_receipts_falls_back_to_block_transactions():
+    watcher, _ = watcher_with_pending([ValueError({"code": -32601, "message": "the method eth_getBlockReceipts "
+                                                                            "does not exist/is not available"})])
+    watcher._scan_block(1)
+    assert watcher.block_receipts is False
+    assert watcher.w3.eth.block_calls == 1
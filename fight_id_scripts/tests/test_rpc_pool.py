@@ -0,0 +1,44 @@
+import pytest
+import requests
+
+from rpc_pool import RpcPoolProvider
+
+
+def http_error(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+@pytest.fixture
+def pool():
+    pool = RpcPoolProvider(["http://node-a", "http://node-b"])
+    # 不启动后台探测，按列表顺序使用节点
+    pool.thread = object()
+    for latency, endpoint in enumerate(pool.endpoints):
+        endpoint.latency_ms = latency
+    return pool
+
+
+def answer(pool, first_error):
+    def fail(method, params):
+        raise first_error
+
+    pool.endpoints[0].provider.make_request = fail
+    pool.endpoints[1].provider.make_request = lambda method, params: {"result": "0x1"}
+    return pool.make_request("eth_blockNumber", [])
+
+
+@pytest.mark.parametrize("error", [http_error(429), http_error(503), requests.ConnectionError("refused"),
+                                   requests.Timeout("slow")])
+def test_fails_over_on_endpoint_errors(pool, error):
+    assert answer(pool, error) == {"result": "0x1"}
+    assert pool.failovers == 1
+    assert not pool.endpoints[0].healthy
+
+
+def test_client_errors_do_not_fail_over(pool):
+    with pytest.raises(requests.HTTPError):
+        answer(pool, http_error(400))
+    assert pool.failovers == 0
+    assert pool.endpoints[0].healthy
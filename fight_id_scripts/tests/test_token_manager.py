@@ -0,0 +1,70 @@
+import json
+import time
+import base64
+
+import pytest
+
+from token_manager import TokenManager, token_expiry, NO_TOKEN, UNKNOWN_EXPIRY
+from wallet_store import WalletStore
+
+WALLETS = [f"0x{i:040x}" for i in range(1, 5)]
+
+
+def make_jwt(exp):
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+    return f"{encode({'alg': 'HS256'})}.{encode({'sub': 'x', 'exp': exp})}.signature"
+
+
+@pytest.fixture
+def manager(tmp_path):
+    store = WalletStore(str(tmp_path / "wallets.db"), csv_path=None)
+    return TokenManager(store)
+
+
+def test_token_expiry_decodes_exp_claim():
+    assert token_expiry(make_jwt(1700000000)) == 1700000000
+    assert token_expiry("Bearer " + make_jwt(123)) == 123
+    assert token_expiry("not-a-jwt") is None
+    assert token_expiry("a.b.c") is None
+    assert token_expiry(None) is None
+
+
+def test_due_is_ordered_by_expiry(manager):
+    now = time.time()
+    manager.store.upsert_token(WALLETS[0], make_jwt(now + 3600))
+    manager.store.upsert_token(WALLETS[1], None)
+    manager.store.upsert_token(WALLETS[2], make_jwt(now - 10))
+    manager.store.upsert_token(WALLETS[3], make_jwt(now + 86400))
+    manager.reload()
+
+    due = manager.due(now + 6 * 3600)
+    assert [w for _, w in due] == [WALLETS[1], WALLETS[2], WALLETS[0]]
+    # due 不会消耗队列
+    assert manager.due(now + 6 * 3600) == due
+
+
+def test_due_returns_wallet_once_after_repeated_invalidate(manager):
+    manager.store.upsert_token(WALLETS[0], make_jwt(time.time() + 86400))
+    manager.reload()
+    manager.invalidate(WALLETS[0])
+    manager.invalidate(WALLETS[0])
+
+    assert manager.due(time.time()) == [(NO_TOKEN, WALLETS[0])]
+
+
+def test_get_token_without_private_key(manager):
+    now = time.time()
+    fresh, expiring = make_jwt(now + 3600), make_jwt(now + 60)
+    manager.store.upsert_token(WALLETS[0], fresh)
+    manager.store.upsert_token(WALLETS[1], expiring)
+    manager.store.upsert_token(WALLETS[2], make_jwt(now - 60))
+    manager.store.upsert_token(WALLETS[3], "opaque-token")
+    manager.reload()
+
+    assert manager.get_token(WALLETS[0].upper().replace("0X", "0x")) == fresh
+    # 不足 MIN_TTL 但还没过期，没有私钥无法刷新时仍返回原 token
+    assert manager.get_token(WALLETS[1]) == expiring
+    assert manager.get_token(WALLETS[2]) is None
+    assert manager.expiry(WALLETS[3]) == UNKNOWN_EXPIRY
+    assert manager.get_token(WALLETS[3]) == "opaque-token"
@@ -0,0 +1,36 @@
+from eth_account import Account
+
+import tx_signer
+from tx_signer import TransactionSigner
+
+
+def make_tx(sender: str, nonce: int) -> dict:
+    return {'from': sender, 'to': sender, 'value': 0, 'gas': 21000, 'gasPrice': 10 ** 9,
+            'nonce': nonce, 'chainId': 56}
+
+
+def test_signs_with_key_for_from_address_and_loads_accounts_lazily(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    accounts = [Account.create() for _ in range(3)]
+    keys = [a.key.hex() for a in accounts]
+    derived = []
+    from_key = Account.from_key
+    # sign_transaction 内部也会调用 from_key（参数为 HexBytes），只记录由私钥字符串加载账户的调用
+    monkeypatch.setattr(tx_signer.Account, "from_key",
+                        lambda key: (isinstance(key, str) and derived.append(key)) or from_key(key))
+
+    signer = TransactionSigner(keys, workers=1, addresses=[a.address for a in accounts])
+    assert derived == []
+
+    raw, tx_hash = signer.sign_with_hash(make_tx(accounts[1].address, 0))
+    expected = accounts[1].sign_transaction(make_tx(accounts[1].address, 0))
+    assert (raw, tx_hash) == (bytes(expected.raw_transaction), bytes(expected.hash))
+    signer.sign_batch([make_tx(accounts[1].address, n) for n in range(1, 4)])
+    assert derived == [keys[1]]
+
+
+def test_addresses_default_to_address_index(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    account = Account.create()
+    signer = TransactionSigner([account.key.hex(), "not a key"], workers=1)
+    assert list(signer.keys) == [account.address.lower()]
@@ -0,0 +1,65 @@
+import pytest
+from eth_account import Account
+
+import wallet_vault
+from wallet_vault import create_vault, WalletVault, RECORD_SIZE
+
+PASSWORD = "correct horse"
+
+
+@pytest.fixture
+def vault_path(tmp_path, monkeypatch):
+    """在临时目录生成两个 EVM 私钥文件并建库（降低 scrypt 成本）"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(wallet_vault, "KDF_N", 2 ** 10)
+    keys = [Account.create().key.hex() for _ in range(5)]
+    (tmp_path / "wallet.txt").write_text("# 注释\n" + "\n".join(keys[:3]) + "\n\n", encoding="utf-8")
+    (tmp_path / "main_wallet.txt").write_text("\n".join(keys[3:]), encoding="utf-8")
+    path = str(tmp_path / "wallet.vault")
+    counts = create_vault(path, PASSWORD, {"wallet.txt": "evm", "main_wallet.txt": "evm", "sol_wallet.txt": "sol"})
+    assert counts == {"wallet.txt": 3, "main_wallet.txt": 2}
+    return path, keys
+
+
+@pytest.mark.parametrize("cache", [False, True])
+def test_round_trip(vault_path, cache):
+    path, keys = vault_path
+    vault = WalletVault(path, PASSWORD, cache=cache)
+    try:
+        assert vault.keys("wallet.txt") == keys[:3]
+        assert vault.keys("main_wallet.txt") == keys[3:]
+        assert not vault.has_section("sol_wallet.txt")
+
+        address = Account.from_key(keys[4]).address
+        assert vault.locate(address.lower()) == ("main_wallet.txt", 2, 4)
+        assert vault.key_for(address) == keys[4]
+        assert vault.locate(Account.create().address) is None
+    finally:
+        vault.close()
+
+
+def test_wrong_password(vault_path):
+    path, _ = vault_path
+    with pytest.raises(ValueError):
+        WalletVault(path, "wrong")
+
+
+def test_tampered_record_fails_hmac(vault_path):
+    path, _ = vault_path
+    vault = WalletVault(path, PASSWORD)
+    offset = vault.records_offset + RECORD_SIZE + 5
+    vault.close()
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 1]))
+
+    vault = WalletVault(path, PASSWORD)
+    try:
+        # 只有第 2 条记录被改动，单独读取其它记录不受影响
+        assert vault.key_for(Account.from_key(vault_path[1][0]).address) == vault_path[1][0]
+        with pytest.raises(ValueError, match="第 2 条"):
+            vault.keys("wallet.txt")
+    finally:
+        vault.close()
@@ -0,0 +1,326 @@
+"""
+Token 管理
+access token 是 JWT，过期时间就在 exp 字段里，本地解码即可知道，不需要等接口返回 401。
+TokenManager 按过期时间把钱包放进优先队列（最小堆，没有 token 的钱包排在最前），
+每天只需刷新 REFRESH_HORIZON 内会过期的钱包，不必全部重新登录；
+下游脚本用 get_token() 取 token，剩余有效期不足 MIN_TTL 或已收到 401 时当场重新登录该钱包。
+
+用法:
+    python token_manager.py status               # 按过期时间统计
+    python token_manager.py refresh              # 刷新即将过期的 token
+    python token_manager.py refresh --hours 24   # 指定刷新范围
+"""
+
+import sys
+import json
+import math
+import time
+import heapq
+import base64
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from wallet_store import get_wallet_store, WALLET_DB_FILE, TOKENS_CSV_FILE
+from address_index import get_address_index
+from login_engine import LoginEngine, sign_login
+
+try:
+    from config import TOKEN_CONFIG
+except ImportError:
+    TOKEN_CONFIG = {}
+
+# ==================== 配置 ====================
+# refresh 刷新多长时间内会过期的 token (秒)
+REFRESH_HORIZON = TOKEN_CONFIG.get("REFRESH_HORIZON", 6 * 3600)
+# get_token 返回的 token 至少还要有效多久 (秒)，不足时按需重新登录
+MIN_TTL = TOKEN_CONFIG.get("MIN_TTL", 600)
+
+# 没有 token 或已失效（收到 401），排在队列最前
+NO_TOKEN = 0.0
+# 解析不出 exp 的 token，不主动刷新，收到 401 后再刷新
+UNKNOWN_EXPIRY = math.inf
+
+
+def token_expiry(token: str) -> Optional[float]:
+    """
+    本地解码 JWT 的 exp（不校验签名）
+
+    Returns:
+        过期时间戳 (秒)，不是 JWT 或没有 exp 时返回 None
+    """
+    try:
+        if token.startswith('Bearer '):
+            token = token[len('Bearer '):]
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except (AttributeError, IndexError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _format_expiry(expiry: float) -> str:
+    if expiry == NO_TOKEN:
+        return "无"
+    if expiry == UNKNOWN_EXPIRY:
+        return "未知"
+    return datetime.fromtimestamp(expiry).strftime('%Y-%m-%d %H:%M:%S')
+
+
+class TokenManager:
+    """按过期时间索引的 token 管理（线程安全）"""
+
+    def __init__(self, store=None, horizon: float = REFRESH_HORIZON, min_ttl: float = MIN_TTL):
+        self.store = store or get_wallet_store()
+        self.horizon = horizon
+        self.min_ttl = min_ttl
+        self.lock = threading.Lock()
+        self.tokens: Dict[str, str] = {}
+        self.expiries: Dict[str, float] = {}
+        # (过期时间, 钱包)，钱包的过期时间变化后旧条目留在堆里，取出时跳过
+        self.heap: List[Tuple[float, str]] = []
+        # 每个钱包一把锁，避免多个线程同时为同一个钱包重新登录
+        self.refreshing: Dict[str, threading.Lock] = {}
+        self.engine: Optional[LoginEngine] = None
+
+        # 统计
+        self.refreshed = 0
+        self.refresh_failed = 0
+
+        self.reload()
+
+    def reload(self):
+        """从钱包存储重新建立索引"""
+        rows = self.store.rows(valid_only=False)
+        with self.lock:
+            self.tokens, self.expiries, self.heap = {}, {}, []
+            for row in rows:
+                self._index(row['wallet'], row['token'], push=False)
+            heapq.heapify(self.heap)
+
+    def _index(self, wallet: str, token: Optional[str], push: bool = True):
+        """更新内存索引（调用方持有 self.lock）"""
+        wallet = wallet.lower()
+        expiry = (token_expiry(token) or UNKNOWN_EXPIRY) if token else NO_TOKEN
+        self.tokens[wallet] = token or ''
+        self.expiries[wallet] = expiry
+        if push:
+            heapq.heappush(self.heap, (expiry, wallet))
+        else:
+            self.heap.append((expiry, wallet))
+
+    def _record(self, result: dict):
+        """记录一次登录结果（token 已由登录客户端写入钱包存储）"""
+        with self.lock:
+            if result.get('address'):
+                self._index(result['address'], result.get('access_token') if result['success'] else None)
+            if result['success']:
+                self.refreshed += 1
+            else:
+                self.refresh_failed += 1
+
+    def _get_engine(self) -> LoginEngine:
+        with self.lock:
+            if self.engine is None:
+                # 延迟导入: batch_login 是独立脚本，只在需要登录时加载
+                from batch_login import SIWAClient
+                client = SIWAClient()
+                client.store = self.store
+                client.verbose = False
+                self.engine = LoginEngine(client)
+            return self.engine
+
+    def expiry(self, wallet: str) -> float:
+        """钱包 token 的过期时间戳，没有 token 时为 0，无法解析时为 inf"""
+        with self.lock:
+            return self.expiries.get(wallet.lower(), NO_TOKEN)
+
+    def due(self, deadline: float) -> List[Tuple[float, str]]:
+        """
+        deadline 之前过期的钱包（含没有 token 的），按过期时间从早到晚
+
+        Returns:
+            [(过期时间, 小写钱包地址), ...]
+        """
+        due = []
+        seen = set()
+        with self.lock:
+            while self.heap and self.heap[0][0] <= deadline:
+                expiry, wallet = heapq.heappop(self.heap)
+                # 同一钱包可能有多个相同的条目（例如连续两次 invalidate），只取一次
+                if self.expiries.get(wallet) == expiry and wallet not in seen:
+                    seen.add(wallet)
+                    due.append((expiry, wallet))
+            # 只是按顺序取出，放回堆里（刷新成功后会推入新的条目）
+            for item in due:
+                heapq.heappush(self.heap, item)
+        return due
+
+    def get_token(self, wallet: str, private_key: Optional[str] = None,
+                  min_ttl: Optional[float] = None) -> Optional[str]:
+        """
+        获取钱包的有效 token
+
+        Args:
+            wallet: 钱包地址
+            private_key: 钱包私钥，提供时 token 即将过期 / 已失效 / 不存在会当场重新登录
+            min_ttl: token 至少还要有效的秒数，默认 MIN_TTL
+
+        Returns:
+            token，无法获取有效 token 时返回 None
+        """
+        wallet = wallet.lower()
+        min_ttl = self.min_ttl if min_ttl is None else min_ttl
+        with self.lock:
+            token = self.tokens.get(wallet)
+            expiry = self.expiries.get(wallet, NO_TOKEN)
+        if token and expiry - time.time() > min_ttl:
+            return token
+
+        refreshed = self._refresh_one(wallet, private_key, min_ttl) if private_key else None
+        if refreshed:
+            return refreshed
+        # 刷新失败但原 token 还没过期，仍然可以用
+        return token if token and expiry > time.time() else None
+
+    def _refresh_one(self, wallet: str, private_key: str, min_ttl: float) -> Optional[str]:
+        with self.lock:
+            wallet_lock = self.refreshing.setdefault(wallet, threading.Lock())
+        with wallet_lock:
+            # 等锁期间可能已经被其它线程刷新
+            with self.lock:
+                token = self.tokens.get(wallet)
+                expiry = self.expiries.get(wallet, NO_TOKEN)
+            if token and expiry - time.time() > min_ttl:
+                return token
+
+            print(f"🔄 钱包 {wallet} 的 token 即将过期或已失效，重新登录...")
+            result = self._get_engine().login(private_key, sign_login(private_key))
+            self._record(result)
+            if not result['success']:
+                print(f"❌ 钱包 {wallet} 重新登录失败: {result.get('error', '未知错误')}")
+                return None
+            if result['address'].lower() != wallet:
+                print(f"❌ 私钥与钱包 {wallet} 不匹配")
+                return None
+            print(f"✅ 钱包 {wallet} 已获取新 token（过期时间 {_format_expiry(self.expiry(wallet))}）")
+            return result['access_token']
+
+    def invalidate(self, wallet: str):
+        """接口返回 401 时调用: 清空钱包的 token，下次 get_token 重新登录"""
+        wallet = wallet.lower()
+        self.store.upsert_token(wallet, None)
+        with self.lock:
+            self._index(wallet, None)
+
+    def refresh(self, private_keys: List[str], horizon: Optional[float] = None) -> dict:
+        """
+        批量刷新 horizon 秒内会过期的 token（按过期时间顺序提交给并发登录）
+
+        Args:
+            private_keys: 私钥列表，只刷新这些钱包
+            horizon: 刷新范围 (秒)，默认 REFRESH_HORIZON
+
+        Returns:
+            {'refreshed', 'failed', 'skipped'}
+        """
+        horizon = self.horizon if horizon is None else horizon
+        addresses = get_address_index().addresses(private_keys)
+        keys = {address.lower(): key for key, address in zip(private_keys, addresses) if address}
+
+        with self.lock:
+            unknown = [(NO_TOKEN, w) for w in keys if w not in self.expiries]
+        queue = unknown + [(e, w) for e, w in self.due(time.time() + horizon) if w in keys]
+        skipped = len(keys) - len(queue)
+
+        if not queue:
+            print(f"✓ {len(keys)} 个钱包的 token 在 {horizon / 3600:g} 小时内都不会过期，无需刷新")
+            return {'refreshed': 0, 'failed': 0, 'skipped': skipped}
+
+        print(f"🔄 {len(queue)} 个钱包的 token 将在 {horizon / 3600:g} 小时内过期或没有 token，"
+              f"跳过 {skipped} 个，按过期时间顺序刷新")
+        engine = self._get_engine()
+        results = engine.run([keys[w] for _, w in queue])
+        for result in results:
+            self._record(result)
+        refreshed = sum(1 for r in results if r['success'])
+
+        print(f"✅ 刷新成功: {refreshed} 个，❌ 失败: {len(results) - refreshed} 个")
+        engine.print_stats()
+        self.store.export_csv()
+        return {'refreshed': refreshed, 'failed': len(results) - refreshed, 'skipped': skipped}
+
+    def summary(self, horizon: Optional[float] = None) -> dict:
+        """按过期时间统计: 没有 token / 已过期 / horizon 内过期 / 有效 / 无法解析"""
+        horizon = self.horizon if horizon is None else horizon
+        now = time.time()
+        stats = {"missing": 0, "expired": 0, "expiring": 0, "valid": 0, "unknown": 0, "next_expiry": None}
+        with self.lock:
+            for expiry in self.expiries.values():
+                if expiry == NO_TOKEN:
+                    stats["missing"] += 1
+                elif expiry == UNKNOWN_EXPIRY:
+                    stats["unknown"] += 1
+                elif expiry <= now:
+                    stats["expired"] += 1
+                elif expiry <= now + horizon:
+                    stats["expiring"] += 1
+                else:
+                    stats["valid"] += 1
+                if NO_TOKEN < expiry < UNKNOWN_EXPIRY and expiry > now:
+                    stats["next_expiry"] = min(stats["next_expiry"] or expiry, expiry)
+            stats["refreshed"] = self.refreshed
+            stats["refresh_failed"] = self.refresh_failed
+        return stats
+
+    def print_summary(self, horizon: Optional[float] = None):
+        horizon = self.horizon if horizon is None else horizon
+        stats = self.summary(horizon)
+        print(f"Token: 有效 {stats['valid']}，{horizon / 3600:g} 小时内过期 {stats['expiring']}，"
+              f"已过期 {stats['expired']}，没有 token {stats['missing']}，无法解析过期时间 {stats['unknown']}")
+        if stats["next_expiry"]:
+            print(f"  最早过期: {_format_expiry(stats['next_expiry'])}")
+        if stats["refreshed"] or stats["refresh_failed"]:
+            print(f"  本次重新登录: 成功 {stats['refreshed']}，失败 {stats['refresh_failed']}")
+
+
+_shared_managers: Dict[tuple, TokenManager] = {}
+_shared_lock = threading.Lock()
+
+
+def get_token_manager(path: str = WALLET_DB_FILE, csv_path: str = TOKENS_CSV_FILE) -> TokenManager:
+    """获取进程内共享的 token 管理器（每个钱包存储一个）"""
+    with _shared_lock:
+        key = (path, csv_path)
+        if key not in _shared_managers:
+            _shared_managers[key] = TokenManager(get_wallet_store(path, csv_path))
+        return _shared_managers[key]
+
+
+def main():
+    from wallet_vault import read_key_lines
+
+    parser = argparse.ArgumentParser(description="按 JWT 过期时间管理 token")
+    parser.add_argument("command", choices=["status", "refresh"])
+    parser.add_argument("--hours", type=float, help=f"刷新范围 (小时)，默认 {REFRESH_HORIZON / 3600:g}")
+    parser.add_argument("--file", default="wallet.txt", help="私钥文件")
+    args = parser.parse_args()
+
+    horizon = args.hours * 3600 if args.hours is not None else None
+    manager = get_token_manager()
+    if args.command == "status":
+        manager.print_summary(horizon)
+        return
+
+    try:
+        private_keys = read_key_lines(args.file)
+    except FileNotFoundError:
+        print(f"❌ 钱包文件 {args.file} 未找到")
+        sys.exit(1)
+    manager.refresh(private_keys, horizon)
+    manager.print_summary(horizon)
+
+
+if __name__ == "__main__":
+    main()
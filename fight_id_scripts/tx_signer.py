@@ -0,0 +1,190 @@
+"""
+交易签名服务
+ECDSA 签名和 RLP 编码是纯 CPU 计算，在主进程里受 GIL 限制只能用到一个核。
+批量交易先构建好，在进程池中并行签名，按输入顺序（即 nonce 顺序）返回原始交易交给广播方；
+私钥只在创建进程池时传给工作进程一次，之后按交易的 from 地址选择私钥。
+地址来自地址索引，私钥只在第一次为该地址签名时才加载成账户
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from eth_account import Account
+
+from parallel import parallel_chunks, spawn_pool
+from address_index import get_address_index
+
+try:
+    from config import SIGNER_CONFIG
+except ImportError:
+    SIGNER_CONFIG = {}
+
+# ==================== 配置 ====================
+# 签名进程数，默认 CPU 核数
+SIGN_WORKERS = SIGNER_CONFIG.get("WORKERS") or os.cpu_count() or 1
+# 少于该数量的批次直接在当前进程签名（启动进程池和进程间传输的开销更大）
+MIN_PARALLEL = SIGNER_CONFIG.get("MIN_PARALLEL", 64)
+
+# 工作进程内: 小写地址 -> 私钥，以及已加载的账户
+_worker_keys: Dict[str, str] = {}
+_worker_accounts: Dict[str, object] = {}
+
+
+def _keys_by_address(private_keys: List[str], addresses: Optional[List[Optional[str]]] = None) -> Dict[str, str]:
+    """小写地址 -> 私钥，地址默认从地址索引读取（不在当前进程推导），无效私钥跳过"""
+    if addresses is None:
+        addresses = get_address_index().addresses(private_keys)
+    return {address.lower(): key for key, address in zip(private_keys, addresses) if address}
+
+
+def _account(accounts: Dict[str, object], keys: Dict[str, str], address: str):
+    """按地址取账户，第一次签名时才由私钥加载"""
+    address = address.lower()
+    account = accounts.get(address)
+    if account is None:
+        account = accounts[address] = Account.from_key(keys[address])
+    return account
+
+
+def _init_worker(keys: Dict[str, str]):
+    global _worker_keys, _worker_accounts
+    _worker_keys, _worker_accounts = keys, {}
+
+
+def _sign_chunk(txs: List[dict]) -> Tuple[List[Tuple[bytes, bytes]], float]:
+    """工作进程: 签名一组交易，返回 [(原始交易, 交易哈希), ...] 和 CPU 耗时"""
+    started = time.process_time()
+    signed = []
+    for tx in txs:
+        result = _account(_worker_accounts, _worker_keys, tx['from']).sign_transaction(tx)
+        signed.append((bytes(result.raw_transaction), bytes(result.hash)))
+    return signed, time.process_time() - started
+
+
+class TransactionSigner:
+    """
+    进程池签名服务（线程安全）
+
+    用法:
+        with TransactionSigner([private_key]) as signer:
+            raws = signer.sign_batch(txs)       # 与 txs 顺序相同
+            raw = signer.sign(tx)
+    """
+
+    def __init__(self, private_keys: Iterable[str], workers: int = SIGN_WORKERS,
+                 min_parallel: int = MIN_PARALLEL, addresses: Optional[Iterable[Optional[str]]] = None):
+        """
+        Args:
+            private_keys: 私钥
+            workers: 签名进程数
+            min_parallel: 少于该数量的批次在当前进程签名
+            addresses: 与 private_keys 对应的地址（调用方已从地址索引读取时传入），默认查地址索引
+        """
+        self.keys = _keys_by_address(list(private_keys), list(addresses) if addresses is not None else None)
+        self.workers = max(1, workers)
+        self.min_parallel = min_parallel
+        # 当前进程小批量签名用到的账户
+        self.accounts: Dict[str, object] = {}
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.lock = threading.Lock()
+
+        # 统计
+        self.signatures = 0
+        self.cpu_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.pool is None:
+                self.pool = spawn_pool(self.workers, _init_worker, (self.keys,))
+            return self.pool
+
+    def start(self):
+        """提前启动进程池（逐笔签名的调用方需要先启动，否则在当前进程签名）"""
+        if self.workers > 1:
+            self._get_pool()
+
+    def _record(self, count: int, cpu_seconds: float, wall_seconds: float):
+        with self.lock:
+            self.signatures += count
+            self.cpu_seconds += cpu_seconds
+            self.wall_seconds += wall_seconds
+
+    def sign_batch_with_hashes(self, txs: List[dict]) -> List[Tuple[bytes, bytes]]:
+        """
+        批量签名
+
+        Args:
+            txs: 完整的交易字典（含 from、nonce、gas、gasPrice、chainId）
+
+        Returns:
+            [(原始交易, 交易哈希), ...]，顺序与 txs 相同
+        """
+        if not txs:
+            return []
+        started = time.perf_counter()
+        if len(txs) < self.min_parallel or self.workers == 1:
+            signed, cpu_seconds = self._sign_local(txs)
+        else:
+            signed, cpu_seconds = [], 0.0
+            for _, (chunk_signed, chunk_cpu) in parallel_chunks(_sign_chunk, txs, self.workers, self._get_pool()):
+                signed.extend(chunk_signed)
+                cpu_seconds += chunk_cpu
+        self._record(len(txs), cpu_seconds, time.perf_counter() - started)
+        return signed
+
+    def sign_batch(self, txs: List[dict]) -> List[bytes]:
+        """批量签名，返回原始交易列表（顺序与 txs 相同）"""
+        return [raw for raw, _ in self.sign_batch_with_hashes(txs)]
+
+    def sign(self, tx: dict) -> bytes:
+        """签名单笔交易，进程池已启动时交给工作进程，否则在当前进程签名"""
+        return self.sign_with_hash(tx)[0]
+
+    def sign_with_hash(self, tx: dict) -> Tuple[bytes, bytes]:
+        """签名单笔交易，返回 (原始交易, 交易哈希)"""
+        with self.lock:
+            pool = self.pool
+        if pool is None:
+            return self.sign_batch_with_hashes([tx])[0]
+        started = time.perf_counter()
+        (signed,), cpu_seconds = pool.submit(_sign_chunk, [tx]).result()
+        self._record(1, cpu_seconds, time.perf_counter() - started)
+        return signed
+
+    def _sign_local(self, txs: List[dict]) -> Tuple[List[Tuple[bytes, bytes]], float]:
+        started = time.process_time()
+        signed = []
+        for tx in txs:
+            result = _account(self.accounts, self.keys, tx['from']).sign_transaction(tx)
+            signed.append((bytes(result.raw_transaction), bytes(result.hash)))
+        return signed, time.process_time() - started
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "signatures": self.signatures,
+                "workers": self.workers,
+                "per_second": self.signatures / self.wall_seconds if self.wall_seconds else 0.0,
+                "per_core_second": self.signatures / self.cpu_seconds if self.cpu_seconds else 0.0
+            }
+
+    def print_stats(self):
+        stats = self.stats()
+        print(f"签名: {stats['signatures']} 笔，{stats['workers']} 个进程，"
+              f"{stats['per_second']:.0f} 笔/秒，单核 {stats['per_core_second']:.0f} 笔/秒")
+
+    def close(self):
+        with self.lock:
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,224 @@
+"""
+钱包 Token 存储
+SQLite (WAL 模式) 保存钱包地址 → token，按钱包主键 upsert，每次登录只写一行，
+不再整文件读取、重写 tokens.csv。多个脚本 / 线程可同时读写（每个线程一个连接，写冲突时等待）。
+
+兼容 tokens.csv:
+  - 数据库为空或 tokens.csv 比上次同步更新（手动编辑过）时，自动把 CSV 合并导入
+  - export_csv() 按原格式 (wallet, token, 更新时间) 导出，供其它工具或人工查看
+"""
+
+import os
+import csv
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from config import WALLET_DB_FILE
+except ImportError:
+    WALLET_DB_FILE = "wallets.db"
+
+# ==================== 配置 ====================
+TOKENS_CSV_FILE = "tokens.csv"
+CSV_FIELDS = ['wallet', 'token', '更新时间']
+# 写锁等待时间 (毫秒)
+BUSY_TIMEOUT = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tokens (
+    wallet TEXT PRIMARY KEY,
+    token TEXT NOT NULL DEFAULT '',
+    updated_at TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _now() -> str:
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+class WalletStore:
+    """钱包 token 存储（线程安全，可多进程同时使用）"""
+
+    def __init__(self, path: str = WALLET_DB_FILE, csv_path: str = TOKENS_CSV_FILE):
+        self.path = path
+        self.csv_path = csv_path
+        self.local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+        self.sync_from_csv()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT / 1000)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT}")
+            self.local.conn = conn
+        return conn
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _set_meta(self, conn: sqlite3.Connection, key: str, value: str):
+        conn.execute("INSERT INTO meta (key, value) VALUES (?, ?) "
+                     "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (key, value))
+
+    # ==================== CSV 兼容 ====================
+
+    def sync_from_csv(self) -> int:
+        """
+        tokens.csv 比上次同步更新时合并导入（以 CSV 中的值为准）
+
+        Returns:
+            导入的行数，无需导入时为 0
+        """
+        if not self.csv_path or not os.path.exists(self.csv_path):
+            return 0
+        mtime = os.path.getmtime(self.csv_path)
+        synced = self._meta("csv_mtime")
+        if synced is not None and float(synced) >= mtime:
+            return 0
+        return self.import_csv()
+
+    def import_csv(self, path: Optional[str] = None) -> int:
+        """
+        从 CSV 合并导入（wallet, token, 更新时间 / update_time）
+
+        Returns:
+            导入的行数
+        """
+        path = path or self.csv_path
+        rows = []
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                wallet = (row.get('wallet') or '').strip()
+                if wallet:
+                    rows.append((wallet.lower(), (row.get('token') or '').strip(),
+                                 (row.get('更新时间') or row.get('update_time') or '').strip()))
+        conn = self._conn()
+        with conn:
+            conn.executemany("INSERT INTO tokens (wallet, token, updated_at) VALUES (?, ?, ?) "
+                             "ON CONFLICT(wallet) DO UPDATE SET token = excluded.token, "
+                             "updated_at = excluded.updated_at", rows)
+            if path == self.csv_path:
+                self._set_meta(conn, "csv_mtime", str(os.path.getmtime(path)))
+        return len(rows)
+
+    def export_csv(self, path: Optional[str] = None) -> int:
+        """
+        导出为 tokens.csv 格式（按钱包地址排序，先写临时文件再替换）
+
+        Returns:
+            导出的行数
+        """
+        path = path or self.csv_path
+        rows = self.rows(valid_only=False)
+        tmp = path + ".tmp"
+        with open(tmp, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_FIELDS)
+            for row in rows:
+                writer.writerow([row['wallet'], row['token'], row['更新时间']])
+        os.replace(tmp, path)
+        if path == self.csv_path:
+            conn = self._conn()
+            with conn:
+                self._set_meta(conn, "csv_mtime", str(os.path.getmtime(path)))
+        return len(rows)
+
+    # ==================== 读写 ====================
+
+    def upsert_token(self, wallet: str, token: Optional[str], updated_at: Optional[str] = None) -> bool:
+        """
+        写入钱包的 token（token 为空表示登录失败，清空原有 token）
+
+        Returns:
+            是否为新增的钱包
+        """
+        conn = self._conn()
+        with conn:
+            existed = conn.execute("SELECT 1 FROM tokens WHERE wallet = ?", (wallet.lower(),)).fetchone()
+            conn.execute("INSERT INTO tokens (wallet, token, updated_at) VALUES (?, ?, ?) "
+                         "ON CONFLICT(wallet) DO UPDATE SET token = excluded.token, "
+                         "updated_at = excluded.updated_at",
+                         (wallet.lower(), token or '', updated_at or _now()))
+        return existed is None
+
+    def ensure_wallets(self, wallets: Iterable[str]) -> int:
+        """
+        添加还没有记录的钱包（token 为空）
+
+        Returns:
+            新增的钱包数
+        """
+        now = _now()
+        conn = self._conn()
+        with conn:
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO tokens (wallet, token, updated_at) VALUES (?, '', ?)",
+                             [(w.lower(), now) for w in wallets])
+            return conn.total_changes - before
+
+    def get(self, wallet: str) -> Optional[dict]:
+        row = self._conn().execute("SELECT wallet, token, updated_at FROM tokens WHERE wallet = ?",
+                                   (wallet.lower(),)).fetchone()
+        return {'wallet': row['wallet'], 'token': row['token'], '更新时间': row['updated_at']} if row else None
+
+    def rows(self, valid_only: bool = True) -> List[dict]:
+        """
+        全部记录，按钱包地址排序（与 batch_login 写出的 tokens.csv 顺序相同）
+
+        Args:
+            valid_only: 只返回 token 不为空的记录
+
+        Returns:
+            [{'wallet', 'token', '更新时间'}, ...]
+        """
+        sql = "SELECT wallet, token, updated_at FROM tokens"
+        if valid_only:
+            sql += " WHERE token != ''"
+        return [{'wallet': r['wallet'], 'token': r['token'], '更新时间': r['updated_at']}
+                for r in self._conn().execute(sql + " ORDER BY wallet")]
+
+    def token_map(self) -> Dict[str, str]:
+        """小写钱包地址 -> token（只含有效 token）"""
+        return {r['wallet']: r['token'] for r in self.rows()}
+
+    def wallets(self) -> List[str]:
+        """全部钱包地址（小写）"""
+        return [r['wallet'] for r in self._conn().execute("SELECT wallet FROM tokens ORDER BY wallet")]
+
+    def count(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+
+
+_shared_stores: Dict[tuple, WalletStore] = {}
+_shared_lock = threading.Lock()
+
+
+def get_wallet_store(path: str = WALLET_DB_FILE, csv_path: str = TOKENS_CSV_FILE) -> WalletStore:
+    """
+    获取进程内共享的钱包存储（每个数据库文件一个），tokens.csv 有更新时先合并导入
+
+    Args:
+        path: SQLite 数据库文件
+        csv_path: 兼容的 tokens.csv 路径
+    """
+    with _shared_lock:
+        key = (os.path.abspath(path), csv_path)
+        store = _shared_stores.get(key)
+        if store is None:
+            store = _shared_stores[key] = WalletStore(path, csv_path)
+        else:
+            store.sync_from_csv()
+        return store
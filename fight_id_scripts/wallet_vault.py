@@ -0,0 +1,372 @@
+"""
+加密钱包库
+把 wallet.txt / main_wallet.txt / sol_wallet.txt / apt_wallet.txt 等私钥文件加密保存到一个文件，
+整个库只跑一次 scrypt 得到主密钥（而不是每个私钥一个 keystore、每个都跑一次 KDF）。
+每个私钥补齐成定长记录，全部记录用同一条 AES-CTR 密钥流加密，每条记录另有 HMAC 校验，
+mmap 后按需解密：
+  - 按原文件（分区）顺序读取全部私钥：整个分区一次解密
+  - 按地址 + 链 (evm / sol / apt) 二分查找单个私钥：从该记录的计数器位置开始解密，
+    地址只以 HMAC 标签形式保存
+
+文件结构:
+  MAGIC | 头长度 | 头 (JSON: KDF 参数、盐、CTR nonce、分区表) | HMAC(头 + 索引)
+  | 索引 (地址标签 16 字节 + 记录号, 按标签排序) | 记录密文 (每条 128 字节) | 记录校验 (每条 16 字节)
+
+用法:
+  python wallet_vault.py create      # 加密当前目录的私钥文件，生成 wallet.vault
+  python wallet_vault.py list        # 列出分区
+  python wallet_vault.py find 0x...  # 按地址查找所在分区和行号
+
+其它脚本通过 read_key_lines() 读取私钥: wallet.vault 存在且包含该文件时从库中读取，否则读取明文文件。
+密码从环境变量 WALLET_VAULT_PASSWORD 读取，没有时交互输入
+"""
+
+import os
+import sys
+import hmac
+import json
+import mmap
+import struct
+import getpass
+import hashlib
+import argparse
+import threading
+from typing import Dict, List, Optional
+
+from Crypto.Cipher import AES
+
+try:
+    from config import VAULT_FILE
+except ImportError:
+    VAULT_FILE = "wallet.vault"
+
+try:
+    from config import VAULT_CACHE
+except ImportError:
+    VAULT_CACHE = False
+
+# ==================== 配置 ====================
+PASSWORD_ENV = "WALLET_VAULT_PASSWORD"
+# 默认加密的文件及其所属链
+DEFAULT_SOURCES = {
+    "wallet.txt": "evm",
+    "main_wallet.txt": "evm",
+    "referral_wallet.txt": "evm",
+    "sol_wallet.txt": "sol",
+    "apt_wallet.txt": "apt"
+}
+# scrypt 参数（约 0.1 秒、32MB 内存，整个库只算一次）
+KDF_N = 2 ** 15
+KDF_R = 8
+KDF_P = 1
+
+MAGIC = b"FIDVLT1\0"
+# 每条记录的长度（1 字节长度 + 私钥字符串 + 补零），AES 分组的整数倍
+RECORD_SIZE = 128
+RECORD_BLOCKS = RECORD_SIZE // 16
+TAG_SIZE = 16
+INDEX_ENTRY = struct.Struct(">16sI")
+
+
+def _sub_key(master: bytes, label: bytes) -> bytes:
+    return hmac.new(master, b"fid-vault " + label, hashlib.sha256).digest()
+
+
+def _derive_keys(password: str, salt: bytes, n: int, r: int, p: int) -> tuple:
+    master = hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=128 * r * n * 2, dklen=32)
+    return _sub_key(master, b"enc"), _sub_key(master, b"mac"), _sub_key(master, b"index")
+
+
+def _address_tag(tag_key: bytes, chain: str, address: str) -> bytes:
+    return hmac.new(tag_key, f"{chain}:{address.lower()}".encode(), hashlib.sha256).digest()[:TAG_SIZE]
+
+
+def _record_tag(mac_key: bytes, number: int, ciphertext: bytes) -> bytes:
+    # 记录号参与校验，记录被调换位置时校验失败
+    return hmac.digest(mac_key, struct.pack(">I", number) + ciphertext, "sha256")[:TAG_SIZE]
+
+
+def _ctr(enc_key: bytes, nonce: bytes, number: int):
+    """从第 number 条记录开始的 AES-CTR 密钥流"""
+    return AES.new(enc_key, AES.MODE_CTR, nonce=nonce, initial_value=number * RECORD_BLOCKS)
+
+
+def read_plain_lines(file_path: str) -> List[str]:
+    """读取明文私钥文件：去掉空行和 # 注释行"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+
+# ==================== 地址推导（只在建库时使用） ====================
+
+def _evm_addresses(keys: List[str]) -> List[Optional[str]]:
+    from address_index import get_address_index
+    return get_address_index().addresses(keys)
+
+
+def _sol_addresses(keys: List[str]) -> List[Optional[str]]:
+    from base58 import b58decode
+    from solders.keypair import Keypair
+    addresses = []
+    for key in keys:
+        try:
+            raw = b58decode(key)
+            keypair = Keypair.from_bytes(raw) if len(raw) == 64 else Keypair.from_seed(raw)
+            addresses.append(str(keypair.pubkey()))
+        except Exception:
+            addresses.append(None)
+    return addresses
+
+
+def _apt_addresses(keys: List[str]) -> List[Optional[str]]:
+    from aptos_sdk.account import Account
+    addresses = []
+    for key in keys:
+        try:
+            key = key[2:] if key.lower().startswith('0x') else key
+            addresses.append(str(Account.load_key("0x" + key).address()))
+        except Exception:
+            addresses.append(None)
+    return addresses
+
+
+ADDRESS_DERIVERS = {"evm": _evm_addresses, "sol": _sol_addresses, "apt": _apt_addresses}
+
+
+def create_vault(path: str, password: str, sources: Dict[str, str]) -> dict:
+    """
+    加密私钥文件，生成钱包库
+
+    Args:
+        path: 输出文件
+        password: 密码
+        sources: {文件名: 链}，不存在的文件跳过
+
+    Returns:
+        {分区名: 私钥数}
+    """
+    salt = os.urandom(16)
+    nonce = os.urandom(8)
+    enc_key, mac_key, tag_key = _derive_keys(password, salt, KDF_N, KDF_R, KDF_P)
+
+    sections, plain_keys, index = [], [], []
+    for name, chain in sources.items():
+        if not os.path.exists(name):
+            continue
+        keys = read_plain_lines(name)
+        start = len(plain_keys)
+        sections.append({"name": name, "chain": chain, "start": start, "count": len(keys)})
+        plain_keys.extend(keys)
+        try:
+            addresses = ADDRESS_DERIVERS[chain](keys)
+        except ImportError as e:
+            print(f"⚠ {name}: 缺少 {e.name}，该分区不能按地址查找")
+            addresses = []
+        for offset, address in enumerate(addresses):
+            if address:
+                index.append((_address_tag(tag_key, chain, address), start + offset))
+
+    index.sort()
+    header = json.dumps({
+        "kdf": {"name": "scrypt", "n": KDF_N, "r": KDF_R, "p": KDF_P},
+        "salt": salt.hex(),
+        "nonce": nonce.hex(),
+        "record_size": RECORD_SIZE,
+        "records": len(plain_keys),
+        "index": len(index),
+        "sections": sections
+    }).encode()
+    index_bytes = b"".join(INDEX_ENTRY.pack(tag, number) for tag, number in index)
+    prefix = MAGIC + struct.pack(">I", len(header)) + header
+    mac = hmac.new(mac_key, prefix + index_bytes, hashlib.sha256).digest()
+
+    plain = bytearray()
+    for number, key in enumerate(plain_keys):
+        data = key.encode()
+        if len(data) >= RECORD_SIZE:
+            raise ValueError(f"第 {number + 1} 个私钥过长")
+        plain += bytes([len(data)]) + data + bytes(RECORD_SIZE - 1 - len(data))
+    ciphertext = _ctr(enc_key, nonce, 0).encrypt(bytes(plain))
+    tags = b"".join(_record_tag(mac_key, n, ciphertext[n * RECORD_SIZE:(n + 1) * RECORD_SIZE])
+                    for n in range(len(plain_keys)))
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(prefix + mac + index_bytes + ciphertext + tags)
+    os.replace(tmp, path)
+    return {s["name"]: s["count"] for s in sections}
+
+
+class WalletVault:
+    """已解锁的钱包库（只读，线程安全）"""
+
+    def __init__(self, path: str, password: str, cache: bool = VAULT_CACHE):
+        self.path = path
+        self.cache: Optional[Dict[int, str]] = {} if cache else None
+        self.lock = threading.Lock()
+
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} 不是钱包库文件")
+        header_len = struct.unpack_from(">I", self.map, len(MAGIC))[0]
+        prefix_end = len(MAGIC) + 4 + header_len
+        self.header = json.loads(self.map[len(MAGIC) + 4:prefix_end])
+        kdf = self.header["kdf"]
+        self.enc_key, self.mac_key, self.tag_key = _derive_keys(
+            password, bytes.fromhex(self.header["salt"]), kdf["n"], kdf["r"], kdf["p"])
+
+        self.index_offset = prefix_end + 32
+        self.index_count = self.header["index"]
+        self.records_offset = self.index_offset + self.index_count * INDEX_ENTRY.size
+        self.tags_offset = self.records_offset + self.header["records"] * RECORD_SIZE
+        self.nonce = bytes.fromhex(self.header["nonce"])
+        mac = hmac.new(self.mac_key, self.map[:prefix_end] + self.map[self.index_offset:self.records_offset],
+                       hashlib.sha256).digest()
+        if not hmac.compare_digest(mac, self.map[prefix_end:self.index_offset]):
+            raise ValueError("密码错误或钱包库已损坏")
+        self.sections = {s["name"]: s for s in self.header["sections"]}
+
+    def _decrypt(self, start: int, count: int) -> List[str]:
+        """解密连续的 count 条记录（一次 AES-CTR 调用），逐条校验"""
+        offset = self.records_offset + start * RECORD_SIZE
+        ciphertext = self.map[offset:offset + count * RECORD_SIZE]
+        plain = _ctr(self.enc_key, self.nonce, start).decrypt(ciphertext)
+        keys = []
+        for i in range(count):
+            number = start + i
+            tag_offset = self.tags_offset + number * TAG_SIZE
+            expected = _record_tag(self.mac_key, number, ciphertext[i * RECORD_SIZE:(i + 1) * RECORD_SIZE])
+            if not hmac.compare_digest(expected, self.map[tag_offset:tag_offset + TAG_SIZE]):
+                raise ValueError(f"钱包库第 {number + 1} 条记录校验失败")
+            record = plain[i * RECORD_SIZE:(i + 1) * RECORD_SIZE]
+            keys.append(record[1:1 + record[0]].decode())
+        return keys
+
+    def _records(self, start: int, count: int) -> List[str]:
+        if self.cache is None:
+            return self._decrypt(start, count)
+        with self.lock:
+            cached = [self.cache.get(n) for n in range(start, start + count)]
+        if None in cached:
+            cached = self._decrypt(start, count)
+            with self.lock:
+                self.cache.update(zip(range(start, start + count), cached))
+        return cached
+
+    def has_section(self, name: str) -> bool:
+        return name in self.sections
+
+    def keys(self, name: str) -> List[str]:
+        """分区内的全部私钥，顺序与原文件相同"""
+        section = self.sections[name]
+        return self._records(section["start"], section["count"])
+
+    def locate(self, address: str, chain: str = "evm") -> Optional[tuple]:
+        """
+        按地址查找记录
+
+        Returns:
+            (分区名, 行号 从 1 开始, 记录号)，未找到时返回 None
+        """
+        tag = _address_tag(self.tag_key, chain, address)
+        lo, hi = 0, self.index_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_tag, number = INDEX_ENTRY.unpack_from(self.map, self.index_offset + mid * INDEX_ENTRY.size)
+            if mid_tag < tag:
+                lo = mid + 1
+            elif mid_tag > tag:
+                hi = mid
+            else:
+                for section in self.header["sections"]:
+                    if section["start"] <= number < section["start"] + section["count"]:
+                        return section["name"], number - section["start"] + 1, number
+        return None
+
+    def key_for(self, address: str, chain: str = "evm") -> Optional[str]:
+        """按地址获取私钥，未找到时返回 None"""
+        found = self.locate(address, chain)
+        return self._records(found[2], 1)[0] if found else None
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+_shared_vault: Optional[WalletVault] = None
+_shared_lock = threading.Lock()
+
+
+def _password(prompt: str = "钱包库密码: ") -> str:
+    return os.getenv(PASSWORD_ENV) or getpass.getpass(prompt)
+
+
+def get_vault(path: str = VAULT_FILE) -> Optional[WalletVault]:
+    """
+    获取进程内共享的钱包库（首次调用时解锁，只跑一次 KDF）
+
+    Returns:
+        钱包库文件不存在时返回 None
+    """
+    global _shared_vault
+    with _shared_lock:
+        if _shared_vault is None:
+            if not os.path.exists(path):
+                return None
+            _shared_vault = WalletVault(path, _password())
+        return _shared_vault
+
+
+def read_key_lines(file_path: str) -> List[str]:
+    """
+    读取私钥文件的有效行：钱包库中有该文件时从库中解密，否则读取明文文件
+
+    Args:
+        file_path: 私钥文件名，例如 wallet.txt
+
+    Returns:
+        去掉空行和注释行后的私钥列表（明文文件不存在时抛出 FileNotFoundError）
+    """
+    vault = get_vault()
+    name = os.path.basename(file_path)
+    if vault and vault.has_section(name):
+        return vault.keys(name)
+    return read_plain_lines(file_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="加密钱包库")
+    parser.add_argument("command", choices=["create", "list", "find"])
+    parser.add_argument("address", nargs="?", help="find 命令的地址")
+    parser.add_argument("--chain", default="evm", choices=list(ADDRESS_DERIVERS))
+    parser.add_argument("--file", default=VAULT_FILE, help="钱包库文件")
+    args = parser.parse_args()
+
+    if args.command == "create":
+        password = os.getenv(PASSWORD_ENV)
+        if not password:
+            password = getpass.getpass("设置钱包库密码: ")
+            if password != getpass.getpass("再次输入密码: "):
+                print("✗ 两次输入的密码不一致")
+                sys.exit(1)
+        counts = create_vault(args.file, password, DEFAULT_SOURCES)
+        if not counts:
+            print("✗ 当前目录没有可加密的私钥文件")
+            sys.exit(1)
+        for name, count in counts.items():
+            print(f"✓ {name}: {count} 个私钥")
+        print(f"✓ 已生成 {args.file}，确认脚本运行正常后请删除上面的明文私钥文件")
+        return
+
+    vault = WalletVault(args.file, _password())
+    if args.command == "list":
+        for section in vault.header["sections"]:
+            print(f"  {section['name']:<24}{section['chain']:<6}{section['count']:>8} 个私钥")
+    else:
+        found = vault.locate(args.address or "", args.chain)
+        print(f"✓ {found[0]} 第 {found[1]} 行" if found else "✗ 未找到该地址")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,19 +3,31 @@ BSC 链合约调用脚本
 功能: Mint NFT + 质押
 """
 
-import time
+import os
+import sys
+import asyncio
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from web3 import Web3
-from eth_account import Account
+
+# 与 fight_id_scripts 共用 BSC 节点池
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'fight_id_scripts'))
+from rpc_pool import get_web3
+from balance_scanner import scan_balances, print_snapshot_summary
+from receipt_watcher import get_receipt_watcher
+from gas_oracle import get_gas_oracle
+from tx_signer import TransactionSigner
+from address_index import get_address_index
+from wallet_vault import read_key_lines
+from multicall import aggregate3, decode_result, encode_call, has_multicall
+from wallet_state import (WalletStateJournal, STATE_FILE, SENT_STATES, PENDING, WHITELISTED, MINT_SENT, MINTED,
+                          APPROVE_SENT, APPROVED, STAKE_SENT, DONE, FAILED)
 
 # API 配置
 WHITELIST_API = "https://rwa.sharex.network/api/nfts/whitelist/essentia/"
 
 # ========== 配置 ==========
-BSC_RPC = "https://bsc-dataseed.binance.org/"
-# 备用 RPC
-# BSC_RPC = "https://bsc-dataseed1.defibit.io/"
-# BSC_RPC = "https://bsc-dataseed1.ninicoin.io/"
+# BSC RPC 节点见 fight_id_scripts/config.py 的 RPC_URLS
 
 # 合约地址
 MINT_CONTRACT = "0x28e3889A3bc57D4421a5041E85Df8b516Ab683F8"
@@ -25,6 +37,23 @@ STAKE_CONTRACT = "0xC7e54532ea427b7Bcf682dc0BEF24CD1338b3026"
 TOKEN_ID = 0
 AMOUNT = 1
 
+# 低于该 BNB 余额的钱包直接跳过
+MIN_BNB_BALANCE = 0.001
+
+# 质押状态查询函数（参数为 钱包地址, tokenId，返回已质押数量），
+# 为空时以上次运行结果文件中成功的钱包作为已完成
+STAKE_STATUS_FUNCTION = ""
+
+# 结果文件（也用于判断上次已完成的钱包）
+RESULTS_FILE = 'mint_stake_results.csv'
+
+# 同时执行的阻塞操作数（白名单 API、签名发送、RPC 查询），等待回执不占名额
+MAX_CONCURRENT = 20
+# 白名单设置后等待链上生效 (秒)
+WHITELIST_DELAY = 3
+# 等待回执超时 (秒)
+RECEIPT_TIMEOUT = 120
+
 # Mint 合约 ABI (仅包含需要的函数)
 MINT_ABI = [
     {
@@ -75,41 +104,36 @@ STAKE_ABI = [
 
 
 def load_wallets(file_path: str) -> list:
-    """从文件加载钱包私钥"""
+    """从文件加载钱包私钥（存在 wallet.vault 时从加密钱包库读取）"""
     wallets = []
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#'):
-                # 确保私钥格式正确
-                if not line.startswith('0x'):
-                    line = '0x' + line
-                wallets.append(line)
+    for line in read_key_lines(file_path):
+        # 确保私钥格式正确
+        if not line.startswith('0x'):
+            line = '0x' + line
+        wallets.append(line)
     return wallets
 
 
 def get_gas_price(w3: Web3) -> int:
-    """获取当前 gas 价格，添加一点缓冲"""
-    gas_price = w3.eth.gas_price
+    """获取当前 gas 价格（共享预言机按区块缓存），添加一点缓冲"""
     # 增加 10% 作为缓冲
-    return int(gas_price * 1.1)
+    return get_gas_oracle(w3).price(1.1)
 
 
-def wait_for_tx(w3: Web3, tx_hash: str, timeout: int = 120) -> dict:
-    """等待交易确认"""
-    print(f"    等待交易确认: {tx_hash}")
-    start = time.time()
-    while True:
-        try:
-            receipt = w3.eth.get_transaction_receipt(tx_hash)
-            if receipt is not None:
-                return receipt
-        except Exception:
-            pass
-        
-        if time.time() - start > timeout:
-            raise TimeoutError(f"交易超时: {tx_hash}")
-        time.sleep(2)
+def send_signed(w3: Web3, signer, tx: dict, before_send=None) -> str:
+    """
+    签名并发送交易
+
+    Args:
+        signer: TransactionSigner，按交易的 from 地址选择私钥
+        before_send: 广播前的回调，参数为 (交易哈希, 原始交易)，用于先落盘再发送
+    """
+    raw_tx, tx_hash = signer.sign_with_hash(tx)
+    tx_hash = w3.to_hex(tx_hash)
+    if before_send:
+        before_send(tx_hash, w3.to_hex(raw_tx))
+    w3.eth.send_raw_transaction(raw_tx)
+    return tx_hash
 
 
 def set_whitelist_api(address: str) -> bool:
@@ -152,32 +176,36 @@ def set_whitelist_api(address: str) -> bool:
         return False
 
 
-def mint_nft(w3: Web3, account, mint_contract, token_id: int, amount: int) -> str:
+def mint_nft(w3: Web3, signer, address: str, mint_contract, token_id: int, amount: int, before_send=None) -> str:
     """调用 mint 函数"""
     print(f"  [Mint] tokenId={token_id}, amount={amount}")
     
     # 构建交易
     tx = mint_contract.functions.mint(token_id, amount).build_transaction({
-        'from': account.address,
+        'from': address,
         'gas': 200000,
         'gasPrice': get_gas_price(w3),
-        'nonce': w3.eth.get_transaction_count(account.address),
+        'nonce': w3.eth.get_transaction_count(address),
         'chainId': 56  # BSC 主网
     })
     
-    # 签名并发送
-    signed_tx = account.sign_transaction(tx)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-    return w3.to_hex(tx_hash)
+    return send_signed(w3, signer, tx, before_send)
 
 
-def approve_for_staking(w3: Web3, account, mint_contract, stake_contract_address: str) -> str:
-    """授权质押合约操作 NFT"""
+def approve_for_staking(w3: Web3, signer, address: str, mint_contract, stake_contract_address: str,
+                        is_approved: bool = None, before_send=None) -> str:
+    """
+    授权质押合约操作 NFT
+
+    Args:
+        is_approved: 预检得到的授权状态，为空时从链上查询
+    """
     # 检查是否已授权
-    is_approved = mint_contract.functions.isApprovedForAll(
-        account.address, 
-        stake_contract_address
-    ).call()
+    if is_approved is None:
+        is_approved = mint_contract.functions.isApprovedForAll(
+            address,
+            stake_contract_address
+        ).call()
     
     if is_approved:
         print("  [Approve] 已授权，跳过")
@@ -189,111 +217,200 @@ def approve_for_staking(w3: Web3, account, mint_contract, stake_contract_address
         stake_contract_address, 
         True
     ).build_transaction({
-        'from': account.address,
+        'from': address,
         'gas': 100000,
         'gasPrice': get_gas_price(w3),
-        'nonce': w3.eth.get_transaction_count(account.address),
+        'nonce': w3.eth.get_transaction_count(address),
         'chainId': 56
     })
     
-    signed_tx = account.sign_transaction(tx)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-    return w3.to_hex(tx_hash)
+    return send_signed(w3, signer, tx, before_send)
 
 
-def stake_nft(w3: Web3, account, stake_contract, token_id: int, amount: int) -> str:
+def stake_nft(w3: Web3, signer, address: str, stake_contract, token_id: int, amount: int, before_send=None) -> str:
     """调用 stake 函数"""
     print(f"  [Stake] tokenId={token_id}, amount={amount}")
     
     tx = stake_contract.functions.stake(token_id, amount).build_transaction({
-        'from': account.address,
+        'from': address,
         'gas': 200000,
         'gasPrice': get_gas_price(w3),
-        'nonce': w3.eth.get_transaction_count(account.address),
+        'nonce': w3.eth.get_transaction_count(address),
         'chainId': 56
     })
     
-    signed_tx = account.sign_transaction(tx)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-    return w3.to_hex(tx_hash)
-
-
-def process_wallet(w3: Web3, private_key: str, mint_contract, stake_contract) -> dict:
-    """处理单个钱包：mint + stake"""
-    account = Account.from_key(private_key)
-    address = account.address
-    result = {
-        'address': address,
-        'mint_tx': None,
-        'approve_tx': None,
-        'stake_tx': None,
-        'success': False,
-        'error': None
-    }
-    
-    print(f"\n{'='*60}")
-    print(f"处理钱包: {address}")
-    
-    # 检查余额
-    balance = w3.eth.get_balance(address)
-    balance_bnb = w3.from_wei(balance, 'ether')
-    print(f"  BNB 余额: {balance_bnb:.6f}")
-    
-    if balance < w3.to_wei(0.001, 'ether'):
-        result['error'] = "BNB 余额不足"
-        print(f"  错误: {result['error']}")
-        return result
-    
-    try:
-        # Step 0: 设置白名单
-        if not set_whitelist_api(address):
-            result['error'] = "白名单设置失败"
-            print(f"  错误: {result['error']}")
-            return result
-        
-        # 等待链上白名单生效
-        print("  等待白名单生效 (3秒)...")
-        time.sleep(3)
-        
-        # Step 1: Mint
-        mint_tx = mint_nft(w3, account, mint_contract, TOKEN_ID, AMOUNT)
-        result['mint_tx'] = mint_tx
-        print(f"    Mint TX: {mint_tx}")
-        
-        receipt = wait_for_tx(w3, mint_tx)
-        if receipt['status'] != 1:
-            raise Exception("Mint 交易失败")
-        print("    Mint 成功 ✓")
-        
-        # Step 2: Approve (如果需要)
-        approve_tx = approve_for_staking(w3, account, mint_contract, STAKE_CONTRACT)
-        if approve_tx:
-            result['approve_tx'] = approve_tx
-            print(f"    Approve TX: {approve_tx}")
-            
-            receipt = wait_for_tx(w3, approve_tx)
-            if receipt['status'] != 1:
-                raise Exception("Approve 交易失败")
-            print("    Approve 成功 ✓")
-        
-        # Step 3: Stake
-        stake_tx = stake_nft(w3, account, stake_contract, TOKEN_ID, AMOUNT)
-        result['stake_tx'] = stake_tx
-        print(f"    Stake TX: {stake_tx}")
-        
-        receipt = wait_for_tx(w3, stake_tx)
+    return send_signed(w3, signer, tx, before_send)
+
+
+def load_completed_wallets(file_path: str = RESULTS_FILE) -> set:
+    """读取上次运行结果中已成功的钱包地址"""
+    completed = set()
+    if not os.path.exists(file_path):
+        return completed
+    with open(file_path, 'r', encoding='utf-8') as f:
+        next(f, None)
+        for line in f:
+            fields = line.strip().split(',')
+            if len(fields) >= 5 and fields[4] == 'True':
+                completed.add(fields[0].lower())
+    return completed
+
+
+def precheck_wallets(w3: Web3, addresses: list) -> dict:
+    """
+    用 Multicall3 一次性读取所有钱包的链上状态
+
+    Args:
+        addresses: 钱包地址
+
+    Returns:
+        {地址: {'approved': 是否已授权, 'balance': 持有的 NFT 数量, 'staked': 已质押数量}}，
+        读取失败的字段为 None；节点没有 Multicall3 时返回空字典
+    """
+    if not has_multicall(w3):
+        print("节点上没有 Multicall3，跳过链上状态预检")
+        return {}
+
+    calls = []
+    for address in addresses:
+        calls.append((MINT_CONTRACT, encode_call("isApprovedForAll(address,address)", [address, STAKE_CONTRACT])))
+        calls.append((MINT_CONTRACT, encode_call("balanceOf(address,uint256)", [address, TOKEN_ID])))
+        if STAKE_STATUS_FUNCTION:
+            calls.append((STAKE_CONTRACT, encode_call(STAKE_STATUS_FUNCTION, [address, TOKEN_ID])))
+    results = aggregate3(w3, calls)
+
+    def value(result, types):
+        success, data = result
+        decoded = decode_result(types, data) if success else None
+        return decoded[0] if decoded else None
+
+    per_wallet = 3 if STAKE_STATUS_FUNCTION else 2
+    states = {}
+    for i, address in enumerate(addresses):
+        chunk = results[i * per_wallet:(i + 1) * per_wallet]
+        states[address] = {
+            'approved': value(chunk[0], ['bool']),
+            'balance': value(chunk[1], ['uint256']),
+            'staked': value(chunk[2], ['uint256']) if STAKE_STATUS_FUNCTION else None
+        }
+    return states
+
+
+class WalletPipeline:
+    """
+    每个钱包一个状态机（pending → whitelisted → mint_sent → minted → approve_sent → approved → stake_sent → done），
+    由 asyncio 调度：等待回执不占用并发名额，哪个钱包的回执先到就先推进哪个，
+    每次状态转换都写入 WalletStateJournal
+    """
+
+    def __init__(self, w3: Web3, mint_contract, stake_contract, journal: WalletStateJournal, signer,
+                 max_concurrent: int = MAX_CONCURRENT):
+        self.w3 = w3
+        self.mint_contract = mint_contract
+        self.stake_contract = stake_contract
+        self.journal = journal
+        self.max_concurrent = max_concurrent
+        self.signer = signer
+        self.watcher = get_receipt_watcher(w3)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent)
+        self.semaphore = None
+
+    async def run(self, wallets: list) -> list:
+        """
+        并发推进所有钱包直到 done 或 failed
+
+        Args:
+            wallets: [(钱包记录, 预检状态), ...]，私钥由 signer 按地址选择
+
+        Returns:
+            钱包记录列表
+        """
+        self.semaphore = asyncio.Semaphore(self.max_concurrent)
+        try:
+            return await asyncio.gather(*(self._run_wallet(record, state) for record, state in wallets))
+        finally:
+            self.executor.shutdown(wait=False)
+
+    async def _blocking(self, fn, *args):
+        """在线程池中执行阻塞调用（RPC、签名发送、白名单 API），受并发上限控制"""
+        async with self.semaphore:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def _receipt(self, tx_hash: str) -> dict:
+        return await asyncio.wrap_future(self.watcher.watch(tx_hash, RECEIPT_TIMEOUT))
+
+    def _log(self, record: dict, message: str):
+        print(f"  [{record['address'][:10]}] {message}")
+
+    async def _run_wallet(self, record: dict, state: dict) -> dict:
+        if record['state'] in SENT_STATES and record.get('raw_tx'):
+            # 续跑：上次记录后可能没广播成功，重新广播（已上链或已在交易池时节点会拒绝，忽略即可）
+            try:
+                await self._blocking(self.w3.eth.send_raw_transaction, record['raw_tx'])
+            except Exception:
+                pass
+
+        while record['state'] not in (DONE, FAILED):
+            try:
+                await self._step(record, state)
+            except Exception as e:
+                self.journal.transition(record, FAILED, error=str(e)[:200])
+            if record['state'] == FAILED:
+                self._log(record, f"✗ {record['error']}")
+        return record
+
+    def _before_send(self, record: dict, sent_state: str):
+        field = SENT_STATES[sent_state]
+        return lambda tx_hash, raw: self.journal.transition(record, sent_state, **{field: tx_hash, 'raw_tx': raw})
+
+    async def _confirm(self, record: dict, next_state: str, name: str):
+        receipt = await self._receipt(record[SENT_STATES[record['state']]])
         if receipt['status'] != 1:
-            raise Exception("Stake 交易失败")
-        print("    Stake 成功 ✓")
-        
-        result['success'] = True
-        print(f"  钱包处理完成 ✓")
-        
-    except Exception as e:
-        result['error'] = str(e)
-        print(f"  错误: {e}")
-    
-    return result
+            # 交易已上链但失败，续跑时重新执行这一步
+            self.journal.transition(record, FAILED, error=f"{name} 交易失败", raw_tx=None)
+            return
+        self.journal.transition(record, next_state)
+        self._log(record, f"{name} 成功 ✓")
+
+    async def _step(self, record: dict, state: dict):
+        current = record['state']
+        address = record['address']
+
+        if current == PENDING:
+            if (state.get('balance') or 0) >= AMOUNT:
+                self._log(record, f"已持有 {state['balance']} 个 NFT，跳过白名单和 Mint")
+                self.journal.transition(record, MINTED)
+                return
+            if not await self._blocking(set_whitelist_api, address):
+                self.journal.transition(record, FAILED, error="白名单设置失败")
+                return
+            # 等待链上白名单生效（只挂起这个钱包）
+            await asyncio.sleep(WHITELIST_DELAY)
+            self.journal.transition(record, WHITELISTED)
+
+        elif current == WHITELISTED:
+            await self._blocking(mint_nft, self.w3, self.signer, address, self.mint_contract, TOKEN_ID, AMOUNT,
+                                 self._before_send(record, MINT_SENT))
+
+        elif current == MINT_SENT:
+            await self._confirm(record, MINTED, "Mint")
+
+        elif current == MINTED:
+            approve_tx = await self._blocking(approve_for_staking, self.w3, self.signer, address, self.mint_contract,
+                                              STAKE_CONTRACT, state.get('approved'),
+                                              self._before_send(record, APPROVE_SENT))
+            if not approve_tx:
+                self.journal.transition(record, APPROVED)
+
+        elif current == APPROVE_SENT:
+            await self._confirm(record, APPROVED, "Approve")
+
+        elif current == APPROVED:
+            await self._blocking(stake_nft, self.w3, self.signer, address, self.stake_contract, TOKEN_ID, AMOUNT,
+                                 self._before_send(record, STAKE_SENT))
+
+        elif current == STAKE_SENT:
+            await self._confirm(record, DONE, "Stake")
 
 
 def main():
@@ -302,7 +419,7 @@ def main():
     print("=" * 60)
     
     # 连接到 BSC
-    w3 = Web3(Web3.HTTPProvider(BSC_RPC))
+    w3 = get_web3()
     if not w3.is_connected():
         print("无法连接到 BSC 网络!")
         return
@@ -326,26 +443,88 @@ def main():
         print("没有找到钱包!")
         return
     
-    # 处理每个钱包
-    results = []
-    success_count = 0
-    fail_count = 0
-    
-    for i, private_key in enumerate(wallets, 1):
-        print(f"\n[{i}/{len(wallets)}]")
-        result = process_wallet(w3, private_key, mint_contract, stake_contract)
-        results.append(result)
-        
-        if result['success']:
-            success_count += 1
+    # 批量读取余额，余额不足的钱包不再逐个查询
+    addresses = get_address_index().addresses(wallets)
+    if None in addresses:
+        print(f"跳过 {addresses.count(None)} 个无效私钥")
+        wallets = [pk for pk, a in zip(wallets, addresses) if a]
+        addresses = [a for a in addresses if a]
+    completed = load_completed_wallets(RESULTS_FILE)
+    states = {}
+    try:
+        states = precheck_wallets(w3, addresses)
+        if states:
+            print(f"链上状态预检: 已授权 {sum(1 for s in states.values() if s['approved'])} 个，"
+                  f"已持有 NFT {sum(1 for s in states.values() if (s['balance'] or 0) >= AMOUNT)} 个")
+    except Exception as e:
+        print(f"链上状态预检失败，每个钱包执行全部步骤: {e}")
+    snapshot = None
+    try:
+        snapshot = scan_balances(w3, addresses)
+        print_snapshot_summary(w3, snapshot, w3.to_wei(MIN_BNB_BALANCE, 'ether'))
+    except Exception as e:
+        print(f"余额快照读取失败，改为逐个查询: {e}")
+
+    # 准备每个钱包的状态机：已完成的跳过，上次失败的从最后确认的状态重试，中断的从最后状态继续
+    journal = WalletStateJournal(STATE_FILE)
+    resumed = journal.load()
+    if resumed:
+        print(f"读取状态日志: {resumed} 个钱包有记录")
+
+    records = []
+    todo = []
+    seen = set()
+    for private_key, address in zip(wallets, addresses):
+        if address in seen:
+            continue
+        seen.add(address)
+        record = journal.get(address)
+        records.append(record)
+        state = states.get(address, {})
+        if STAKE_STATUS_FUNCTION:
+            done = (state.get('staked') or 0) >= AMOUNT
         else:
-            fail_count += 1
-        
-        # 钱包之间稍作延迟
-        if i < len(wallets):
-            print("  等待 3 秒后处理下一个钱包...")
-            time.sleep(3)
-    
+            done = address.lower() in completed
+        if record['state'] == DONE:
+            continue
+        if done:
+            journal.transition(record, DONE)
+            continue
+        if record['state'] == FAILED:
+            journal.transition(record, journal.resume_state(record))
+
+        balance = snapshot.bnb_of(address) if snapshot else None
+        if balance is not None and balance < w3.to_wei(MIN_BNB_BALANCE, 'ether'):
+            journal.transition(record, FAILED, error="BNB 余额不足")
+            continue
+        todo.append((private_key, address, record, state))
+
+    print(f"已完成 {sum(1 for r in records if r['state'] == DONE)} 个，待处理 {len(todo)} 个，"
+          f"并发上限 {MAX_CONCURRENT}")
+    if todo:
+        # 签名交给进程池，事件循环和发送线程不再和 ECDSA 计算争抢 GIL
+        # 地址已从地址索引读取，私钥只在签名时才加载
+        signer = TransactionSigner((pk for pk, _, _, _ in todo), addresses=[a for _, a, _, _ in todo])
+        if len(todo) >= signer.min_parallel:
+            signer.start()
+        pipeline = WalletPipeline(w3, mint_contract, stake_contract, journal, signer)
+        try:
+            asyncio.run(pipeline.run([(record, state) for _, _, record, state in todo]))
+        finally:
+            signer.close()
+        signer.print_stats()
+
+    results = [{
+        'address': r['address'],
+        'mint_tx': r['mint_tx'],
+        'approve_tx': r['approve_tx'],
+        'stake_tx': r['stake_tx'],
+        'success': r['state'] == DONE,
+        'error': r['error']
+    } for r in records]
+    success_count = sum(1 for r in results if r['success'])
+    fail_count = len(results) - success_count
+
     # 打印总结
     print("\n" + "=" * 60)
     print("执行总结")
@@ -353,6 +532,7 @@ def main():
     print(f"总钱包数: {len(wallets)}")
     print(f"成功: {success_count}")
     print(f"失败: {fail_count}")
+    get_gas_oracle(w3).print_stats()
     
     # 打印失败详情
     if fail_count > 0:
@@ -362,11 +542,11 @@ def main():
                 print(f"  {r['address']}: {r['error']}")
     
     # 保存结果到文件
-    with open('mint_stake_results.csv', 'w', encoding='utf-8') as f:
+    with open(RESULTS_FILE, 'w', encoding='utf-8') as f:
         f.write("address,mint_tx,approve_tx,stake_tx,success,error\n")
         for r in results:
             f.write(f"{r['address']},{r['mint_tx'] or ''},{r['approve_tx'] or ''},{r['stake_tx'] or ''},{r['success']},{r['error'] or ''}\n")
-    print("\n结果已保存到 mint_stake_results.csv")
+    print(f"\n结果已保存到 {RESULTS_FILE}")
 
 
 if __name__ == "__main__":
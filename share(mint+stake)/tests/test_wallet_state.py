@@ -0,0 +1,50 @@
+from wallet_state import (WalletStateJournal, PENDING, WHITELISTED, MINT_SENT, MINTED, APPROVE_SENT, FAILED)
+
+ADDRESS = "0x" + "ab" * 20
+
+
+def reload(journal):
+    reloaded = WalletStateJournal(journal.path)
+    assert reloaded.load() == 1
+    return reloaded.get(ADDRESS)
+
+
+def test_failure_after_mint_resumes_from_minted(tmp_path):
+    journal = WalletStateJournal(str(tmp_path / "state.jsonl"))
+    record = journal.get(ADDRESS)
+    journal.transition(record, WHITELISTED)
+    journal.transition(record, MINT_SENT, mint_tx="0x01", raw_tx="0xf8")
+    journal.transition(record, MINTED)
+    journal.transition(record, FAILED, error="approve 发送失败")
+
+    record = reload(journal)
+    assert record["state"] == FAILED
+    assert journal.resume_state(record) == MINTED
+
+
+def test_reverted_step_is_retried_from_last_confirmed_state(tmp_path):
+    journal = WalletStateJournal(str(tmp_path / "state.jsonl"))
+    record = journal.get(ADDRESS)
+    journal.transition(record, MINTED)
+    journal.transition(record, APPROVE_SENT, approve_tx="0x02", raw_tx="0xf8")
+    journal.transition(record, FAILED, error="Approve 交易失败", raw_tx=None)
+
+    assert journal.resume_state(reload(journal)) == MINTED
+
+
+def test_unknown_receipt_resumes_waiting_for_the_same_tx(tmp_path):
+    journal = WalletStateJournal(str(tmp_path / "state.jsonl"))
+    record = journal.get(ADDRESS)
+    journal.transition(record, WHITELISTED)
+    journal.transition(record, MINT_SENT, mint_tx="0x01", raw_tx="0xf8")
+    journal.transition(record, FAILED, error="timeout")
+
+    record = reload(journal)
+    assert record["raw_tx"] == "0xf8"
+    assert journal.resume_state(record) == MINT_SENT
+    journal.transition(record, MINT_SENT)
+    assert record["raw_tx"] == "0xf8"
+
+
+def test_old_records_without_progress_restart_from_pending():
+    assert WalletStateJournal.resume_state({"state": FAILED}) == PENDING
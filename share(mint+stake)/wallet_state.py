@@ -0,0 +1,128 @@
+"""
+钱包状态日志
+每个钱包的 mint → approve → stake 状态机在每次状态转换后追加一行并 fsync，
+崩溃或 Ctrl-C 后重新运行即从各钱包的最后状态继续
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Dict
+
+# 日志文件
+STATE_FILE = "mint_stake_state.jsonl"
+
+# 状态
+PENDING = "pending"
+WHITELISTED = "whitelisted"
+# *_SENT: 交易已签名并记录哈希和原始交易，等待回执
+MINT_SENT = "mint_sent"
+MINTED = "minted"
+APPROVE_SENT = "approve_sent"
+APPROVED = "approved"
+STAKE_SENT = "stake_sent"
+DONE = "done"
+FAILED = "failed"
+
+# 等待回执的状态 -> 记录交易哈希的字段
+SENT_STATES = {
+    MINT_SENT: "mint_tx",
+    APPROVE_SENT: "approve_tx",
+    STAKE_SENT: "stake_tx"
+}
+# 链上已确认的进度，失败后续跑从最后一个开始
+CONFIRMED_STATES = (PENDING, MINTED, APPROVED, DONE)
+
+
+class WalletStateJournal:
+    """
+    追加写入的 JSON Lines 日志，同一地址以最后一条记录为准
+
+    记录字段: address, state, confirmed (最后一个已确认的状态), failed_in (失败时所处的状态),
+             mint_tx, approve_tx, stake_tx, raw_tx, error, time
+    """
+
+    def __init__(self, path: str = STATE_FILE):
+        self.path = path
+        self.records: Dict[str, dict] = {}
+        self.lock = threading.Lock()
+
+    def load(self) -> int:
+        """
+        读取日志，崩溃时写了一半的最后一行会被忽略
+
+        Returns:
+            有记录的钱包数
+        """
+        if not os.path.exists(self.path):
+            return 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                self.records[record["address"].lower()] = record
+        return len(self.records)
+
+    def get(self, address: str) -> dict:
+        """钱包的当前记录，没有记录时返回新的 PENDING 记录（不写入）"""
+        record = self.records.get(address.lower())
+        if record is None:
+            record = {
+                "address": address,
+                "state": PENDING,
+                "confirmed": PENDING,
+                "failed_in": None,
+                "mint_tx": None,
+                "approve_tx": None,
+                "stake_tx": None,
+                "raw_tx": None,
+                "error": None
+            }
+            self.records[address.lower()] = record
+        return record
+
+    def transition(self, record: dict, state: str, **fields) -> dict:
+        """
+        状态转换并落盘
+
+        Args:
+            record: 钱包记录（原地更新）
+            state: 新状态
+            **fields: 同时更新的字段
+        """
+        with self.lock:
+            previous = record["state"]
+            record.update(fields)
+            record["state"] = state
+            if state in CONFIRMED_STATES:
+                record["confirmed"] = state
+            if state == FAILED:
+                # 等待回执时失败的保留原始交易，续跑时重新确认这笔交易
+                record["failed_in"] = previous
+            elif state not in SENT_STATES:
+                record["raw_tx"] = None
+            if state != FAILED:
+                record["error"] = None
+            record["time"] = int(time.time() * 1000)
+            line = json.dumps(record, ensure_ascii=False) + "\n"
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+        return record
+
+    @staticmethod
+    def resume_state(record: dict) -> str:
+        """
+        失败钱包续跑时的起始状态
+
+        等待回执时出错（交易结果未知，原始交易仍在记录中）时回到等待回执，确认同一笔交易；
+        其它失败从最后一个已确认的状态重新开始，不会重复已完成的 Mint / Approve
+        """
+        failed_in = record.get("failed_in")
+        if failed_in in SENT_STATES and record.get("raw_tx"):
+            return failed_in
+        return record.get("confirmed") or PENDING